@@ -1,10 +1,11 @@
 # analyzer.py
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
 from data_fetcher import get_price_history
-from date_extensions import ajustar_periodos,parse_date
+from date_extensions import ajustar_periodos
+from schema import normalize_events, normalize_trades
 
-def rank_best_trades(eventos_df, days_before, days_after, valor_investido):
+def rank_best_trades(eventos_df, days_before, days_after, valor_investido, leve=False):
     """
     Recebe um DataFrame com os eventos e retorna um DataFrame com os melhores trades,
     calculando o retorno total (preço + dividendo).
@@ -14,6 +15,8 @@ def rank_best_trades(eventos_df, days_before, days_after, valor_investido):
         days_before: Número de dias úteis antes da data ex para compra
         days_after: Número de dias úteis depois da data ex para venda
         valor_investido: Valor inicial para investimento
+        leve: Se True, retorna apenas as colunas usadas nas varreduras
+              (schema.TRADE_COLUMNS_LEVES)
     """
     if eventos_df.empty:
         print("[WARN] Nenhum evento para processar.")
@@ -25,71 +28,73 @@ def rank_best_trades(eventos_df, days_before, days_after, valor_investido):
         print("[WARN] Nenhum evento encontrado com DY >= maior que o setado.")
         return pd.DataFrame(columns=["Ticker", "DataCom", "DY", "PrecoCompra", "PrecoVenda", "RetornoValorizacaoTotal(%)", "RetornoDividendoTotal(%)", "Retorno(%)"])
     
+    # Os eventos já chegam tipados (ver schema.normalize_events): DataCom é
+    # datetime64 e DY/ValorDividendo são float, então não há reconversão por linha.
+    df = normalize_events(df)
+
     # Calcula retornos baseados nos preços reais
     resultados = []
-    # print(df.head())
-    for _, evento in df.iterrows():
-        # print(f"[DEBUG] Processando evento: {evento['Ativo']} - DataCom: {evento['DataCom']} | {evento}")
-        ticker = evento["Ativo"] + ".SA"  # Adiciona sufixo do Yahoo Finance
-        try:
-            data_com = parse_date(evento["DataCom"])
-        except Exception as e:
-            print(f"[WARN] Erro ao processar data para {evento['Ativo']}: {e}")
+    for evento in df.to_dict("records"):
+        ativo = evento["Ativo"]
+        ticker = ativo + ".SA"  # Adiciona sufixo do Yahoo Finance
+        data_com = evento["DataCom"]
+        if pd.isna(data_com):
+            print(f"[WARN] Erro ao processar data para {ativo}: DataCom inválida")
             continue
             
         start_day, start_next, end_day, end_next = ajustar_periodos(data_com, data_com, days_before, days_after)
 
         # Busca preços
         precos = get_price_history(ticker, start_day, start_next, end_day, end_next)
-        # print(f"[DEBUG] Preços obtidos para {ticker} de {start_day} a {end_next}: {precos}")
         
         if not precos.empty and len(precos) >= 2:
             # Pega os preços das 11h dos respectivos dias
-            preco_compra = precos.iloc[0]["Open"]  # Preço às 11h do dia da compra
-            preco_venda = precos.iloc[-1]["Open"]  # Preço às 11h do dia da venda
+            preco_compra = float(precos.iloc[0]["Open"])  # Preço às 11h do dia da compra
+            preco_venda = float(precos.iloc[-1]["Open"])  # Preço às 11h do dia da venda
             
             try:
                 
                 if start_next is None or end_next is None:
                     continue
                 
+                dy = evento["DY"]
+                valor_dividendo = evento["ValorDividendo"]
+
                 # Calcula retornos percentuais
                 retorno_preco_porcentagem = ((preco_venda - preco_compra) / preco_compra) * 100
-                retorno_dividendo_porcentagem = parse_dy(evento["DY"])  # Converte para float
-                retorno_total_porcentagem = parse_dy(retorno_preco_porcentagem + retorno_dividendo_porcentagem)  # Garante que é float
+                retorno_total_porcentagem = retorno_preco_porcentagem + dy
                 
                 # Calcula valores em reais (R$)
                 retorno_preco = (preco_venda - preco_compra)
-                retorno_preco_reais_total = valor_investido * (parse_dy(retorno_preco_porcentagem) / 100)
-                retorno_dividendo_reais = parse_dy(evento["ValorDividendo"])  # Converte para float
-                retorno_dividendo_reais_total = (valor_investido / parse_dy(preco_compra) ) * parse_dy(evento["ValorDividendo"])  # Converte para float
+                retorno_preco_reais_total = valor_investido * (retorno_preco_porcentagem / 100)
+                retorno_dividendo_reais_total = (valor_investido / preco_compra) * valor_dividendo
                 retorno_total_reais = retorno_preco_reais_total + retorno_dividendo_reais_total
                 valor_total = valor_investido + retorno_total_reais
                 
-                print(f"[DEBUG] Trade {evento['Ativo']}: Retorno {retorno_total_porcentagem}% => R$ {retorno_total_reais:.2f}")
+                print(f"[DEBUG] Trade {ativo}: Retorno {retorno_total_porcentagem}% => R$ {retorno_total_reais:.2f}")
                 resultados.append({
-                    "Ticker": evento["Ativo"],
-                    "DataCom": evento["DataCom"],
+                    "Ticker": ativo,
+                    "DataCom": data_com,
                     "DataCompra": start_next,
                     "DataVenda": end_next,
-                    "DY": parse_dy(evento["DY"]),
-                    "ValorDividendo": parse_dy(evento["ValorDividendo"]),
-                    "PrecoCompra": round(parse_dy(preco_compra), 2),
-                    "PrecoVenda": round(parse_dy(preco_venda), 2),
-                    "RetornoValorizacaoTotal(%)": round(parse_dy(retorno_preco_porcentagem), 2),
+                    "DY": dy,
+                    "ValorDividendo": valor_dividendo,
+                    "PrecoCompra": round(preco_compra, 2),
+                    "PrecoVenda": round(preco_venda, 2),
+                    "RetornoValorizacaoTotal(%)": round(retorno_preco_porcentagem, 2),
                     "RetornoValorizacaoTotal(R$)": round(retorno_preco_reais_total, 2),
                     "RetornoValorizacaoPorAcao(R$)": round(retorno_preco, 2),
-                    "RetornoDividendoTotal(%)": round(parse_dy(retorno_dividendo_porcentagem), 2),
+                    "RetornoDividendoTotal(%)": round(dy, 2),
                     "RetornoDividendoTotal(R$)": round(retorno_dividendo_reais_total, 2),
-                    "RetornoDividendoPorAcao(R$)": round(retorno_dividendo_reais, 2),
-                    "Retorno(%)": round(parse_dy(retorno_total_porcentagem), 2),
+                    "RetornoDividendoPorAcao(R$)": round(valor_dividendo, 2),
+                    "Retorno(%)": round(retorno_total_porcentagem, 2),
                     "Retorno(R$)": round(retorno_total_reais, 2),
                     "ValorInvestido(R$)": round(valor_investido, 2),
                     "ValorTotal(R$)": round(valor_total, 2),
                     "Tipo": evento.get("Tipo", ""),
                 })
             except Exception as e:
-                print(f"[WARN] Erro ao processar {evento['Ativo']}: {e}")
+                print(f"[WARN] Erro ao processar {ativo}: {e}")
     
     df_resultado = pd.DataFrame(resultados)
 
@@ -97,22 +102,60 @@ def rank_best_trades(eventos_df, days_before, days_after, valor_investido):
         print("[WARN] Nenhum trade válido encontrado.")
         return pd.DataFrame(columns=["Ticker", "Data", "DY", "PrecoCompra", "PrecoVenda", "RetornoValorizacaoTotal(%)", "RetornoDividendoTotal(%)", "Retorno(%)"])
 
-    # Converte todas as colunas numéricas para float
-    colunas_numericas = ["DY", "PrecoCompra", "PrecoVenda", "RetornoValorizacaoTotal(%)", "RetornoDividendoTotal(%)", "Retorno(%)"]
-    for coluna in colunas_numericas:
-        df_resultado[coluna] = pd.to_numeric(df_resultado[coluna], errors='coerce')
-
-    # Remove linhas com valores nulos
+    # Remove linhas com valores nulos e aplica o esquema tipado dos trades
     df_resultado = df_resultado.dropna()
-    return df_resultado
+    return normalize_trades(df_resultado, leve=leve)
     # Ordena pelo retorno total decrescente
     # return df_resultado.sort_values(by="Retorno(%)", ascending=False).reset_index(drop=True)
 
-# Filtra por DY mínimo
-def parse_dy(dy_str):
-    try:
-        if isinstance(dy_str, (int, float)):
-            return float(dy_str)
-        return float(str(dy_str).replace(',', '.'))
-    except (ValueError, TypeError):
-        return 0.0
+def build_trades_from_prices(eventos_df, preco_compra, preco_venda, data_compra, data_venda, valor_investido, leve=False):
+    """
+    Versão vetorizada de rank_best_trades para quando os preços de compra e
+    venda já são conhecidos (ex.: painel de preços de um snapshot).
+
+    Args:
+        eventos_df: DataFrame tipado de eventos
+        preco_compra, preco_venda: Arrays com o preço de cada evento (NaN sem preço)
+        data_compra, data_venda: Arrays datetime64 com as datas de compra/venda
+        valor_investido: Valor inicial para investimento
+        leve: Se True, retorna apenas schema.TRADE_COLUMNS_LEVES
+    """
+    eventos = normalize_events(eventos_df).reset_index(drop=True)
+    preco_compra = np.asarray(preco_compra, dtype=np.float64)
+    preco_venda = np.asarray(preco_venda, dtype=np.float64)
+
+    validos = ~(np.isnan(preco_compra) | np.isnan(preco_venda) | (preco_compra == 0))
+    eventos = eventos[validos].reset_index(drop=True)
+    preco_compra, preco_venda = preco_compra[validos], preco_venda[validos]
+
+    dy = eventos["DY"].to_numpy(dtype=np.float64)
+    valor_dividendo = eventos["ValorDividendo"].to_numpy(dtype=np.float64)
+
+    retorno_preco_porcentagem = (preco_venda - preco_compra) / preco_compra * 100
+    retorno_preco_reais_total = valor_investido * (retorno_preco_porcentagem / 100)
+    retorno_dividendo_reais_total = (valor_investido / preco_compra) * valor_dividendo
+    retorno_total_reais = retorno_preco_reais_total + retorno_dividendo_reais_total
+
+    df_resultado = pd.DataFrame({
+        "Ticker": eventos["Ativo"].astype(str),
+        "DataCom": eventos["DataCom"],
+        "DataCompra": np.asarray(data_compra)[validos],
+        "DataVenda": np.asarray(data_venda)[validos],
+        "DY": dy,
+        "ValorDividendo": valor_dividendo,
+        "PrecoCompra": np.round(preco_compra, 2),
+        "PrecoVenda": np.round(preco_venda, 2),
+        "RetornoValorizacaoTotal(%)": np.round(retorno_preco_porcentagem, 2),
+        "RetornoValorizacaoTotal(R$)": np.round(retorno_preco_reais_total, 2),
+        "RetornoValorizacaoPorAcao(R$)": np.round(preco_venda - preco_compra, 2),
+        "RetornoDividendoTotal(%)": np.round(dy, 2),
+        "RetornoDividendoTotal(R$)": np.round(retorno_dividendo_reais_total, 2),
+        "RetornoDividendoPorAcao(R$)": np.round(valor_dividendo, 2),
+        "Retorno(%)": np.round(retorno_preco_porcentagem + dy, 2),
+        "Retorno(R$)": np.round(retorno_total_reais, 2),
+        "ValorInvestido(R$)": round(valor_investido, 2),
+        "ValorTotal(R$)": np.round(valor_investido + retorno_total_reais, 2),
+        "Tipo": eventos["Tipo"].astype(str) if "Tipo" in eventos.columns else "",
+    })
+
+    return normalize_trades(df_resultado.dropna(), leve=leve)
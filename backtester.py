@@ -1,37 +1,43 @@
+from kernels import capital_min as kernel_capital_min
+
+# Colunas do histórico retornado por run_backtest (coluna de origem -> destino)
+COLUNAS_HISTORICO = {
+    "DataCom": "DataCom",
+    "DataCompra": "DataCompra",
+    "DataVenda": "DataVenda",
+    "Ticker": "Ticker",
+    "PrecoCompra": "PrecoCompra",
+    "PrecoVenda": "PrecoVenda",
+    "RetornoValorizacaoTotal(%)": "RetornoValorizacaoTotal(%)",
+    "RetornoDividendoTotal(%)": "RetornoDividendoTotal(%)",
+    "Retorno(%)": "RetornoTotal(%)",
+    "RetornoValorizacaoTotal(R$)": "RetornoR$",
+    "CapitalAcumulado(R$)": "CapitalAcumulado(R$)",
+}
+
+
 def run_backtest(trades_df, verbose, capital):
-    historico = []
     capital_min = capital  # inicializa com o capital inicial
 
-    for _, trade in trades_df.iterrows():
-        ticker = trade["Ticker"]
-        ticker = trade["Ticker"]
-        data_com =trade["DataCom"]
-        retorno_dividendo =trade["RetornoDividendoTotal(R$)"]
-        retorno_valorizacao_acao =trade["RetornoValorizacaoTotal(R$)"]
-        retorno_total_reais =trade["Retorno(R$)"]
-        capital = trade["CapitalAcumulado(R$)"]
-        # print(f"[DEBUG] Trade {trade['Ticker']}: Retorno {retorno_percentual}% => R$ {retorno_monetario:.2f}, Novo Capital: R$ {capital:.2f}")
-        
-        
-        # Atualiza o menor capital
-        if capital < capital_min:
-            capital_min = capital
-            
-        historico.append({
-            "DataCom": trade["DataCom"],
-            "DataCompra": trade["DataCompra"],
-            "DataVenda": trade["DataVenda"],
-            "Ticker": trade["Ticker"],
-            "PrecoCompra": trade["PrecoCompra"],
-            "PrecoVenda": trade["PrecoVenda"],
-            "RetornoValorizacaoTotal(%)": trade["RetornoValorizacaoTotal(%)"],
-            "RetornoDividendoTotal(%)": trade["RetornoDividendoTotal(%)"],
-            "RetornoTotal(%)": trade["Retorno(%)"],
-            "RetornoR$": round( trade["RetornoValorizacaoTotal(R$)"], 2),
-            "CapitalAcumulado(R$)": round( trade["CapitalAcumulado(R$)"], 2),
-        })
-        if verbose:
-            print(f"ticker {ticker} | data_com {data_com} | retorno dividendo: R${retorno_dividendo:.2f} | retorno preco: R${retorno_valorizacao_acao:.2f} | retorno dividendo + valorizacao: R${retorno_total_reais:.2f} | Capital final: R${capital:.2f}")
-        
+    if trades_df.empty:
+        return capital, capital_min, []
+
+    capital_path = trades_df["CapitalAcumulado(R$)"].to_numpy(dtype="float64")
+
+    # Atualiza o menor capital e o capital final de uma vez
+    capital_min = kernel_capital_min(capital_path, capital_min)
+    capital = capital_path[-1]
+
+    historico_df = trades_df[list(COLUNAS_HISTORICO)].rename(columns=COLUNAS_HISTORICO)
+    historico_df["RetornoR$"] = historico_df["RetornoR$"].round(2)
+    historico_df["CapitalAcumulado(R$)"] = historico_df["CapitalAcumulado(R$)"].round(2)
+    historico = historico_df.to_dict("records")
+
+    if verbose:
+        for ticker, data_com, retorno_dividendo, retorno_valorizacao_acao, retorno_total_reais, capital_trade in zip(
+            trades_df["Ticker"], trades_df["DataCom"], trades_df["RetornoDividendoTotal(R$)"],
+            trades_df["RetornoValorizacaoTotal(R$)"], trades_df["Retorno(R$)"], capital_path
+        ):
+            print(f"ticker {ticker} | data_com {data_com} | retorno dividendo: R${retorno_dividendo:.2f} | retorno preco: R${retorno_valorizacao_acao:.2f} | retorno dividendo + valorizacao: R${retorno_total_reais:.2f} | Capital final: R${capital_trade:.2f}")
 
     return capital, capital_min, historico
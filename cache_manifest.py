@@ -0,0 +1,352 @@
+import atexit
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import pandas as pd
+
+CACHE_DIR = "data_cache"
+MANIFEST_FILE = os.path.join(CACHE_DIR, "manifest.sqlite")
+COMPACT_DIR = os.path.join(CACHE_DIR, "compactado")
+
+# Por quanto tempo um resultado vazio/erro é respeitado antes de tentar de novo.
+# Datas antigas sem dados (feriados, ativo sem negociação) quase nunca mudam;
+# datas recentes podem ganhar dados nos próximos dias.
+TTL_VAZIO_RECENTE = timedelta(days=1)
+TTL_VAZIO_ANTIGO = timedelta(days=90)
+DIAS_RECENTES = 10
+TTL_ERRO = timedelta(hours=1)
+
+# Padrões dos arquivos de cache gravados pelo data_fetcher (usados no reindex)
+PADROES_ARQUIVO = {
+    "precos": re.compile(r"^price_(?P<ticker>.+)_(?P<inicio>\d{4}-\d{2}-\d{2})\.csv$"),
+    "painel": re.compile(r"^panel_(?P<ticker>.+)_(?P<inicio>\d{4}-\d{2}-\d{2})_(?P<fim>\d{4}-\d{2}-\d{2})\.csv$"),
+    "eventos": re.compile(r"^dividend_events_(?P<inicio>\d{4}-\d{2}-\d{2})_(?P<fim>\d{4}-\d{2}-\d{2})\.json$"),
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    chave TEXT PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    ticker TEXT,
+    inicio TEXT,
+    fim TEXT,
+    caminho TEXT,
+    tamanho INTEGER NOT NULL DEFAULT 0,
+    buscado_em TEXT NOT NULL,
+    acessado_em TEXT NOT NULL,
+    status TEXT NOT NULL,
+    expira_em TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_entradas_caminho ON entradas (caminho);
+CREATE INDEX IF NOT EXISTS idx_entradas_tipo ON entradas (tipo, status);
+"""
+
+
+def price_key(ticker, dia):
+    return f"precos:{ticker}:{dia}"
+
+
+def panel_key(ticker, inicio, fim):
+    return f"painel:{ticker}:{inicio}:{fim}"
+
+
+def events_key(inicio, fim):
+    return f"eventos:{inicio}:{fim}"
+
+
+def empty_ttl(dia):
+    """TTL do cache negativo de uma data: curto para datas recentes, longo para antigas"""
+    if dia is None or pd.to_datetime(dia) >= pd.Timestamp.today().normalize() - timedelta(days=DIAS_RECENTES):
+        return TTL_VAZIO_RECENTE
+    return TTL_VAZIO_ANTIGO
+
+
+def _agora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class CacheManifest:
+    """
+    Índice (SQLite) do data_cache: uma linha por chave (ex.: preços de um
+    ticker em um dia) com período, arquivo, tamanho, data da busca e status
+    ("ok", "vazio" ou "erro"). Consultas viram buscas no índice em vez de
+    os.path.exists, e resultados vazios/erros ficam registrados com validade
+    (cache negativo) em vez de virarem arquivos vazios.
+    """
+
+    def __init__(self, caminho=MANIFEST_FILE, cache_dir=CACHE_DIR):
+        self.caminho = caminho
+        self.cache_dir = cache_dir
+        novo = not os.path.exists(caminho)
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(ESQUEMA)
+        self._lock = threading.Lock()
+        # Acessos são acumulados em memória e gravados em lote (para a evicção LRU)
+        self._acessos = {}
+        if novo:
+            self.reindex()
+
+    def lookup(self, chave):
+        """
+        Procura uma chave no índice.
+
+        Returns:
+            dict | None: A entrada (status "ok", ou "vazio"/"erro" ainda válidos),
+                         ou None se não há entrada ou o cache negativo expirou
+        """
+        with self._lock:
+            linha = self._conn.execute("SELECT * FROM entradas WHERE chave = ?", (chave,)).fetchone()
+        if linha is None:
+            return None
+        entrada = dict(linha)
+        if entrada["status"] != "ok" and entrada["expira_em"] and entrada["expira_em"] <= _agora():
+            return None
+        self._acessos[chave] = _agora()
+        return entrada
+
+    def entries(self, tipo, ticker=None, inicio=None, fim=None):
+        """Entradas "ok" de um tipo (e ticker) cujo início cai em [inicio, fim]"""
+        sql, args = "SELECT * FROM entradas WHERE tipo = ? AND status = 'ok'", [tipo]
+        if ticker is not None:
+            sql, args = sql + " AND ticker = ?", args + [ticker]
+        if inicio is not None:
+            sql, args = sql + " AND inicio >= ?", args + [inicio]
+        if fim is not None:
+            sql, args = sql + " AND inicio <= ?", args + [fim]
+        with self._lock:
+            linhas = self._conn.execute(sql + " ORDER BY inicio", args).fetchall()
+        agora = _agora()
+        for linha in linhas:
+            self._acessos[linha["chave"]] = agora
+        return [dict(l) for l in linhas]
+
+    def record(self, chave, tipo, status="ok", caminho=None, ticker=None, inicio=None, fim=None, ttl=None):
+        """Registra (ou substitui) uma entrada; `ttl` define a validade de vazio/erro"""
+        self._inserir([_linha(chave, tipo, status, caminho, ticker, inicio, fim, ttl)])
+
+    def _inserir(self, linhas):
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO entradas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", linhas)
+            self._conn.commit()
+
+    def remove(self, chave):
+        with self._lock:
+            self._conn.execute("DELETE FROM entradas WHERE chave = ?", (chave,))
+            self._conn.commit()
+
+    def flush(self):
+        """Grava os acessos acumulados (usados pela evicção LRU)"""
+        if not self._acessos:
+            return
+        acessos, self._acessos = self._acessos, {}
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE entradas SET acessado_em = ? WHERE chave = ?",
+                [(quando, chave) for chave, quando in acessos.items()],
+            )
+            self._conn.commit()
+
+    def reindex(self):
+        """
+        Reconstrói o índice a partir dos arquivos do data_cache (varredura
+        única). CSVs de preço sem linhas viram entradas "vazio" e são apagados;
+        entradas de arquivos que não existem mais são descartadas.
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM entradas WHERE status = 'ok' AND caminho NOT LIKE ?", (os.path.join(COMPACT_DIR, "%"),)
+            )
+            self._conn.commit()
+
+        linhas = []
+        for nome in sorted(os.listdir(self.cache_dir)) if os.path.isdir(self.cache_dir) else []:
+            caminho = os.path.join(self.cache_dir, nome)
+            for tipo, padrao in PADROES_ARQUIVO.items():
+                m = padrao.match(nome)
+                if m:
+                    break
+            else:
+                continue
+
+            campos = m.groupdict()
+            ticker, inicio, fim = campos.get("ticker"), campos["inicio"], campos.get("fim")
+            if tipo == "precos":
+                chave = price_key(ticker, inicio)
+            elif tipo == "painel":
+                chave = panel_key(ticker, inicio, fim)
+            else:
+                chave = events_key(inicio, fim)
+
+            if tipo != "eventos" and _csv_sem_linhas(caminho):
+                linhas.append(_linha(chave, tipo, "vazio", None, ticker, inicio, fim, empty_ttl(fim or inicio)))
+                os.remove(caminho)
+            else:
+                # A data da busca de arquivos já existentes é a da última gravação
+                buscado_em = datetime.fromtimestamp(os.path.getmtime(caminho)).isoformat(timespec="seconds")
+                linhas.append(_linha(chave, tipo, "ok", caminho, ticker, inicio, fim, buscado_em=buscado_em))
+
+        self._inserir(linhas)
+        print(f"[INFO] Manifesto do cache reindexado: {len(linhas)} entradas")
+        return len(linhas)
+
+    def stats(self):
+        """Resumo do cache por tipo e status (quantidade, arquivos e tamanho)"""
+        self.flush()
+        agora = _agora()
+        with self._lock:
+            linhas = self._conn.execute(
+                """
+                SELECT tipo, status, COUNT(*) AS entradas,
+                       SUM(CASE WHEN status != 'ok' AND expira_em <= ? THEN 1 ELSE 0 END) AS expiradas,
+                       MIN(buscado_em) AS mais_antiga, MAX(buscado_em) AS mais_recente
+                FROM entradas GROUP BY tipo, status ORDER BY tipo, status
+                """,
+                (agora,),
+            ).fetchall()
+            arquivos = self._conn.execute(
+                "SELECT tipo, COUNT(*) AS arquivos, SUM(tamanho) AS tamanho FROM "
+                "(SELECT tipo, caminho, MAX(tamanho) AS tamanho FROM entradas WHERE status = 'ok' GROUP BY tipo, caminho) "
+                "GROUP BY tipo"
+            ).fetchall()
+
+        resumo = pd.DataFrame([dict(l) for l in linhas])
+        if not resumo.empty:
+            por_tipo = pd.DataFrame([dict(a) for a in arquivos]) if arquivos else pd.DataFrame(columns=["tipo", "arquivos", "tamanho"])
+            resumo = resumo.merge(por_tipo, on="tipo", how="left")
+            ok = resumo["status"] == "ok"
+            resumo.loc[~ok, ["arquivos", "tamanho"]] = 0
+            resumo[["arquivos", "tamanho"]] = resumo[["arquivos", "tamanho"]].fillna(0).astype("int64")
+        return resumo
+
+    def compact(self, tipo="precos"):
+        """
+        Junta os CSVs pequenos de preço (um por ticker e dia) em um CSV por
+        ticker em COMPACT_DIR. As entradas passam a apontar para o arquivo
+        consolidado e os arquivos originais são apagados.
+
+        Returns:
+            int: Quantidade de arquivos compactados
+        """
+        self.flush()
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT chave, ticker, inicio, caminho FROM entradas WHERE tipo = ? AND status = 'ok' "
+                "AND caminho NOT LIKE ? ORDER BY ticker, inicio",
+                (tipo, os.path.join(COMPACT_DIR, "%")),
+            ).fetchall()
+        if not linhas:
+            print("[INFO] Nada para compactar.")
+            return 0
+
+        os.makedirs(COMPACT_DIR, exist_ok=True)
+        compactados = 0
+        for ticker, grupo in pd.DataFrame([dict(l) for l in linhas]).groupby("ticker"):
+            destino = os.path.join(COMPACT_DIR, f"{tipo}_{ticker}.csv")
+            partes = [read_frame({"caminho": destino})] if os.path.exists(destino) else []
+            existentes = [c for c in grupo["caminho"] if os.path.exists(c)]
+            partes += [pd.read_csv(c, index_col=0, parse_dates=True) for c in existentes]
+            df = pd.concat(partes)
+            df = df[~df.index.duplicated(keep="last")].sort_index()
+
+            tmp = destino + ".tmp"
+            df.to_csv(tmp)
+            os.replace(tmp, destino)
+            _ler_compactado.cache_clear()
+
+            tamanho = os.path.getsize(destino)
+            with self._lock:
+                self._conn.executemany(
+                    "UPDATE entradas SET caminho = ?, tamanho = ? WHERE chave = ?",
+                    [(destino, tamanho, chave) for chave in grupo["chave"]],
+                )
+                self._conn.execute("UPDATE entradas SET tamanho = ? WHERE caminho = ?", (tamanho, destino))
+                self._conn.commit()
+            for caminho in existentes:
+                os.remove(caminho)
+            compactados += len(existentes)
+
+        print(f"[INFO] {compactados} arquivos compactados em {COMPACT_DIR}")
+        return compactados
+
+    def evict(self, max_bytes):
+        """
+        Apaga os arquivos usados há mais tempo até o cache caber em `max_bytes`
+        e remove entradas vazias/erro expiradas.
+
+        Returns:
+            int: Bytes liberados
+        """
+        self.flush()
+        with self._lock:
+            self._conn.execute("DELETE FROM entradas WHERE status != 'ok' AND expira_em <= ?", (_agora(),))
+            arquivos = self._conn.execute(
+                "SELECT caminho, MAX(tamanho) AS tamanho, MAX(acessado_em) AS acessado_em FROM entradas "
+                "WHERE status = 'ok' AND caminho IS NOT NULL GROUP BY caminho ORDER BY acessado_em"
+            ).fetchall()
+            self._conn.commit()
+
+        total = sum(a["tamanho"] for a in arquivos)
+        liberados = 0
+        for arquivo in arquivos:
+            if total - liberados <= max_bytes:
+                break
+            if os.path.exists(arquivo["caminho"]):
+                os.remove(arquivo["caminho"])
+            with self._lock:
+                self._conn.execute("DELETE FROM entradas WHERE caminho = ?", (arquivo["caminho"],))
+                self._conn.commit()
+            liberados += arquivo["tamanho"]
+
+        _ler_compactado.cache_clear()
+        print(f"[INFO] Evicção: {liberados / 1e6:.1f} MB liberados (cache com {(total - liberados) / 1e6:.1f} MB)")
+        return liberados
+
+
+def _linha(chave, tipo, status, caminho, ticker, inicio, fim, ttl=None, buscado_em=None):
+    """Monta a linha da tabela `entradas` (o tamanho é lido do arquivo)"""
+    tamanho = os.path.getsize(caminho) if caminho and status == "ok" and os.path.exists(caminho) else 0
+    agora = _agora()
+    expira_em = (datetime.now() + ttl).isoformat(timespec="seconds") if ttl else None
+    return (chave, tipo, ticker, inicio, fim, caminho, tamanho, buscado_em or agora, agora, status, expira_em)
+
+
+def _csv_sem_linhas(caminho):
+    """True se o CSV não tem nenhuma linha de dados (só cabeçalho ou vazio)"""
+    with open(caminho, encoding="utf-8") as f:
+        return sum(1 for _, linha in zip(range(2), f) if linha.strip()) < 2
+
+
+@lru_cache(maxsize=32)
+def _ler_compactado(caminho, mtime):
+    return pd.read_csv(caminho, index_col=0, parse_dates=True)
+
+
+def read_frame(entrada):
+    """
+    Lê o DataFrame de uma entrada "ok". Arquivos consolidados (ver compact)
+    ficam em memória e são fatiados pelo período da entrada.
+    """
+    caminho = entrada["caminho"]
+    if os.path.dirname(caminho) != COMPACT_DIR:
+        return pd.read_csv(caminho, index_col=0, parse_dates=True)
+
+    df = _ler_compactado(caminho, os.path.getmtime(caminho))
+    if not entrada.get("inicio"):
+        return df
+    inicio = pd.Timestamp(entrada["inicio"])
+    fim = pd.Timestamp(entrada.get("fim") or entrada["inicio"]) + timedelta(days=1)
+    return df[(df.index >= inicio) & (df.index < fim)]
+
+
+@lru_cache(maxsize=1)
+def get_manifest():
+    """Manifesto padrão do processo (criado e, se novo, reindexado na primeira chamada)"""
+    manifesto = CacheManifest()
+    atexit.register(manifesto.flush)
+    return manifesto
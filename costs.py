@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+# Modelos de custos e impostos por nome. Cada modelo é um dict com:
+#   corretagem: valor fixo (R$) por ordem (cobrado na compra e na venda)
+#   emolumentos_bps: taxas B3 (negociação + liquidação) em bps do valor de cada ordem
+#   slippage_bps: diferença de execução em bps do valor de cada ordem
+#   aliquota_ir: alíquota do IR sobre o ganho de capital líquido do mês
+#   isencao_mensal: vendas no mês até este valor (R$) têm ganho isento de IR
+MODELOS_CUSTO = {
+    "sem_custos": {
+        "corretagem": 0.0,
+        "emolumentos_bps": 0.0,
+        "slippage_bps": 0.0,
+        "aliquota_ir": 0.0,
+        "isencao_mensal": 0.0,
+    },
+    "padrao": {
+        "corretagem": 0.0,
+        "emolumentos_bps": 3.0,
+        "slippage_bps": 5.0,
+        "aliquota_ir": 0.15,
+        "isencao_mensal": 20000.0,
+    },
+    "corretora_tradicional": {
+        "corretagem": 4.90,
+        "emolumentos_bps": 3.0,
+        "slippage_bps": 5.0,
+        "aliquota_ir": 0.15,
+        "isencao_mensal": 20000.0,
+    },
+    "conservador": {
+        "corretagem": 4.90,
+        "emolumentos_bps": 3.0,
+        "slippage_bps": 10.0,
+        "aliquota_ir": 0.15,
+        "isencao_mensal": 0.0,
+    },
+}
+
+
+def resolve_cost_model(modelo):
+    """
+    Retorna o dict do modelo de custos. Aceita o nome de um modelo de
+    MODELOS_CUSTO ou um dict (campos ausentes ficam zerados).
+    """
+    if isinstance(modelo, str):
+        if modelo not in MODELOS_CUSTO:
+            raise ValueError(f"Modelo de custos desconhecido: {modelo}. Use um de {sorted(MODELOS_CUSTO)}")
+        return MODELOS_CUSTO[modelo]
+    return {**MODELOS_CUSTO["sem_custos"], **modelo}
+
+
+def trade_costs(valor_compra, valor_venda, modelo):
+    """Custos (R$) de cada trade: corretagem das duas ordens + custos proporcionais"""
+    proporcional = (modelo["emolumentos_bps"] + modelo["slippage_bps"]) / 10000.0
+    return 2 * modelo["corretagem"] + proporcional * (valor_compra + valor_venda)
+
+
+def monthly_tax(meses, resultado, vendas, modelo):
+    """
+    IR mensal sobre o ganho de capital, com compensação de prejuízos de meses
+    anteriores e isenção para meses com vendas até `isencao_mensal`.
+
+    Args:
+        meses: Array com o mês (ordenável) de venda de cada trade
+        resultado: Ganho/perda de capital (R$) de cada trade, já líquido de custos
+        vendas: Valor de venda (R$) de cada trade
+
+    Returns:
+        tuple: (meses únicos em ordem, imposto de cada mês)
+    """
+    unicos, grupo = np.unique(meses, return_inverse=True)
+    resultado_mes = np.bincount(grupo, weights=resultado, minlength=len(unicos))
+    vendas_mes = np.bincount(grupo, weights=vendas, minlength=len(unicos))
+
+    imposto = np.zeros(len(unicos))
+    if modelo["aliquota_ir"] <= 0:
+        return unicos, imposto
+
+    # O prejuízo acumulado depende dos meses anteriores: laço só sobre os meses
+    prejuizo = 0.0
+    for i in range(len(unicos)):
+        if resultado_mes[i] > 0 and vendas_mes[i] <= modelo["isencao_mensal"]:
+            continue
+        base = resultado_mes[i] + prejuizo
+        if base > 0:
+            imposto[i] = modelo["aliquota_ir"] * base
+            prejuizo = 0.0
+        else:
+            prejuizo = base
+    return unicos, imposto
+
+
+def apply_costs(trades_df, modelo, valor_investido):
+    """
+    Aplica custos e IR aos trades agendados, em operações sobre arrays.
+
+    Os custos de cada trade e o IR do mês (cobrado no último trade vendido no
+    mês) são descontados de Retorno(R$) e Retorno(%); as colunas Custos(R$) e
+    Imposto(R$) são adicionadas. Dividendos não entram na base do IR.
+
+    Args:
+        trades_df: DataFrame de trades (saída de schedule_trades)
+        modelo: Nome de um modelo de MODELOS_CUSTO ou dict com os parâmetros
+        valor_investido: Valor aplicado em cada trade
+
+    Returns:
+        DataFrame: Cópia dos trades com os retornos líquidos
+    """
+    modelo = resolve_cost_model(modelo)
+    df = trades_df.copy()
+    if df.empty:
+        df["Custos(R$)"] = []
+        df["Imposto(R$)"] = []
+        return df
+
+    ganho = df["RetornoValorizacaoTotal(R$)"].to_numpy(dtype=np.float64)
+    vendas = valor_investido + ganho
+    custos = trade_costs(valor_investido, vendas, modelo)
+
+    datas_venda = pd.to_datetime(df["DataVenda"])
+    meses = (datas_venda.dt.year * 12 + datas_venda.dt.month - 1).to_numpy(dtype=np.int64)
+    unicos, imposto_mes = monthly_tax(meses, ganho - custos, vendas, modelo)
+
+    # IR do mês vai para o trade com a última venda do mês (empate: o último na ordem)
+    imposto = np.zeros(len(df))
+    if imposto_mes.any():
+        ordem = np.lexsort((np.arange(len(df)), datas_venda.to_numpy(dtype="datetime64[D]"), meses))
+        ultimos = ordem[np.r_[meses[ordem][1:] != meses[ordem][:-1], True]]
+        imposto[ultimos] = imposto_mes[np.searchsorted(unicos, meses[ultimos])]
+
+    custos, imposto = np.round(custos, 2), np.round(imposto, 2)
+    desconto = custos + imposto
+    df["Custos(R$)"] = custos
+    df["Imposto(R$)"] = imposto
+    df["Retorno(R$)"] = np.round(df["Retorno(R$)"].to_numpy(dtype=np.float64) - desconto, 2)
+    df["Retorno(%)"] = (df["Retorno(%)"].to_numpy(dtype=np.float64) - desconto / valor_investido * 100).round(2).astype(np.float32)
+    if "ValorTotal(R$)" in df.columns:
+        df["ValorTotal(R$)"] = np.round(df["ValorTotal(R$)"].to_numpy(dtype=np.float64) - desconto, 2)
+    return df
@@ -1,16 +1,20 @@
-import requests
 import pandas as pd
 from itertools import chain
 from datetime import datetime, timedelta
 import os
 import json
 
-import yfinance as yf
+# requests e yfinance são importados apenas quando há download de fato,
+# para que leituras somente do cache não paguem o custo desses imports.
 
-from date_extensions import ajustar_periodos
+from event_store import EventStore, find_index, index_is_current
+from cache_manifest import (
+    TTL_ERRO, empty_ttl, events_key, get_manifest, panel_key, price_key, read_frame,
+)
 from collections import defaultdict
 
-def get_dividend_events(start, end, indice="ibovespa", min_dy=0.7, stock_filter=None):
+def get_dividend_events(start, end, indice="ibovespa", min_dy=0.7, stock_filter=None, usar_cache=True,
+                        gravar_cache=True):
     """
     Busca eventos de dividendos direto do StatusInvest.
     Filtra apenas DY >= min_dy (%).
@@ -22,6 +26,9 @@ def get_dividend_events(start, end, indice="ibovespa", min_dy=0.7, stock_filter=
         indice (str): Índice para filtrar (default: ibovespa)
         min_dy (float): Dividend Yield mínimo em % (default: 0.7)
         stock_filter (str): Código do ativo específico para filtrar (opcional)
+        usar_cache (bool): Se False, ignora o cache e consulta a API (o cache é regravado)
+        gravar_cache (bool): Se False, não grava o JSON, o manifesto nem o índice
+            (usado pelo caminho ao vivo do signal_service)
     """
     # Converte datas para datetime para manipulação
     start_date = pd.to_datetime(start)
@@ -45,39 +52,67 @@ def get_dividend_events(start, end, indice="ibovespa", min_dy=0.7, stock_filter=
     current_str = current_date.strftime("%Y-%m-%d")
     period_end_str = end_date.strftime("%Y-%m-%d")
     
-    # Nome do arquivo de cache para este período
+    # Nome do arquivo de cache para este período e sua entrada no manifesto
     cache_file = f'data_cache/dividend_events_{current_str}_{period_end_str}.json'
+    cache_key = events_key(current_str, period_end_str)
+    manifesto = get_manifest() if usar_cache or gravar_cache else None
+    entrada = manifesto.lookup(cache_key) if usar_cache else None
     
-    # Verifica se já temos os dados em cache
-    if os.path.exists(cache_file):
-        print(f"[INFO] Usando dados em cache para: {current_str} -> {period_end_str}")
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            response_data = json.load(f)
-    else:
+    # Consultas por ativo (ou sem o JSON exato em cache) usam o índice por
+    # ticker, se houver um gravado que cubra o período
+    if usar_cache and (stock_filter or entrada is None or entrada["status"] != "ok"):
+        diretorio = find_index(start_date, end_date)
+        if diretorio:
+            print(f"[INFO] Usando índice de eventos: {diretorio}")
+            store = EventStore.load(diretorio, tickers=[stock_filter] if stock_filter else None)
+            return _filter_events(store, stock_filter, start_date, end_date, min_dy)
+
+    response_data = None
+    buscado_em = datetime.now().isoformat(timespec="seconds")
+    if entrada is not None and entrada["status"] == "ok":
+        buscado_em = entrada["buscado_em"]
+        try:
+            with open(entrada["caminho"], 'r', encoding='utf-8') as f:
+                response_data = json.load(f)
+            print(f"[INFO] Usando dados em cache para: {current_str} -> {period_end_str}")
+        except FileNotFoundError:
+            print(f"[WARN] Arquivo do cache não existe mais: {entrada['caminho']}")
+            manifesto.remove(cache_key)
+            entrada = None
+
+    if entrada is not None and entrada["status"] == "erro":
+        # Falha recente registrada no manifesto: não repete a chamada até expirar
+        print(f"[WARN] StatusInvest falhou recentemente para {current_str} -> {period_end_str}; "
+              f"nova tentativa após {entrada['expira_em']}")
+    elif entrada is None:
+        import requests
+
         # Faz a requisição para o período
         url = f"https://statusinvest.com.br/acao/getearnings?IndiceCode={indice}&Filter=&Start={current_str}&End={period_end_str}"
         
         print(f"[INFO] Buscando proventos no StatusInvest: {current_str} -> {period_end_str}")
         
-        r = requests.get(url, headers=headers)
-        
-        if r.status_code != 200:
-            print(f"[ERRO] StatusInvest retornou {r.status_code}")
-            print(r.text[:300])
-        
         try:
+            r = requests.get(url, headers=headers)
+            
+            if r.status_code != 200:
+                raise ValueError(f"StatusInvest retornou {r.status_code}: {r.text[:300]}")
+
             response_data = r.json()
             
             # Salva a resposta completa no cache
-            os.makedirs('data_cache', exist_ok=True)
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(response_data, f, ensure_ascii=False, indent=2)
-                
-            print(f"[INFO] Dados salvos em cache: {cache_file}")
+            if gravar_cache:
+                os.makedirs('data_cache', exist_ok=True)
+                with open(cache_file, 'w', encoding='utf-8') as f:
+                    json.dump(response_data, f, ensure_ascii=False, indent=2)
+                manifesto.record(cache_key, "eventos", "ok", cache_file, inicio=current_str, fim=period_end_str)
+                    
+                print(f"[INFO] Dados salvos em cache: {cache_file}")
             
         except Exception as e:
             print(f"[ERRO] Falha ao processar resposta: {e}")
-            print(r.text[:300])
+            if gravar_cache:
+                manifesto.record(cache_key, "eventos", "erro", inicio=current_str, fim=period_end_str, ttl=TTL_ERRO)
     
     all_responses.append(response_data)
 
@@ -157,24 +192,8 @@ def get_dividend_events(start, end, indice="ibovespa", min_dy=0.7, stock_filter=
 
             eventos_consolidados.append(base)
 
-        eventos_raw = eventos_consolidados
-
-        # Filtra por ativo específico se solicitado
-        if stock_filter:
-            eventos_raw = [e for e in eventos_raw if e.get('code', '').upper() == stock_filter.upper()]
-        
-        # Filtra por DY mínimo
-        def parse_dy(dy_str):
-            try:
-                if isinstance(dy_str, (int, float)):
-                    return float(dy_str)
-                return float(str(dy_str).replace(',', '.'))
-            except (ValueError, TypeError):
-                return 0.0
-        
-        eventos_raw = [e for e in eventos_raw if parse_dy(e.get('dy', 0)) >= min_dy]
-        
-        all_events.extend(eventos_raw)
+        # Os filtros de ativo e DY são aplicados depois, pelo índice por ticker
+        all_events.extend(eventos_consolidados)
     
     if len(all_events) == 0:
         print("[WARN] Nenhum evento encontrado para o período")
@@ -196,15 +215,79 @@ def get_dividend_events(start, end, indice="ibovespa", min_dy=0.7, stock_filter=
     }
     
     df = df.rename(columns=colunas)
-    df = df.sort_values('DataCom', ascending=True)
-    
+    # Ordenação estável antes do filtro de DY: eventos com a mesma data com
+    # mantêm a ordem da API qualquer que seja min_dy (antes o filtro vinha
+    # primeiro e o sort instável podia trocar empates conforme o min_dy)
+    df = df.sort_values('DataCom', ascending=True, kind='stable').reset_index(drop=True)
+
+    # DataCom permanece como datetime64 e os números como float (ver schema.py).
+    # Grava o índice por ticker para que consultas futuras com stock_filter
+    # leiam apenas os eventos daquele ativo (só quando não existe ou é mais
+    # antigo que o JSON, para não regravá-lo a cada chamada).
+    store = EventStore(df)
+    if gravar_cache and not index_is_current(start, end, buscado_em):
+        try:
+            store.save(start, end, buscado_em=buscado_em)
+        except Exception as e:
+            print(f"[WARN] Falha ao gravar índice de eventos: {e}")
+
+    return _filter_events(store, stock_filter, None, None, min_dy)
+
+
+def _filter_events(store, stock_filter, start, end, min_dy):
+    """Consulta o índice de eventos e mostra os eventos encontrados"""
+    df = store.query(ticker=stock_filter, start=start, end=end, min_dy=min_dy)
+    if df.empty:
+        print("[WARN] Nenhum evento encontrado para o período")
+        return pd.DataFrame()
+
     # Mostra os eventos ordenados
     print("\n[INFO] Eventos de dividendos encontrados:")
-    for _, row in df.iterrows():
-        print(f"{row['Ativo']}: {row['DataCom'].strftime('%d/%m/%Y')} - DY: {row['DY']}% - Tipo: {row['Tipo']}")
-    
-    df['DataCom'] = df['DataCom'].dt.strftime('%d/%m/%Y')
-    
+    for ativo, data_com, dy, tipo in zip(df['Ativo'], df['DataCom'], df['DY'], df['Tipo']):
+        print(f"{ativo}: {data_com.strftime('%d/%m/%Y')} - DY: {dy}% - Tipo: {tipo}")
+
+    return df
+
+
+def _get_ticker(ticker):
+    """Cria o objeto do Yahoo Finance, importando o yfinance só quando necessário"""
+    import yfinance as yf
+    return yf.Ticker(ticker)
+
+
+def _cached_prices(chave, tipo, cache_file, ticker, inicio, fim, baixar):
+    """
+    Lê um histórico de preços pelo manifesto do cache ou baixa e registra.
+    Resultados vazios não viram arquivo: ficam no manifesto como "vazio" até
+    expirar (ver cache_manifest.empty_ttl).
+    """
+    manifesto = get_manifest()
+    entrada = manifesto.lookup(chave)
+    if entrada is not None and entrada["status"] != "ok":
+        print(f"[INFO] Sem dados de {ticker} em {inicio} (cache negativo até {entrada['expira_em']})")
+        return pd.DataFrame()
+    if entrada is not None:
+        try:
+            df = read_frame(entrada)
+            print(f"[INFO] Usando dados em cache para {ticker} em {inicio}")
+            return df
+        except FileNotFoundError:
+            manifesto.remove(chave)
+
+    try:
+        df = baixar()
+    except Exception:
+        manifesto.record(chave, tipo, "erro", ticker=ticker, inicio=inicio, fim=fim, ttl=TTL_ERRO)
+        raise
+
+    if df.empty:
+        manifesto.record(chave, tipo, "vazio", ticker=ticker, inicio=inicio, fim=fim, ttl=empty_ttl(fim or inicio))
+        return df
+
+    os.makedirs('data_cache', exist_ok=True)
+    df.to_csv(cache_file)
+    manifesto.record(chave, tipo, "ok", cache_file, ticker=ticker, inicio=inicio, fim=fim)
+    print(f"[INFO] Dados salvos em cache: {cache_file}")
     return df
 
 
@@ -219,12 +302,8 @@ def get_price_history(ticker, start_day, start_next, end_day, end_next):
         # Converte as datas de referência para datetime
         start_dt = pd.to_datetime(start_next)
         end_dt = pd.to_datetime(end_next)
-        ticker_obj = yf.Ticker(ticker)
+        ticker_obj = None
 
-        # Nome dos arquivos de cache
-        cache_start = f'data_cache/price_{ticker}_{start_next}.csv'
-        cache_end = f'data_cache/price_{ticker}_{end_next}.csv'
-        
         def process_dataframe(df):
             if not df.empty:
                 # Converte índice para datetime se necessário
@@ -234,33 +313,23 @@ def get_price_history(ticker, start_day, start_next, end_day, end_next):
                 df.index = df.index.tz_localize(None)
             return df
 
-        # Tenta carregar dados iniciais do cache
-        if os.path.exists(cache_start):
-            print(f"[INFO] Usando dados em cache para {ticker} em {start_next}")
-            df_start = pd.read_csv(cache_start, index_col=0, parse_dates=True)
-            df_start = process_dataframe(df_start)
-        else:
-            print(f"[INFO] Baixando dados de {start_next} para {ticker}...")
-            df_start = ticker_obj.history(start=start_next, end=(start_dt + timedelta(days=1)), interval="1h")
-            df_start = process_dataframe(df_start)
-            # Salva no cache (já com timezone removido)
-            os.makedirs('data_cache', exist_ok=True)
-            df_start.to_csv(cache_start)
-            print(f"[INFO] Dados salvos em cache: {cache_start}")
-        
-        # Tenta carregar dados finais do cache
-        if os.path.exists(cache_end):
-            print(f"[INFO] Usando dados em cache para {ticker} em {end_next}")
-            df_end = pd.read_csv(cache_end, index_col=0, parse_dates=True)
-            df_end = process_dataframe(df_end)
-        else:
-            print(f"[INFO] Baixando dados de {end_next} para {ticker}...")
-            df_end = ticker_obj.history(start=end_next, end=(end_dt + timedelta(days=1)), interval="1h")
-            df_end = process_dataframe(df_end)
-            # Salva no cache (já com timezone removido)
-            os.makedirs('data_cache', exist_ok=True)
-            df_end.to_csv(cache_end)
-            print(f"[INFO] Dados salvos em cache: {cache_end}")
+        def baixar(dia, dia_dt):
+            nonlocal ticker_obj
+            print(f"[INFO] Baixando dados de {dia} para {ticker}...")
+            ticker_obj = ticker_obj or _get_ticker(ticker)
+            return process_dataframe(ticker_obj.history(start=dia, end=(dia_dt + timedelta(days=1)), interval="1h"))
+
+        # Dados do dia inicial e do dia final, pelo manifesto do cache
+        df_start = _cached_prices(
+            price_key(ticker, start_next), "precos", f'data_cache/price_{ticker}_{start_next}.csv',
+            ticker, start_next, None, lambda: baixar(start_next, start_dt),
+        )
+        df_end = _cached_prices(
+            price_key(ticker, end_next), "precos", f'data_cache/price_{ticker}_{end_next}.csv',
+            ticker, end_next, None, lambda: baixar(end_next, end_dt),
+        )
+        df_start = process_dataframe(df_start)
+        df_end = process_dataframe(df_end)
         
         # Verifica cada DataFrame individualmente
         if df_start.empty and df_end.empty:
@@ -349,3 +418,127 @@ def get_price_history(ticker, start_day, start_next, end_day, end_next):
         except Exception as debug_e:
             print(f"[WARN] Erro ao coletar informações de debug: {debug_e}")
         return pd.DataFrame()
+
+
+def _preco_das_11h(df):
+    """Seleciona, para cada dia, o preço de abertura do candle mais próximo das 11h"""
+    if df.empty:
+        return pd.Series(dtype="float64")
+    df = df.copy()
+    df["_dia"] = df.index.normalize()
+    df["_dist"] = abs(df.index.hour - 11)
+    escolhidos = df.sort_values(["_dia", "_dist"]).groupby("_dia").head(1)
+    return escolhidos.set_index("_dia")["Open"].sort_index()
+
+
+# O Yahoo só serve candles de 1h dos últimos 730 dias, e no máximo 730 dias
+# por requisição: o painel é baixado em janelas deste tamanho
+MAX_DIAS_1H = 730
+
+
+def _janelas(inicio, fim, max_dias=MAX_DIAS_1H):
+    """Divide [inicio, fim] em janelas de até `max_dias` dias, a partir de `inicio`"""
+    janelas = []
+    atual = inicio
+    while atual <= fim:
+        ultimo = min(atual + timedelta(days=max_dias - 1), fim)
+        janelas.append((atual, ultimo))
+        atual = ultimo + timedelta(days=1)
+    return janelas
+
+
+def _cached_day_prices(ticker, inicio, fim):
+    """Candles já baixados dia a dia (get_price_history) do ticker no período"""
+    manifesto = get_manifest()
+    partes = []
+    for entrada in manifesto.entries("precos", ticker, inicio, fim):
+        try:
+            partes.append(read_frame(entrada))
+        except FileNotFoundError:
+            manifesto.remove(entrada["chave"])
+    return pd.concat(partes) if partes else pd.DataFrame()
+
+
+def get_price_panel(tickers, start, end):
+    """
+    Monta um painel de preços (dias × tickers) com o preço de abertura das
+    11h de cada dia (ou do horário mais próximo).
+
+    O histórico de cada ticker é baixado em janelas de até MAX_DIAS_1H dias
+    (cada uma com sua entrada no cache); janelas anteriores ao limite do Yahoo
+    não são pedidas. Os preços diários já em cache (get_price_history) também
+    entram no painel.
+
+    Args:
+        tickers: Lista de códigos dos ativos (sem o sufixo .SA)
+        start (str): Data inicial (YYYY-MM-DD)
+        end (str): Data final (YYYY-MM-DD)
+
+    Returns:
+        DataFrame: Índice de datas (sem horário) e uma coluna por ticker
+    """
+    inicio = pd.to_datetime(start).normalize()
+    fim = pd.to_datetime(end).normalize()
+    limite_yahoo = pd.Timestamp.today().normalize() - timedelta(days=MAX_DIAS_1H - 1)
+    janelas = [(i, f) for i, f in _janelas(inicio, fim) if f >= limite_yahoo]
+
+    series = {}
+    for ticker in sorted(set(tickers)):
+        simbolo = f"{ticker}.SA"
+        partes = [_cached_day_prices(simbolo, inicio.strftime("%Y-%m-%d"), fim.strftime("%Y-%m-%d"))]
+
+        for janela_inicio, janela_fim in janelas:
+            inicio_str = janela_inicio.strftime("%Y-%m-%d")
+            fim_str = janela_fim.strftime("%Y-%m-%d")
+
+            def baixar(inicio_str=inicio_str, janela_inicio=janela_inicio, janela_fim=janela_fim):
+                print(f"[INFO] Baixando histórico de {simbolo} ({inicio_str} -> {janela_fim.strftime('%Y-%m-%d')})...")
+                df = _get_ticker(simbolo).history(
+                    start=max(janela_inicio, limite_yahoo).strftime("%Y-%m-%d"),
+                    end=janela_fim + timedelta(days=1), interval="1h",
+                )
+                if not df.empty:
+                    df.index = pd.to_datetime(df.index).tz_localize(None)
+                return df
+
+            try:
+                partes.append(_cached_prices(
+                    panel_key(simbolo, inicio_str, fim_str), "painel",
+                    f'data_cache/panel_{simbolo}_{inicio_str}_{fim_str}.csv',
+                    simbolo, inicio_str, fim_str, baixar,
+                ))
+            except Exception as e:
+                print(f"[WARN] Falha ao montar painel de {ticker} ({inicio_str} -> {fim_str}): {e}")
+
+        partes = [p for p in partes if not p.empty]
+        if not partes:
+            series[ticker] = pd.Series(dtype="float64")
+            continue
+        df = pd.concat(partes)
+        if not isinstance(df.index, pd.DatetimeIndex):
+            df.index = pd.to_datetime(df.index)
+        df = df[~df.index.duplicated(keep="last")]
+        series[ticker] = _preco_das_11h(df[(df.index >= inicio) & (df.index < fim + timedelta(days=1))])
+
+    painel = pd.DataFrame(series)
+    painel.index = pd.DatetimeIndex(painel.index).normalize()
+    return painel.sort_index()
+
+
+def get_latest_quotes(tickers):
+    """
+    Busca a cotação mais recente (último candle de 1h dos últimos dias) de
+    cada ticker no Yahoo Finance. Não usa cache: é para consultas ao vivo.
+
+    Returns:
+        dict: ticker (sem .SA) -> último preço (tickers sem dados ficam de fora)
+    """
+    cotacoes = {}
+    for ticker in sorted(set(tickers)):
+        try:
+            df = _get_ticker(f"{ticker}.SA").history(period="5d", interval="1h")
+            if not df.empty:
+                cotacoes[ticker] = float(df["Close"].iloc[-1])
+        except Exception as e:
+            print(f"[WARN] Falha ao buscar cotação de {ticker}: {e}")
+    return cotacoes
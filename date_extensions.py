@@ -93,4 +93,41 @@ def ajustar_periodos(start, end, days_before, days_after):
     end_next = end_next.strftime('%Y-%m-%d')
 
     print(start_day, start_next, end_day, end_next)
-    return start_day, start_next, end_day, end_next
\ No newline at end of file
+    return start_day, start_next, end_day, end_next
+
+
+def calendario_dias_uteis(start, end):
+    """
+    Retorna os dias úteis (sem fins de semana e feriados nacionais) entre
+    `start` e `end`, inclusive, como DatetimeIndex.
+    """
+    dias = pd.date_range(pd.to_datetime(start).normalize(), pd.to_datetime(end).normalize(), freq="D")
+    feriados = set()
+    for ano in range(dias[0].year, dias[-1].year + 1):
+        feriados.update(get_feriados_nacionais(ano))
+    uteis = (dias.weekday < 5) & ~pd.Index(dias.date).isin(feriados)
+    return dias[uteis]
+
+
+def mapear_dias_uteis(dias_corridos, dias_uteis):
+    """
+    Para cada dia corrido, calcula a posição (em `dias_uteis`) do dia útil
+    anterior ou igual e do dia útil seguinte ou igual. É a versão vetorizada
+    de ajustar_para_dia_util (mover_para_frente=False / True).
+
+    Returns:
+        Tupla de arrays (anterior, seguinte); -1 quando não existe dia útil
+        dentro do intervalo.
+    """
+    import numpy as np
+
+    dias_corridos = pd.DatetimeIndex(dias_corridos)
+    posicao = pd.DatetimeIndex(dias_uteis).get_indexer(dias_corridos)
+
+    anterior = np.maximum.accumulate(np.where(posicao >= 0, posicao, -1))
+
+    invertido = np.where(posicao >= 0, posicao, np.iinfo(np.int64).max)[::-1]
+    seguinte = np.minimum.accumulate(invertido)[::-1]
+    seguinte = np.where(seguinte == np.iinfo(np.int64).max, -1, seguinte)
+
+    return anterior, seguinte
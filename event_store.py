@@ -0,0 +1,166 @@
+import glob
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from schema import normalize_events
+
+INDEX_DIR = os.path.join("data_cache", "event_index")
+
+
+class EventStore:
+    """
+    Índice de eventos de dividendos organizado por ticker e, dentro de cada
+    ticker, por DataCom. Consultas por ticker/janela/DY tocam só a fatia do
+    ticker (busca binária nas datas), sem varrer os demais eventos.
+    """
+
+    def __init__(self, eventos):
+        eventos = normalize_events(eventos)
+        if eventos.empty:
+            self.eventos = eventos
+            self._fatias = {}
+            self._datas = np.array([], dtype=np.int64)
+            return
+
+        # _ordem guarda a ordem original (DataCom estável), usada nas respostas
+        if "_ordem" not in eventos.columns:
+            eventos = eventos.assign(_ordem=np.arange(len(eventos)))
+        eventos = eventos.assign(Ativo=eventos["Ativo"].astype(str))
+        self.eventos = eventos.sort_values(["Ativo", "DataCom"], kind="stable").reset_index(drop=True)
+        self._datas = self.eventos["DataCom"].to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+        # Início/fim (exclusivo) da fatia de cada ticker no DataFrame ordenado
+        ativos = self.eventos["Ativo"].to_numpy()
+        tickers, inicios = np.unique(ativos, return_index=True)
+        fins = np.append(inicios[1:], len(ativos))
+        self._fatias = {t: (i, f) for t, i, f in zip(tickers, inicios, fins)}
+
+    @property
+    def tickers(self):
+        return sorted(self._fatias)
+
+    def query(self, ticker=None, start=None, end=None, min_dy=0.0):
+        """
+        Retorna os eventos filtrados, ordenados por DataCom.
+
+        Args:
+            ticker: Código do ativo (None para todos)
+            start, end: Janela de DataCom (inclusive)
+            min_dy: DY mínimo em %
+        """
+        if self.eventos.empty:
+            return pd.DataFrame()
+
+        if ticker is not None:
+            fatias = [self._fatias.get(ticker.upper(), (0, 0))]
+        else:
+            fatias = list(self._fatias.values())
+
+        inicio = None if start is None else pd.Timestamp(start).to_datetime64().astype("datetime64[D]").astype(np.int64)
+        fim = None if end is None else pd.Timestamp(end).to_datetime64().astype("datetime64[D]").astype(np.int64)
+
+        indices = []
+        for a, b in fatias:
+            datas = self._datas[a:b]
+            lo = a if inicio is None else a + np.searchsorted(datas, inicio, side="left")
+            hi = b if fim is None else a + np.searchsorted(datas, fim, side="right")
+            indices.append(np.arange(lo, hi))
+
+        indices = np.concatenate(indices) if indices else np.array([], dtype=np.int64)
+        resultado = self.eventos.iloc[indices]
+        resultado = resultado[resultado["DY"] >= min_dy]
+        resultado = resultado.sort_values("_ordem", kind="stable").drop(columns="_ordem").reset_index(drop=True)
+        return normalize_events(resultado)
+
+    def save(self, start, end, base_dir=INDEX_DIR, buscado_em=None):
+        """
+        Grava o índice em disco: um CSV por ticker mais um _index.json com a
+        janela coberta, quando os eventos foram buscados e o intervalo de
+        datas de cada ticker.
+        """
+        diretorio = index_path(start, end, base_dir)
+        os.makedirs(diretorio, exist_ok=True)
+
+        resumo = {}
+        for ticker, (a, b) in self._fatias.items():
+            fatia = self.eventos.iloc[a:b]
+            fatia.to_csv(os.path.join(diretorio, f"{ticker}.csv"), index=False, date_format="%Y-%m-%d")
+            resumo[ticker] = {
+                "eventos": int(b - a),
+                "primeira_data_com": fatia["DataCom"].iloc[0].strftime("%Y-%m-%d"),
+                "ultima_data_com": fatia["DataCom"].iloc[-1].strftime("%Y-%m-%d"),
+            }
+
+        meta = {
+            "start": pd.to_datetime(start).strftime("%Y-%m-%d"),
+            "end": pd.to_datetime(end).strftime("%Y-%m-%d"),
+            "buscado_em": buscado_em or datetime.now().isoformat(timespec="seconds"),
+            "tickers": resumo,
+        }
+        with open(os.path.join(diretorio, "_index.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        return diretorio
+
+    @classmethod
+    def load(cls, diretorio, tickers=None):
+        """Carrega o índice do disco; com `tickers`, lê apenas os CSVs desses tickers"""
+        with open(os.path.join(diretorio, "_index.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+
+        selecionados = meta["tickers"] if tickers is None else [t.upper() for t in tickers if t.upper() in meta["tickers"]]
+        partes = [pd.read_csv(os.path.join(diretorio, f"{t}.csv")) for t in selecionados]
+        return cls(pd.concat(partes, ignore_index=True) if partes else pd.DataFrame())
+
+
+def index_path(start, end, base_dir=INDEX_DIR):
+    """Diretório do índice para uma janela"""
+    start_str = pd.to_datetime(start).strftime("%Y-%m-%d")
+    end_str = pd.to_datetime(end).strftime("%Y-%m-%d")
+    return os.path.join(base_dir, f"{start_str}_{end_str}")
+
+
+def index_fetched_at(diretorio):
+    """Quando os eventos do índice foram buscados (índices antigos: data do _index.json)"""
+    arquivo = os.path.join(diretorio, "_index.json")
+    try:
+        with open(arquivo, encoding="utf-8") as f:
+            buscado_em = json.load(f).get("buscado_em")
+        if buscado_em:
+            return pd.Timestamp(buscado_em)
+        return pd.Timestamp(os.path.getmtime(arquivo), unit="s")
+    except (OSError, ValueError):
+        return None
+
+
+def index_is_current(start, end, buscado_em, base_dir=INDEX_DIR):
+    """True se o índice da janela existe e foi gravado com eventos buscados em `buscado_em` ou depois"""
+    gravado = index_fetched_at(index_path(start, end, base_dir))
+    return gravado is not None and gravado >= pd.Timestamp(buscado_em)
+
+
+def find_index(start, end, base_dir=INDEX_DIR):
+    """
+    Procura um índice gravado cuja janela cobre [start, end] (o mais estreito).
+    Índices buscados antes do fim da janela pedida são ignorados: eventos
+    anunciados depois da busca não estariam neles.
+    """
+    start, end = pd.to_datetime(start), pd.to_datetime(end)
+    melhor = None
+    for arquivo in glob.glob(os.path.join(base_dir, "*", "_index.json")):
+        diretorio = os.path.dirname(arquivo)
+        nome = os.path.basename(diretorio)
+        try:
+            inicio, fim = (pd.to_datetime(d) for d in nome.split("_"))
+        except ValueError:
+            continue
+        if inicio > start or fim < end or (melhor is not None and fim - inicio >= melhor[0]):
+            continue
+        buscado_em = index_fetched_at(diretorio)
+        if buscado_em is None or buscado_em.normalize() < end:
+            continue
+        melhor = (fim - inicio, diretorio)
+    return None if melhor is None else melhor[1]
@@ -1,7 +1,8 @@
 import pandas as pd
 import os
+from kernels import capital_path
 
-def save_trades_to_csv(df, min_dy, days_before, days_after, allow_overlap, capital):
+def save_trades_to_csv(df, min_dy, days_before, days_after, allow_overlap, capital, custos=None, stock_filter=None):
     """
     Salva os trades em um arquivo CSV com nome baseado nos parâmetros.
     
@@ -11,15 +12,15 @@ def save_trades_to_csv(df, min_dy, days_before, days_after, allow_overlap, capit
         days_before: Dias antes da data ex para compra
         days_after: Dias depois da data ex para venda
         allow_overlap: Se foi permitida sobreposição de datas
+        custos: Nome do modelo de custos aplicado (entra no nome do arquivo,
+                exceto "sem_custos", para manter o nome dos arquivos sem custos)
+        stock_filter: Ativo da execução, se restrita a um ativo (entra no nome do arquivo)
     """
-    acumulado = []
-
-    for _, trade in df.iterrows():
-        retorno_total_reais = trade["Retorno(R$)"]
-        capital += retorno_total_reais
-        acumulado.append(capital)
-        
-    df["CapitalAcumulado(R$)"] = acumulado
+    # Capital acumulado: capital inicial + soma corrida dos retornos (float64)
+    if df.empty:
+        df["CapitalAcumulado(R$)"] = []
+    else:
+        df["CapitalAcumulado(R$)"] = capital_path(df["Retorno(R$)"].to_numpy(dtype="float64"), capital)
 
 
     
@@ -29,10 +30,12 @@ def save_trades_to_csv(df, min_dy, days_before, days_after, allow_overlap, capit
         
         # Gera nome do arquivo com os parâmetros
         overlap_str = "com_sobreposicao" if allow_overlap else "sem_sobreposicao"
-        output_file = f"trades/trades_dy{min_dy}_diasAntes{days_before}_diasDepois{days_after}_{overlap_str}.csv"
+        custos_str = f"_custos_{custos}" if custos and custos != "sem_custos" else ""
+        ativo_str = f"_{stock_filter.upper()}" if stock_filter else ""
+        output_file = f"trades/trades{ativo_str}_dy{min_dy}_diasAntes{days_before}_diasDepois{days_after}_{overlap_str}{custos_str}.csv"
         
-        # Salva o DataFrame
-        df.to_csv(output_file, index=False, sep=';', encoding='utf-8-sig')
+        # Salva o DataFrame (datas no formato ISO, uma única conversão na escrita)
+        df.to_csv(output_file, index=False, sep=';', encoding='utf-8-sig', date_format='%Y-%m-%d')
         print(f"[INFO] Dados salvos em: {output_file}")
         
         return output_file
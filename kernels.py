@@ -0,0 +1,103 @@
+# kernels.py
+# Kernels dos laços sequenciais do pipeline (agendamento sem sobreposição,
+# capital acumulado e capital mínimo), operando sobre arrays simples:
+# datas como int64 (dias desde 1970-01-01) e retornos como float64.
+#
+# Se o Numba estiver instalado, os kernels são compilados (JIT); senão, é
+# usada a implementação em NumPy/Python puro, com o mesmo resultado.
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_DISPONIVEL = True
+except ImportError:  # Numba é opcional
+    NUMBA_DISPONIVEL = False
+
+# Marca datas inválidas (NaT) nos arrays de dias
+DIA_INVALIDO = np.iinfo(np.int64).min
+
+
+def _schedule_mask_py(compra, venda, allow_overlap, ultima_venda):
+    selecionados = np.zeros(len(compra), dtype=np.bool_)
+    for i in range(len(compra)):
+        if compra[i] == DIA_INVALIDO or venda[i] == DIA_INVALIDO:
+            continue
+        if allow_overlap or ultima_venda == DIA_INVALIDO or compra[i] > ultima_venda:
+            selecionados[i] = True
+            ultima_venda = venda[i]
+    return selecionados
+
+
+def _capital_path_py(retornos, capital_inicial):
+    # cumsum do NumPy soma em sequência, igual a `capital += retorno` em laço
+    return np.cumsum(np.concatenate((np.array([capital_inicial], dtype=np.float64), retornos)))[1:]
+
+
+def _capital_min_py(capital, capital_inicial):
+    if len(capital) == 0:
+        return capital_inicial
+    return min(capital_inicial, float(capital.min()))
+
+
+if NUMBA_DISPONIVEL:
+    _schedule_mask_jit = njit(cache=True)(_schedule_mask_py)
+
+    @njit(cache=True)
+    def _capital_path_jit(retornos, capital_inicial):
+        capital = np.empty(len(retornos), dtype=np.float64)
+        atual = capital_inicial
+        for i in range(len(retornos)):
+            atual += retornos[i]
+            capital[i] = atual
+        return capital
+
+    @njit(cache=True)
+    def _capital_min_jit(capital, capital_inicial):
+        minimo = capital_inicial
+        for i in range(len(capital)):
+            if capital[i] < minimo:
+                minimo = capital[i]
+        return minimo
+
+
+def schedule_mask(compra, venda, allow_overlap=False, ultima_venda=DIA_INVALIDO, usar_jit=True):
+    """
+    Seleciona os trades (na ordem recebida) com as regras de schedule_trades.
+
+    Args:
+        compra, venda: Arrays int64 com os dias de compra/venda (DIA_INVALIDO para NaT)
+        allow_overlap: Se True, seleciona todos os trades com datas válidas
+        ultima_venda: Dia da última venda já agendada (continuação de cronograma)
+
+    Returns:
+        np.ndarray: Máscara booleana dos trades selecionados
+    """
+    compra = np.ascontiguousarray(compra, dtype=np.int64)
+    venda = np.ascontiguousarray(venda, dtype=np.int64)
+    if usar_jit and NUMBA_DISPONIVEL:
+        return _schedule_mask_jit(compra, venda, bool(allow_overlap), np.int64(ultima_venda))
+    return _schedule_mask_py(compra.tolist(), venda.tolist(), bool(allow_overlap), int(ultima_venda))
+
+
+def capital_path(retornos, capital_inicial, usar_jit=True):
+    """Capital acumulado após cada trade (capital inicial + retornos em sequência)"""
+    retornos = np.ascontiguousarray(retornos, dtype=np.float64)
+    if usar_jit and NUMBA_DISPONIVEL:
+        return _capital_path_jit(retornos, float(capital_inicial))
+    return _capital_path_py(retornos, float(capital_inicial))
+
+
+def capital_min(capital, capital_inicial, usar_jit=True):
+    """Menor capital do caminho, considerando o capital inicial"""
+    capital = np.ascontiguousarray(capital, dtype=np.float64)
+    if usar_jit and NUMBA_DISPONIVEL:
+        return float(_capital_min_jit(capital, float(capital_inicial)))
+    return _capital_min_py(capital, float(capital_inicial))
+
+
+def dates_to_kernel_days(datas):
+    """Converte datas (Series/array datetime64) para int64 em dias, com NaT -> DIA_INVALIDO"""
+    dias = np.asarray(datas, dtype="datetime64[D]")
+    resultado = dias.astype(np.int64)
+    resultado[np.isnat(dias)] = DIA_INVALIDO
+    return resultado
@@ -1,25 +1,67 @@
-from data_fetcher import get_dividend_events
-from analyzer import rank_best_trades
-from scheduler import schedule_trades
-from backtester import run_backtest
-from plotter import plot_equity_curve
-from file_utils import save_trades_to_csv
+import argparse
+import os
+import time
+
+
+def _inicio_processo():
+    """
+    Instante (time.time) em que o processo foi criado, lido de /proc/self/stat,
+    para que o orçamento inclua a inicialização do interpretador e os imports.
+    Sem /proc (ex.: Windows/macOS), o tempo passa a contar do import deste módulo.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Os campos após o nome do executável (entre parênteses) começam no 3º;
+            # starttime é o 22º, em ticks do relógio desde o boot
+            campos = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + int(campos[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.time()
+
+
+# Marca o início do processo para medir o tempo até a primeira saída
+_INICIO_PROCESSO = _inicio_processo()
+
+# Orçamento (em segundos) para a primeira saída de comandos que só usam cache
+ORCAMENTO_INICIALIZACAO = 1.0
+
+# Parâmetros padrão da estratégia (usados pelo CLI e por run_strategy)
+PADROES = {
+    "min_dy": 2.5,
+    "days_before": 18,
+    "days_after": 25,
+    "allow_overlap": True,
+    "valor_investido": 1000,
+    "start": "2023-10-27",
+    "end": "2025-10-29",
+    "custos": None,
+}
 
 def run_strategy(
-    min_dy=2.5,          # DY mínimo
-    days_before=18,       # Dias antes da data ex para compra
-    days_after=25,        # Dias depois da data ex para venda
-    allow_overlap=True, # Se permite sobreposição de datas
-    valor_investido=1000,# Capital inicial para backtest
-    start="2023-10-27", # Data inicial
-    end="2025-10-29",   # Data final
-    verbose=True        # Se deve imprimir mensagens de progresso
+    min_dy=PADROES["min_dy"],                    # DY mínimo
+    days_before=PADROES["days_before"],          # Dias antes da data ex para compra
+    days_after=PADROES["days_after"],            # Dias depois da data ex para venda
+    allow_overlap=PADROES["allow_overlap"],      # Se permite sobreposição de datas
+    valor_investido=PADROES["valor_investido"],  # Capital inicial para backtest
+    start=PADROES["start"],                      # Data inicial
+    end=PADROES["end"],                          # Data final
+    verbose=True,       # Se deve imprimir mensagens de progresso
+    grafico=None,       # Arquivo (.png/.svg) para salvar o gráfico sem abrir janela
+    snapshot=None,      # Diretório de um snapshot (ver `prepare`) para rodar sem rede
+    stock_filter=None,  # Código de um ativo para rodar só com os eventos dele
+    custos=PADROES["custos"]  # Modelo de custos/IR (nome em costs.MODELOS_CUSTO ou dict); None = sem custos
 ):
     """
     Executa a estratégia de dividendos com os parâmetros especificados.
     
+    Os módulos pesados (requests, yfinance, matplotlib) são importados aqui
+    dentro, para que importar este módulo (ex.: pelo optimizer ou pelo CLI)
+    não pague esse custo.
+
     Returns:
-        tuple: (capital_final, histórico, arquivo_csv)
+        tuple: (capital_final, capital_minimo, histórico, arquivo_csv)
     """
     if verbose:
         print("=== Estratégia de Dividendos B3 ===")
@@ -30,28 +72,81 @@ def run_strategy(
         print(f"- Overlap: {'Sim' if allow_overlap else 'Não'}")
         print(f"- Capital inicial: R$ {valor_investido:.2f}")
         print(f"- Período: {start} até {end}")
+        if stock_filter:
+            print(f"- Ativo: {stock_filter}")
+        if custos:
+            print(f"- Custos: {custos}")
+
+    agendados = schedule_strategy(min_dy, days_before, days_after, allow_overlap, valor_investido, start, end,
+                                  verbose=verbose, snapshot=snapshot, stock_filter=stock_filter)
+    return evaluate_schedule(agendados, min_dy, days_before, days_after, allow_overlap, valor_investido,
+                             verbose=verbose, grafico=grafico, stock_filter=stock_filter, custos=custos)
+
+
+def schedule_strategy(min_dy, days_before, days_after, allow_overlap, valor_investido, start, end,
+                      verbose=True, snapshot=None, stock_filter=None):
+    """
+    Busca os eventos, simula os trades e monta o cronograma, sem custos. O
+    cronograma não depende do modelo de custos: a otimização o monta uma vez
+    e o avalia com cada modelo (ver evaluate_schedule).
+
+    Returns:
+        DataFrame: Trades agendados
+    """
+    from data_fetcher import get_dividend_events
+    from analyzer import rank_best_trades
+    from scheduler import schedule_trades
+
+    if snapshot:
+        from snapshot import load_snapshot, snapshot_events, snapshot_trades
+        snap = load_snapshot(snapshot)
 
     if verbose:
         print("\n🔍 Buscando eventos de dividendos...")
-    eventos = get_dividend_events(start, end, min_dy=min_dy)
-    # eventos = get_dividend_events(start, end, min_dy=min_dy, stock_filter="TOTS3")
+    if snapshot:
+        eventos = snapshot_events(snap, start, end, min_dy=min_dy, stock_filter=stock_filter)
+    else:
+        eventos = get_dividend_events(start, end, min_dy=min_dy, stock_filter=stock_filter)
     if verbose:
         print(f"{len(eventos)} eventos encontrados.")
 
     if verbose:
         print("\n📈 Simulando operações...")
-    trades = rank_best_trades(eventos, days_before, days_after, valor_investido)
+    if snapshot:
+        trades = snapshot_trades(snap, eventos, days_before, days_after, valor_investido)
+    else:
+        trades = rank_best_trades(eventos, days_before, days_after, valor_investido)
     if verbose:
         print(f"Trades gerados: {len(trades)}")
 
     if verbose:
         print(f"\n🧮 Montando cronograma {'COM' if allow_overlap else 'SEM'} sobreposição...")
-    agendados = schedule_trades(trades, allow_overlap)
+    agendados = schedule_trades(trades, allow_overlap, verbose=verbose)
     if verbose:
         print(f"Trades agendados: {len(agendados)}")
+    return agendados
+
+
+def evaluate_schedule(agendados, min_dy, days_before, days_after, allow_overlap, valor_investido,
+                      verbose=True, grafico=None, stock_filter=None, custos=None):
+    """
+    Aplica custos/IR ao cronograma, salva os trades em CSV e roda o backtest.
+
+    Returns:
+        tuple: (capital_final, capital_minimo, histórico, arquivo_csv)
+    """
+    from backtester import run_backtest
+    from file_utils import save_trades_to_csv
+
+    if custos:
+        from costs import apply_costs
+        agendados = apply_costs(agendados, custos, valor_investido)
+        if verbose and not agendados.empty:
+            print(f"Custos: R$ {agendados['Custos(R$)'].sum():.2f} | IR: R$ {agendados['Imposto(R$)'].sum():.2f}")
 
     # Salva os trades agendados em CSV com nome personalizado
-    output_file = save_trades_to_csv(agendados, min_dy, days_before, days_after, allow_overlap, valor_investido)
+    output_file = save_trades_to_csv(agendados, min_dy, days_before, days_after, allow_overlap, valor_investido,
+                                     custos=custos if isinstance(custos, str) else None, stock_filter=stock_filter)
     if output_file and verbose:
         print(f"💾 Trades salvos em: {output_file}")
 
@@ -60,14 +155,250 @@ def run_strategy(
     capital_final, capital_min, hist = run_backtest(agendados, verbose, valor_investido)
     if verbose:
         print(f"Capital final: R$ {capital_final:.2f}")
-        plot_equity_curve(hist)
-        print("📊 Gráfico gerado.")
+    if verbose or grafico:
+        from plotter import plot_equity_curve
+        arquivo_grafico = plot_equity_curve(hist, output_file=grafico)
+        if verbose:
+            print(f"📊 Gráfico gerado{f': {arquivo_grafico}' if arquivo_grafico else '.'}")
     
     return capital_final, capital_min, hist, output_file
 
-def main():
-    """Executa a estratégia com os parâmetros padrão"""
-    capital_final,capital_min, hist, output_file = run_strategy()
-    
+def tempo_desde_inicio():
+    """Retorna os segundos decorridos desde o início do processo"""
+    return time.time() - _INICIO_PROCESSO
+
+
+def verificar_orcamento(etapa, orcamento=ORCAMENTO_INICIALIZACAO, detalhar=True):
+    """
+    Mede o tempo até a primeira saída e avisa se passou do orçamento. Com
+    detalhar=False, só imprime quando o orçamento é estourado.
+    """
+    decorrido = tempo_desde_inicio()
+    if decorrido > orcamento:
+        print(f"[WARN] {etapa}: primeira saída em {decorrido * 1000:.0f} ms (orçamento: {orcamento * 1000:.0f} ms)")
+    elif detalhar:
+        print(f"[INFO] {etapa}: primeira saída em {decorrido * 1000:.0f} ms")
+    return decorrido
+
+
+def cmd_run(args):
+    """Subcomando `run`: executa a estratégia com os parâmetros informados"""
+    run_strategy(
+        min_dy=args.min_dy,
+        days_before=args.days_before,
+        days_after=args.days_after,
+        allow_overlap=args.allow_overlap,
+        valor_investido=args.valor_investido,
+        start=args.start,
+        end=args.end,
+        verbose=not args.quiet,
+        grafico=args.grafico,
+        snapshot=args.snapshot,
+        stock_filter=args.ativo,
+        custos=args.custos,
+    )
+
+
+def cmd_optimize(args):
+    """Subcomando `optimize`: executa a otimização de parâmetros"""
+    from optimizer import PARAMETROS, run_optimization
+    params = {**PARAMETROS, "custos": args.custos} if args.custos else None
+    run_optimization(start_date=args.start, end_date=args.end, snapshot=args.snapshot,
+                     incremental=args.incremental, stock_filter=args.ativo,
+                     ordem=args.ordem, chunk_size=args.lote, poda=args.poda, params=params)
+
+
+def cmd_prepare(args):
+    """Subcomando `prepare`: grava o snapshot com eventos, preços e calendário"""
+    from snapshot import prepare_snapshot
+    prepare_snapshot(args.start, args.end, output_dir=args.saida)
+
+
+def cmd_fetch(args):
+    """Subcomando `fetch`: baixa (ou aquece o cache de) eventos e, opcionalmente, preços"""
+    from data_fetcher import get_dividend_events
+    eventos = get_dividend_events(args.start, args.end, min_dy=args.min_dy, stock_filter=args.ativo)
+    print(f"{len(eventos)} eventos disponíveis.")
+
+    if args.precos and not eventos.empty:
+        from analyzer import rank_best_trades
+        trades = rank_best_trades(eventos, args.days_before, args.days_after, PADROES["valor_investido"])
+        print(f"Preços em cache para {len(trades)} trades.")
+
+
+def cmd_report(args):
+    """Subcomando `report`: resume um arquivo de resultados da otimização (somente cache)"""
+    import glob
+
+    arquivo = args.arquivo
+    if arquivo is None:
+        candidatos = sorted(glob.glob(os.path.join("optimization", "results_*.csv")))
+        if not candidatos:
+            print("[WARN] Nenhum resultado de otimização encontrado em optimization/")
+            return
+        arquivo = candidatos[-1]
+
+    print(f"📄 Relatório de: {arquivo}")
+    verificar_orcamento("report", detalhar=args.timing)
+
+    import pandas as pd
+    df = pd.read_csv(arquivo)
+    if df.empty:
+        print("[WARN] Arquivo de resultados vazio.")
+        return
+
+    print(f"\n🔢 Combinações avaliadas: {len(df)}")
+    print(f"\n🏆 Top {args.top} por CapitalAcumulado(R$):")
+    print(df.sort_values("CapitalAcumulado(R$)", ascending=False).head(args.top).to_string(index=False))
+    print(f"\n🏆 Top {args.top} por CapitalAcumuladoMinimo(R$):")
+    print(df.sort_values("CapitalAcumuladoMinimo(R$)", ascending=False).head(args.top).to_string(index=False))
+
+    if args.robustez:
+        from robustness import analyze_top_results
+        print(f"\n🎲 Robustez ({args.metodo}, {args.simulacoes} simulações) dos top {args.robustez}:")
+        robustez = analyze_top_results(arquivo, top_n=args.robustez, n_sims=args.simulacoes, metodo=args.metodo)
+        print(robustez.to_string(index=False))
+
+    if args.graficos:
+        from plotter import render_top_results
+        render_top_results(arquivo, top_n=args.graficos, output_dir=args.pasta_graficos, formato=args.formato)
+
+
+def cmd_serve(args):
+    """Subcomando `serve`: sobe o serviço HTTP/JSON de sinais de entrada/saída"""
+    from signal_service import SignalService, serve
+    servico = SignalService(
+        min_dy=args.min_dy,
+        days_before=args.days_before,
+        days_after=args.days_after,
+        allow_overlap=args.allow_overlap,
+        valor_investido=args.valor_investido,
+    )
+    serve(servico, host=args.host, porta=args.porta, intervalo=args.intervalo)
+
+
+def cmd_cache(args):
+    """Subcomando `cache`: relatório e manutenção do data_cache via manifesto"""
+    from cache_manifest import get_manifest
+    manifesto = get_manifest()
+
+    if args.acao == "reindex":
+        manifesto.reindex()
+    elif args.acao == "compact":
+        manifesto.compact()
+    elif args.acao == "evict":
+        manifesto.evict(int(args.max_mb * 1e6))
+
+    resumo = manifesto.stats()
+    if args.acao == "stats":
+        # Só o relatório é somente leitura; as ações de manutenção mexem nos arquivos
+        verificar_orcamento("cache", detalhar=False)
+    if resumo.empty:
+        print("[INFO] Cache vazio.")
+        return
+    print("\n📦 Cache (data_cache):")
+    print(resumo.to_string(index=False))
+    total = resumo["tamanho"].sum()
+    print(f"\nTotal: {resumo['entradas'].sum()} entradas, {total / 1e6:.1f} MB")
+
+
+def _adicionar_periodo(parser):
+    parser.add_argument("--start", default=PADROES["start"], help="Data inicial (YYYY-MM-DD)")
+    parser.add_argument("--end", default=PADROES["end"], help="Data final (YYYY-MM-DD)")
+
+
+def _adicionar_parametros(parser):
+    _adicionar_periodo(parser)
+    parser.add_argument("--ativo", help="Restringe aos eventos de um ativo (ex.: TOTS3)")
+    parser.add_argument("--min-dy", type=float, default=PADROES["min_dy"], help="DY mínimo (%%)")
+    parser.add_argument("--days-before", type=int, default=PADROES["days_before"], help="Dias antes da data com para compra")
+    parser.add_argument("--days-after", type=int, default=PADROES["days_after"], help="Dias depois da data com para venda")
+
+
+def build_parser():
+    """Monta o parser de argumentos do CLI"""
+    parser = argparse.ArgumentParser(description="Estratégia de Dividendos B3")
+    sub = parser.add_subparsers(dest="comando")
+
+    p_run = sub.add_parser("run", help="Executa a estratégia")
+    _adicionar_parametros(p_run)
+    p_run.add_argument("--valor-investido", type=float, default=PADROES["valor_investido"], help="Capital inicial")
+    overlap = p_run.add_mutually_exclusive_group()
+    overlap.add_argument("--overlap", dest="allow_overlap", action="store_true", help="Permite sobreposição de trades")
+    overlap.add_argument("--no-overlap", dest="allow_overlap", action="store_false", help="Não permite sobreposição de trades")
+    p_run.set_defaults(allow_overlap=PADROES["allow_overlap"])
+    p_run.add_argument("--quiet", action="store_true", help="Não imprime progresso nem exibe gráfico")
+    p_run.add_argument("--grafico", help="Salva o gráfico em arquivo (.png/.svg) sem abrir janela")
+    p_run.add_argument("--snapshot", help="Roda a partir de um snapshot gerado por `prepare`")
+    p_run.add_argument("--custos", default=PADROES["custos"], help="Modelo de custos/IR (sem_custos, padrao, corretora_tradicional, conservador)")
+    p_run.set_defaults(func=cmd_run)
+
+    p_opt = sub.add_parser("optimize", help="Executa a otimização de parâmetros")
+    _adicionar_periodo(p_opt)
+    p_opt.add_argument("--snapshot", help="Roda a partir de um snapshot gerado por `prepare`")
+    p_opt.add_argument("--ativo", help="Varredura só com os eventos de um ativo (ex.: TOTS3)")
+    p_opt.add_argument("--incremental", action="store_true", help="Atualiza só o que mudou desde a última execução")
+    p_opt.add_argument("--ordem", choices=["sequencial", "grosso_para_fino"], default="sequencial",
+                       help="Ordem de avaliação da grade (grosso_para_fino cobre o espaço todo primeiro)")
+    p_opt.add_argument("--lote", type=int, default=50, help="Combinações por lote (resultados gravados a cada lote)")
+    p_opt.add_argument("--poda", type=float, default=None,
+                       help="Pula combinações cujos vizinhos ficaram abaixo desta fração do melhor capital (ex.: 0.8)")
+    p_opt.add_argument("--custos", nargs="+",
+                       help="Modelos de custos/IR a varrer (substitui a dimensão 'custos' da grade)")
+    p_opt.set_defaults(func=cmd_optimize)
+
+    p_prepare = sub.add_parser("prepare", help="Grava um snapshot com eventos, preços e calendário")
+    _adicionar_periodo(p_prepare)
+    p_prepare.add_argument("--saida", help="Diretório do snapshot (padrão: data_cache/snapshot_v<versão>_<start>_<end>)")
+    p_prepare.set_defaults(func=cmd_prepare)
+
+    p_fetch = sub.add_parser("fetch", help="Baixa eventos (e preços) para o cache")
+    _adicionar_parametros(p_fetch)
+    p_fetch.add_argument("--precos", action="store_true", help="Também baixa os preços de compra/venda")
+    p_fetch.set_defaults(func=cmd_fetch)
+
+    p_report = sub.add_parser("report", help="Resume os resultados de uma otimização")
+    p_report.add_argument("arquivo", nargs="?", help="CSV de resultados (padrão: o mais recente)")
+    p_report.add_argument("--top", type=int, default=5, help="Quantidade de resultados exibidos")
+    p_report.add_argument("--graficos", type=int, default=0, help="Renderiza os gráficos dos N melhores resultados")
+    p_report.add_argument("--pasta-graficos", default="charts", help="Pasta de saída dos gráficos")
+    p_report.add_argument("--formato", choices=["png", "svg"], default="png", help="Formato dos gráficos")
+    p_report.add_argument("--robustez", type=int, default=0, help="Roda bootstrap/Monte Carlo nos N melhores resultados")
+    p_report.add_argument("--metodo", choices=["bootstrap", "permutacao", "bloco_mensal"], default="bootstrap", help="Método de reamostragem")
+    p_report.add_argument("--simulacoes", type=int, default=5000, help="Quantidade de simulações")
+    p_report.add_argument("--timing", action="store_true", help="Mostra o tempo até a primeira saída mesmo dentro do orçamento")
+    p_report.set_defaults(func=cmd_report)
+
+    p_serve = sub.add_parser("serve", help="Sobe o serviço de sinais (HTTP/JSON) com estado em memória")
+    p_serve.add_argument("--min-dy", type=float, default=PADROES["min_dy"], help="DY mínimo (%%)")
+    p_serve.add_argument("--days-before", type=int, default=PADROES["days_before"], help="Dias antes da data com para compra")
+    p_serve.add_argument("--days-after", type=int, default=PADROES["days_after"], help="Dias depois da data com para venda")
+    p_serve.add_argument("--valor-investido", type=float, default=PADROES["valor_investido"], help="Capital inicial")
+    p_serve.add_argument("--no-overlap", dest="allow_overlap", action="store_false", help="Não permite sobreposição de trades")
+    p_serve.set_defaults(allow_overlap=PADROES["allow_overlap"])
+    p_serve.add_argument("--host", default="127.0.0.1", help="Endereço do servidor")
+    p_serve.add_argument("--porta", type=int, default=8765, help="Porta do servidor")
+    p_serve.add_argument("--intervalo", type=int, default=900, help="Intervalo entre atualizações (segundos)")
+    p_serve.set_defaults(func=cmd_serve)
+
+    p_cache = sub.add_parser("cache", help="Relatório e manutenção do cache (stats, compact, evict, reindex)")
+    p_cache.add_argument("acao", nargs="?", choices=["stats", "compact", "evict", "reindex"], default="stats",
+                         help="stats: resumo; compact: junta os CSVs de preço por ticker; "
+                              "evict: apaga os menos usados até --max-mb; reindex: reconstrói o manifesto")
+    p_cache.add_argument("--max-mb", type=float, default=500, help="Tamanho máximo do cache para `evict` (MB)")
+    p_cache.set_defaults(func=cmd_cache)
+
+    return parser
+
+
+def main(argv=None):
+    """Ponto de entrada do CLI. Sem subcomando, executa `run` com os parâmetros padrão."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.comando is None:
+        args = parser.parse_args(["run"])
+    args.func(args)
+
+
 if __name__ == "__main__":
     main()
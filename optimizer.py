@@ -1,32 +1,185 @@
+import numpy as np
 import pandas as pd
 import itertools
 import os
 import time
 from datetime import datetime, timedelta
-from main import run_strategy
+from main import evaluate_schedule, schedule_strategy
+from schema import parse_dates
 
 
-def generate_parameter_combinations():
+# Grade padrão da otimização
+PARAMETROS = {
+    'min_dy': [0.5, 0.7, 0.9, 1.1, 1.3, 1.5, 1.7,2.0],
+    'days_before': [1, 2, 3, 5, 7, 10, 12, 15, 18, 20, 25],
+    'days_after': [1, 2, 3, 5, 7, 10, 12, 15, 18, 20, 25],
+    'allow_overlap': [False, True],
+    'valor_investido': [1000],
+    # Sem custos, como o padrão de run_strategy; modelos com custos/IR são
+    # opcionais (--custos padrao ...)
+    'custos': ['sem_custos']
+}
+# PARAMETROS = {
+#     'min_dy': [0.5, 0.7],
+#     'days_before': [1, 2],
+#     'days_after': [1, 2],
+#     'allow_overlap': [True],
+#     'valor_investido': [1000],
+#     'custos': ['sem_custos', 'padrao']
+# }
+
+ORDENS = ("sequencial", "grosso_para_fino")
+
+
+def generate_parameter_combinations(params=None):
     """Gera todas as combinações de parâmetros a serem testadas"""
-    params = {
-        'min_dy': [0.5, 0.7, 0.9, 1.1, 1.3, 1.5, 1.7,2.0],
-        'days_before': [1, 2, 3, 5, 7, 10, 12, 15, 18, 20, 25],
-        'days_after': [1, 2, 3, 5, 7, 10, 12, 15, 18, 20, 25],
-        'allow_overlap': [False, True],
-        'valor_investido': [1000]
-    }
-    # params = {
-    #     'min_dy': [0.5, 0.7],
-    #     'days_before': [1, 2],
-    #     'days_after': [1, 2],
-    #     'allow_overlap': [True],
-    #     'valor_investido': [1000]
-    # }
+    return list(iter_parameter_combinations(params))
+
+
+def count_parameter_combinations(params=None):
+    """Quantidade de combinações da grade, sem gerá-las"""
+    total = 1
+    for valores in (params or PARAMETROS).values():
+        total *= len(valores)
+    return total
+
+
+def _axis_levels(n):
+    """
+    Nível de refinamento de cada índice de um eixo: extremos no nível 0,
+    ponto do meio no nível 1, meios das metades no nível 2, e assim por diante.
+    """
+    niveis = [0] * n
+    if n <= 2:
+        return niveis
+    intervalos = [(0, n - 1, 1)]
+    while intervalos:
+        a, b, nivel = intervalos.pop()
+        meio = (a + b) // 2
+        if meio in (a, b):
+            continue
+        niveis[meio] = nivel
+        intervalos.append((a, meio, nivel + 1))
+        intervalos.append((meio, b, nivel + 1))
+    return niveis
+
+
+def iter_parameter_combinations(params=None, ordem="sequencial"):
+    """
+    Gera as combinações de parâmetros sob demanda (sem montar a lista inteira).
+
+    Args:
+        params: Grade {parâmetro: [valores]} (padrão: PARAMETROS)
+        ordem: "sequencial" (produto cartesiano na ordem da grade) ou
+               "grosso_para_fino" (primeiro os extremos de cada eixo, depois os
+               pontos do meio, refinando a cada nível), para que resultados
+               parciais já cubram todo o espaço.
+    """
+    params = params or PARAMETROS
+    if ordem not in ORDENS:
+        raise ValueError(f"Ordem inválida: {ordem}. Use uma de {ORDENS}")
+
+    keys = list(params.keys())
+    if ordem == "sequencial":
+        for v in itertools.product(*params.values()):
+            yield dict(zip(keys, v))
+        return
+
+    niveis = [_axis_levels(len(valores)) for valores in params.values()]
+    nivel_maximo = max((max(n) for n in niveis if n), default=0)
+    for nivel in range(nivel_maximo + 1):
+        # Índices de cada eixo até este nível; só emite combinações novas (algum eixo no nível atual)
+        indices = [[i for i, n in enumerate(eixo) if n <= nivel] for eixo in niveis]
+        for combinacao in itertools.product(*indices):
+            if max(niveis[k][i] for k, i in enumerate(combinacao)) == nivel:
+                yield {key: params[key][i] for key, i in zip(keys, combinacao)}
+
+
+def iter_schedule_groups(params=None, ordem="sequencial"):
+    """
+    Gera as combinações agrupadas pelo cronograma: cada grupo tem os mesmos
+    parâmetros exceto `custos`, que não muda o cronograma (só os retornos
+    líquidos), então ele é montado uma vez por grupo.
+    """
+    params = params or PARAMETROS
+    if 'custos' not in params:
+        for combinacao in iter_parameter_combinations(params, ordem):
+            yield [combinacao]
+        return
+
+    base = {k: v for k, v in params.items() if k != 'custos'}
+    for combinacao in iter_parameter_combinations(base, ordem):
+        yield [{**combinacao, 'custos': modelo} for modelo in params['custos']]
+
+
+def iter_chunks(iteravel, tamanho):
+    """Agrupa um iterável em listas de até `tamanho` itens, sob demanda"""
+    iterador = iter(iteravel)
+    while True:
+        lote = list(itertools.islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+# Eixos que não são comparáveis entre si na poda: o capital só é comparado
+# dentro da mesma fatia (mesmo overlap, modelo de custos e valor investido)
+EIXOS_FATIA = ('allow_overlap', 'custos', 'valor_investido')
+
+
+def _slice_key(params):
+    """Chave da fatia categórica de uma combinação (ver EIXOS_FATIA)"""
+    return tuple(params.get(eixo) for eixo in EIXOS_FATIA)
+
+
+def _pruning_axes(grade):
+    """Eixos numéricos (com ao menos 3 valores) em que a poda procura vizinhos"""
+    return [
+        eixo for eixo, valores in grade.items()
+        if eixo not in EIXOS_FATIA and len(valores) >= 3 and not isinstance(valores[0], (bool, str))
+    ]
+
+
+def is_dominated(params, avaliados, fator, grade=None, melhores=None):
+    """
+    Poda: indica se a região de `params` já foi dominada por resultados
+    anteriores da mesma fatia (EIXOS_FATIA). Para cada eixo numérico, procura
+    os vizinhos já avaliados imediatamente abaixo e acima (com os demais
+    parâmetros iguais); se houver pelo menos dois vizinhos e todos ficaram
+    abaixo de `fator` × melhor capital da fatia, a combinação é pulada.
 
+    Args:
+        params: Combinação candidata
+        avaliados: dict chave da combinação -> capital final
+        fator: Fração do melhor capital abaixo da qual a região é descartada
+        grade: Grade {parâmetro: [valores]} (padrão: PARAMETROS)
+        melhores: dict fatia -> melhor capital (calculado de `avaliados` se None)
+    """
+    if not avaliados:
+        return False
+    grade = grade or PARAMETROS
+    fatia = _slice_key(params)
+    if melhores is None:
+        melhores = {}
+        for chave, capital in avaliados.items():
+            k = _slice_key(dict(chave))
+            melhores[k] = max(capital, melhores.get(k, capital))
+    if fatia not in melhores:
+        return False
+    melhor = melhores[fatia]
 
-    keys = params.keys()
-    combinations = [dict(zip(keys, v)) for v in itertools.product(*params.values())]
-    return combinations
+    vizinhos = []
+    for eixo in _pruning_axes(grade):
+        ordenados = sorted(grade[eixo])
+        posicao = ordenados.index(params[eixo])
+        for direcao in (range(posicao - 1, -1, -1), range(posicao + 1, len(ordenados))):
+            for j in direcao:
+                chave = _combination_key({**params, eixo: ordenados[j]})
+                if chave in avaliados:
+                    vizinhos.append(avaliados[chave])
+                    break
+
+    return len(vizinhos) >= 2 and max(vizinhos) < fator * melhor
 
 
 def init_results_file():
@@ -38,7 +191,7 @@ def init_results_file():
         
         headers = [
             'min_dy', 'days_before', 'days_after', 'allow_overlap',
-            'valor_investido', 'CapitalAcumulado(R$)','CapitalAcumuladoMinimo(R$)', 'retorno_percentual', 'csv_file'
+            'valor_investido', 'custos', 'CapitalAcumulado(R$)','CapitalAcumuladoMinimo(R$)', 'retorno_percentual', 'csv_file'
         ]
         pd.DataFrame(columns=headers).to_csv(filename, index=False)
         return filename
@@ -49,14 +202,20 @@ def init_results_file():
 
 def save_result(filename, result):
     """Salva um único resultado no arquivo CSV"""
+    save_results(filename, [result])
+
+
+def save_results(filename, results):
+    """Salva um lote de resultados no arquivo CSV (uma leitura/escrita por lote)"""
     try:
         df = pd.read_csv(filename)
-        df_new = pd.concat([df, pd.DataFrame([result])], ignore_index=True)
+        df_new = pd.concat([df, pd.DataFrame(results)], ignore_index=True)
         df_new.to_csv(filename, index=False)
 
-        capital_final = result['CapitalAcumulado(R$)']
-        retorno = result['retorno_percentual']
-        print(f"💾 Resultado salvo: R$ {capital_final:.2f} ({retorno:.2f}%)")
+        for result in results:
+            capital_final = result['CapitalAcumulado(R$)']
+            retorno = result['retorno_percentual']
+            print(f"💾 Resultado salvo: R$ {capital_final:.2f} ({retorno:.2f}%)")
 
         top_results = df_new.sort_values('CapitalAcumulado(R$)', ascending=False).head()
         print("\n🏆 Top 5 até agora:")
@@ -80,67 +239,385 @@ def save_result(filename, result):
         print(f"[ERRO] Falha ao salvar resultado: {e}")
 
 
-def run_optimization(start_date="2023-10-27", end_date="2025-10-30"):
-    """Executa a otimização testando várias combinações de parâmetros"""
+def run_optimization(start_date="2023-10-27", end_date="2025-10-30", snapshot=None, incremental=False,
+                     stock_filter=None, ordem="sequencial", chunk_size=50, poda=None, params=None):
+    """
+    Executa a otimização testando várias combinações de parâmetros.
+
+    Args:
+        snapshot: Diretório de um snapshot (ver snapshot.prepare_snapshot). Se
+                  informado, todas as combinações leem eventos e preços dele.
+        incremental: Se True, reaproveita o estado da execução anterior e
+                     avalia só os eventos/preços novos (ver run_incremental_optimization).
+        stock_filter: Código de um ativo para otimizar só com os eventos dele
+        ordem: Ordem de avaliação da grade ("sequencial" ou "grosso_para_fino")
+        chunk_size: Combinações avaliadas por lote (resultados gravados a cada lote)
+        poda: Fração do melhor capital (ex.: 0.8) abaixo da qual combinações
+              cercadas por vizinhos piores são puladas (ver is_dominated).
+              None desativa a poda.
+        params: Grade {parâmetro: [valores]} (padrão: PARAMETROS)
+    """
+    if incremental:
+        return run_incremental_optimization(start_date, end_date, snapshot=snapshot, stock_filter=stock_filter,
+                                            params=params)
+
     print("=== Otimização de Parâmetros ===")
 
     results_file = init_results_file()
     if not results_file:
         return None
 
-    combinations = generate_parameter_combinations()
-    total = len(combinations)
-    print(f"\n🔢 Total de combinações: {total}")
+    params = params or PARAMETROS
+    total = count_parameter_combinations(params)
+    print(f"\n🔢 Total de combinações: {total} (ordem: {ordem}, lotes de {chunk_size})")
 
     start_time = time.time()
     estimated_avg_time = None
+    avaliados = {}
+    melhores = {}
+    i = 0
+    podadas = 0
+    # Cronograma (sem custos) da última combinação avaliada; as combinações que
+    # só diferem em custos vêm em sequência e o reaproveitam
+    chave_agendados, agendados = None, None
 
-    for i, params in enumerate(combinations, 1):
-        print(f"\n➡️  Testando combinação {i}/{total} ({i / total * 100:.1f}%)")
-        print(f"Parâmetros: {params}")
+    combinacoes = itertools.chain.from_iterable(iter_schedule_groups(params, ordem))
+    for lote in iter_chunks(combinacoes, chunk_size):
+        results = []
+        for combinacao in lote:
+            i += 1
+            if poda is not None and is_dominated(combinacao, avaliados, poda, params, melhores):
+                podadas += 1
+                print(f"\n✂️  Combinação {i}/{total} podada (vizinhos abaixo de {poda:.0%} do melhor da fatia): {combinacao}")
+                continue
+
+            print(f"\n➡️  Testando combinação {i}/{total} ({i / total * 100:.1f}%)")
+            print(f"Parâmetros: {combinacao}")
+
+            try:
+                iteration_start = time.time()
+
+                cronograma = {k: v for k, v in combinacao.items() if k != 'custos'}
+                if _combination_key(cronograma) != chave_agendados:
+                    agendados = schedule_strategy(
+                        **cronograma,
+                        start=start_date,
+                        end=end_date,
+                        verbose=False,
+                        snapshot=snapshot,
+                        stock_filter=stock_filter
+                    )
+                    chave_agendados = _combination_key(cronograma)
+
+                capital_final,capital_min, _, csv_file = evaluate_schedule(
+                    agendados, **combinacao, verbose=False, stock_filter=stock_filter
+                )
+
+                results.append({
+                    **combinacao,
+                    'CapitalAcumulado(R$)': capital_final,
+                    'CapitalAcumuladoMinimo(R$)': capital_min,
+                    'retorno_percentual': ((capital_final - combinacao['valor_investido']) / combinacao['valor_investido']) * 100,
+                    'csv_file': csv_file
+                })
+                avaliados[_combination_key(combinacao)] = capital_final
+                fatia = _slice_key(combinacao)
+                melhores[fatia] = max(capital_final, melhores.get(fatia, capital_final))
+
+                iteration_time = time.time() - iteration_start
+
+                # Atualiza tempo médio estimado
+                avaliadas = len(avaliados)
+                if estimated_avg_time is None:
+                    estimated_avg_time = iteration_time
+                else:
+                    estimated_avg_time = (estimated_avg_time * (avaliadas - 1) + iteration_time) / avaliadas
+
+                # Calcula tempo restante (limite superior: a poda pode pular parte delas)
+                elapsed = time.time() - start_time
+                remaining = (total - i) * estimated_avg_time
+                eta = datetime.now() + timedelta(seconds=remaining)
+
+                print(f"⏱️ Tempo da iteração: {iteration_time:.2f}s | Média: {estimated_avg_time:.2f}s")
+                print(f"⏳ Tempo total decorrido: {elapsed/60:.1f} min")
+                print(f"🕒 Estimado restante: {remaining/60:.1f} min (termina ~{eta.strftime('%H:%M:%S')})")
+
+            except Exception as e:
+                print(f"[ERRO] Falha ao testar combinação: {e}")
+                continue
+
+        if results:
+            save_results(results_file, results)
+
+    total_time = time.time() - start_time
+    print(f"\n✅ Otimização concluída! Tempo total: {total_time/60:.1f} min")
+    if poda is not None:
+        print(f"✂️  Combinações podadas: {podadas}/{total}")
+    print(f"Resultados salvos em: {results_file}")
+    return results_file
+
+
+ESTADO_INCREMENTAL = 'optimization/estado_incremental.pkl'
+VERSAO_ESTADO = 2
+
+
+def _combination_key(params):
+    """Chave estável de uma combinação de parâmetros"""
+    return tuple(sorted(params.items()))
 
-        try:
-            iteration_start = time.time()
-
-            capital_final,capital_min, _, csv_file = run_strategy(
-                **params,
-                start=start_date,
-                end=end_date,
-                verbose=False
-            )
-
-            result = {
-                **params,
-                'CapitalAcumulado(R$)': capital_final,
-                'CapitalAcumuladoMinimo(R$)': capital_min,
-                'retorno_percentual': ((capital_final - params['valor_investido']) / params['valor_investido']) * 100,
-                'csv_file': csv_file
-            }
-            save_result(results_file, result)
-
-            iteration_time = time.time() - iteration_start
-
-            # Atualiza tempo médio estimado
-            if estimated_avg_time is None:
-                estimated_avg_time = iteration_time
-            else:
-                estimated_avg_time = (estimated_avg_time * (i - 1) + iteration_time) / i
-
-            # Calcula tempo restante
-            elapsed = time.time() - start_time
-            remaining = (total - i) * estimated_avg_time
-            eta = datetime.now() + timedelta(seconds=remaining)
-
-            print(f"⏱️ Tempo da iteração: {iteration_time:.2f}s | Média: {estimated_avg_time:.2f}s")
-            print(f"⏳ Tempo total decorrido: {elapsed/60:.1f} min")
-            print(f"🕒 Estimado restante: {remaining/60:.1f} min (termina ~{eta.strftime('%H:%M:%S')})")
 
+def _event_keys(eventos):
+    """
+    Chave de cada evento: hash estável (uint64, igual entre processos) do
+    ticker, da data com e dos valores (DY, ValorDividendo, Tipo). Um evento
+    revisado (ex.: JCP anunciado depois para a mesma data com) muda de chave.
+    """
+    colunas = pd.DataFrame({
+        "Ativo": eventos["Ativo"].astype(str).to_numpy(),
+        "DataCom": parse_dates(eventos["DataCom"]).to_numpy(),
+        "DY": eventos["DY"].to_numpy(dtype="float64"),
+        "ValorDividendo": eventos["ValorDividendo"].to_numpy(dtype="float64"),
+        "Tipo": eventos["Tipo"].astype(str).to_numpy() if "Tipo" in eventos.columns else "",
+    })
+    return pd.util.hash_pandas_object(colunas, index=False).to_numpy()
+
+
+def load_incremental_state(state_file, start_date, end_date=None):
+    """Carrega o estado incremental, descartando-o se for de outro período/versão"""
+    import pickle
+
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, 'rb') as f:
+                estado = pickle.load(f)
+            if (estado.get("versao") == VERSAO_ESTADO and estado.get("start") == start_date
+                    and estado.get("end") == end_date):
+                return estado
+            print("[INFO] Estado incremental de outro período/versão, recomeçando do zero.")
         except Exception as e:
-            print(f"[ERRO] Falha ao testar combinação: {e}")
+            print(f"[WARN] Falha ao ler estado incremental: {e}")
+
+    return {"versao": VERSAO_ESTADO, "start": start_date, "end": end_date, "candidatos": {}, "combinacoes": {}}
+
+
+def save_incremental_state(state_file, estado):
+    """Grava o estado incremental (escrita atômica)"""
+    import pickle
+
+    os.makedirs(os.path.dirname(state_file) or '.', exist_ok=True)
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(estado, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, state_file)
+
+
+def _update_candidates(estado, eventos, janela, snap=None):
+    """
+    Avalia apenas os eventos ainda não avaliados com sucesso para a janela
+    (days_before, days_after, valor_investido). Eventos sem preço continuam
+    pendentes e são tentados de novo quando chegarem novos dias de preço.
+    Trades de eventos que sumiram ou foram revisados (chave que não está mais
+    em `eventos`) são descartados.
+
+    Returns:
+        DataFrame: Trades alterados desta janela (novos e descartados; vazio se
+                   não houver), usados para saber de onde reagendar
+    """
+    from analyzer import rank_best_trades
+
+    days_before, days_after, valor_investido = janela
+    candidatos = estado["candidatos"].setdefault(janela, {"avaliados": set(), "trades": None})
+
+    chaves = _event_keys(eventos) if not eventos.empty else np.array([], dtype=np.uint64)
+    atuais = set(chaves.tolist())
+
+    removidos = pd.DataFrame()
+    if candidatos["trades"] is not None:
+        sumiram = ~candidatos["trades"]["ChaveEvento"].isin(atuais)
+        removidos = candidatos["trades"][sumiram]
+        candidatos["trades"] = candidatos["trades"][~sumiram].reset_index(drop=True)
+    candidatos["avaliados"] &= atuais
+
+    pendentes = np.array([chave not in candidatos["avaliados"] for chave in chaves.tolist()], dtype=bool)
+    novos_eventos = eventos[pendentes] if len(eventos) else eventos
+    novos = pd.DataFrame()
+    if not novos_eventos.empty:
+        if snap is not None:
+            from snapshot import snapshot_trades
+            novos = snapshot_trades(snap, novos_eventos, days_before, days_after, valor_investido, leve=True)
+        else:
+            novos = rank_best_trades(novos_eventos, days_before, days_after, valor_investido, leve=True)
+
+    if not novos.empty:
+        # Os trades leves não têm ValorDividendo/Tipo: a chave vem do evento de origem
+        origem = pd.DataFrame({
+            "Ticker": novos_eventos["Ativo"].astype(str).to_numpy(),
+            "DataCom": parse_dates(novos_eventos["DataCom"]).to_numpy(),
+            "ChaveEvento": chaves[pendentes],
+        }).drop_duplicates(["Ticker", "DataCom"], keep="last")
+        novos = novos.assign(Ticker=novos["Ticker"].astype(str)).merge(origem, on=["Ticker", "DataCom"], how="left")
+        candidatos["avaliados"].update(novos["ChaveEvento"].tolist())
+        todos = novos if candidatos["trades"] is None else pd.concat([candidatos["trades"], novos])
+        todos["Ticker"] = todos["Ticker"].astype("category")
+        # Mesma ordem dos eventos (DataCom e, nos empates, a ordem de
+        # get_dividend_events), como no cronograma de uma execução completa
+        posicao = dict(zip(chaves.tolist(), range(len(chaves))))
+        ordem = np.argsort(todos["ChaveEvento"].map(posicao).to_numpy(), kind="stable")
+        candidatos["trades"] = todos.iloc[ordem].reset_index(drop=True)
+
+    alterados = [p[["DataCom", "DY"]] for p in (novos, removidos) if not p.empty]
+    return pd.concat(alterados, ignore_index=True) if alterados else pd.DataFrame()
+
+
+def _update_combination(estado, params, alterados, results_csv=True, stock_filter=None):
+    """
+    Atualiza o cronograma de uma combinação a partir dos trades alterados
+    (novos ou descartados) da sua janela. Se todos são posteriores ao último
+    agendado, o cronograma e o capital apenas continuam; senão, o prefixo
+    anterior à primeira data alterada é mantido e só o restante é reagendado.
+
+    Returns:
+        dict: Estado da combinação
+    """
+    from scheduler import schedule_trades
+    from file_utils import save_trades_to_csv
+    from kernels import capital_path
+
+    chave = _combination_key(params)
+    janela = (params['days_before'], params['days_after'], params['valor_investido'])
+    valor_investido = params['valor_investido']
+    combinacao = estado["combinacoes"].get(chave)
+
+    if not alterados.empty:
+        alterados = alterados[alterados["DY"] >= params['min_dy']]
+    if combinacao is not None and alterados.empty:
+        return combinacao
+
+    candidatos = estado["candidatos"][janela]["trades"]
+    candidatos = candidatos[candidatos["DY"] >= params['min_dy']] if candidatos is not None else pd.DataFrame()
+
+    if combinacao is None or combinacao["agendados"].empty:
+        prefixo = pd.DataFrame()
+        restante = candidatos
+    else:
+        primeira_alterada = alterados["DataCom"].min()
+        agendados = combinacao["agendados"]
+        prefixo = agendados[agendados["DataCom"] < primeira_alterada]
+        restante = candidatos[candidatos["DataCom"] >= primeira_alterada]
+
+    last_sell = None if prefixo.empty else prefixo["DataVenda"].iloc[-1]
+    capital = valor_investido if prefixo.empty else prefixo["CapitalAcumulado(R$)"].iloc[-1]
+
+    extensao = schedule_trades(restante, params['allow_overlap'], last_sell_date=last_sell, verbose=False)
+    if not extensao.empty:
+        extensao = extensao.copy()
+        extensao["CapitalAcumulado(R$)"] = capital_path(extensao["Retorno(R$)"].to_numpy(dtype="float64"), capital)
+
+    partes = [p for p in (prefixo, extensao) if not p.empty]
+    agendados = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+    # O cronograma guardado é bruto; custos e IR (que dependem do mês inteiro)
+    # são aplicados sobre o cronograma completo a cada atualização
+    liquidos = agendados
+    custos = params.get('custos')
+    if custos and not agendados.empty:
+        from costs import apply_costs
+        liquidos = apply_costs(agendados, custos, valor_investido)
+        liquidos["CapitalAcumulado(R$)"] = capital_path(liquidos["Retorno(R$)"].to_numpy(dtype="float64"), valor_investido)
+
+    capital_final = valor_investido if liquidos.empty else liquidos["CapitalAcumulado(R$)"].iloc[-1]
+    capital_min = valor_investido if liquidos.empty else min(valor_investido, liquidos["CapitalAcumulado(R$)"].min())
+
+    csv_file = combinacao["csv_file"] if combinacao else None
+    if results_csv and not liquidos.empty:
+        csv_file = save_trades_to_csv(
+            liquidos.drop(columns="ChaveEvento", errors="ignore"), params['min_dy'], params['days_before'], params['days_after'],
+            params['allow_overlap'], valor_investido, custos=custos if isinstance(custos, str) else None,
+            stock_filter=stock_filter
+        )
+
+    combinacao = {
+        "agendados": agendados,
+        "capital": capital_final,
+        "capital_min": capital_min,
+        "csv_file": csv_file,
+    }
+    estado["combinacoes"][chave] = combinacao
+    return combinacao
+
+
+def run_incremental_optimization(start_date="2023-10-27", end_date="2025-10-30", snapshot=None,
+                                 state_file=ESTADO_INCREMENTAL, stock_filter=None, params=None):
+    """
+    Otimização incremental: guarda, por janela (days_before, days_after), os
+    trades já avaliados e, por combinação, o cronograma, o capital e o capital
+    mínimo. A cada execução só os eventos novos ou revisados (ou que antes não
+    tinham preço) são avaliados; trades de eventos removidos/revisados são
+    descartados e cada combinação reagenda só a partir da primeira data alterada.
+    O estado é descartado quando start_date ou end_date mudam.
+
+    Na primeira execução (sem estado) equivale a uma varredura completa.
+    Com stock_filter, o estado é separado por ativo.
+    """
+    print("=== Otimização de Parâmetros (incremental) ===")
+    start_time = time.time()
+
+    combinations = generate_parameter_combinations(params)
+    min_dy = min(p['min_dy'] for p in combinations)
+
+    snap = None
+    if snapshot:
+        from snapshot import load_snapshot, snapshot_events
+        snap = load_snapshot(snapshot)
+        eventos = snapshot_events(snap, start_date, end_date, min_dy=min_dy, stock_filter=stock_filter)
+    else:
+        from data_fetcher import get_dividend_events
+        eventos = get_dividend_events(start_date, end_date, min_dy=min_dy, stock_filter=stock_filter)
+
+    if stock_filter:
+        state_file = state_file.replace('.pkl', f'_{stock_filter.upper()}.pkl')
+    estado = load_incremental_state(state_file, start_date, end_date)
+
+    alterados_por_janela = {}
+    for janela in sorted({(p['days_before'], p['days_after'], p['valor_investido']) for p in combinations}):
+        alterados_por_janela[janela] = _update_candidates(estado, eventos, janela, snap)
+
+    total_alterados = sum(len(n) for n in alterados_por_janela.values())
+    print(f"\n🆕 Trades novos/descartados: {total_alterados}")
+
+    results_file = init_results_file()
+    if not results_file:
+        return None
+
+    resultados = []
+    atualizadas = 0
+    for params in combinations:
+        janela = (params['days_before'], params['days_after'], params['valor_investido'])
+        if janela not in estado["candidatos"]:
             continue
+        antes = estado["combinacoes"].get(_combination_key(params))
+        combinacao = _update_combination(estado, params, alterados_por_janela[janela], stock_filter=stock_filter)
+        atualizadas += combinacao is not antes
+
+        resultados.append({
+            **params,
+            'CapitalAcumulado(R$)': combinacao["capital"],
+            'CapitalAcumuladoMinimo(R$)': combinacao["capital_min"],
+            'retorno_percentual': ((combinacao["capital"] - params['valor_investido']) / params['valor_investido']) * 100,
+            'csv_file': combinacao["csv_file"],
+        })
+
+    save_incremental_state(state_file, estado)
+
+    df = pd.DataFrame(resultados)
+    df.to_csv(results_file, index=False)
+
+    if not df.empty:
+        print("\n🏆 Top 5:")
+        print(df.sort_values('CapitalAcumulado(R$)', ascending=False).head().to_string(index=False))
 
     total_time = time.time() - start_time
-    print(f"\n✅ Otimização concluída! Tempo total: {total_time/60:.1f} min")
+    print(f"\n✅ Atualização incremental concluída! {atualizadas}/{len(combinations)} combinações atualizadas em {total_time:.1f}s")
     print(f"Resultados salvos em: {results_file}")
     return results_file
 
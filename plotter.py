@@ -1,33 +1,181 @@
-import matplotlib.pyplot as plt
+import os
+import numpy as np
 import pandas as pd
 
-def plot_equity_curve(historico):
-    df = pd.DataFrame(historico)
-    
-    # Cria figura com dois subplots
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), height_ratios=[2, 1])
-    
+from schema import parse_dates
+
+# Acima destes limites o gráfico é simplificado para continuar rápido e legível
+MAX_PONTOS_CURVA = 2000
+MAX_TRADES_POR_BARRA = 60
+
+
+def downsample_series(x, y, max_pontos=MAX_PONTOS_CURVA):
+    """
+    Reduz uma série longa para no máximo `max_pontos` pontos, mantendo o
+    primeiro e o último ponto e os extremos (mínimo/máximo) de cada bloco.
+    """
+    n = len(y)
+    if n <= max_pontos:
+        return list(x), list(y)
+
+    valores = np.asarray(y, dtype=np.float64)
+    blocos = max(1, max_pontos // 2)
+    tamanho = -(-n // blocos)  # divisão arredondando para cima
+
+    # Matriz (blocos x tamanho); o último bloco é completado repetindo o último
+    # valor, que nunca vence um empate com o original (argmin/argmax pegam o primeiro)
+    matriz = np.pad(valores, (0, blocos * tamanho - n), mode="edge").reshape(blocos, tamanho)
+    inicios = np.arange(blocos) * tamanho
+    extremos = np.concatenate([inicios + matriz.argmin(axis=1), inicios + matriz.argmax(axis=1), [0, n - 1]])
+    indices = np.unique(np.minimum(extremos, n - 1))
+
+    return pd.Series(x).iloc[indices].tolist(), valores[indices].tolist()
+
+
+def aggregate_returns_by_month(df, coluna_data="DataCom"):
+    """Soma os retornos (%) de preço e de dividendo por mês"""
+    datas = parse_dates(df[coluna_data])
+    mensal = df.groupby(datas.dt.to_period("M"))[
+        ["RetornoValorizacaoTotal(%)", "RetornoDividendoTotal(%)"]
+    ].sum()
+    mensal.index = mensal.index.strftime("%m/%Y")
+    return mensal
+
+
+def _parse_trade_dates(df):
+    """Converte as colunas de data para datetime64: eixo de datas real (e não categorias de texto)"""
+    df = df.copy()
+    for coluna in ("DataCom", "DataCompra", "DataVenda"):
+        if coluna in df.columns:
+            df[coluna] = parse_dates(df[coluna])
+    return df
+
+
+def _draw_equity_curve(fig, df):
+    """Desenha a curva de capital e a composição dos retornos na figura"""
+    ax1, ax2 = fig.subplots(2, 1, height_ratios=[2, 1])
+
     # Plot superior: Evolução do capital
-    ax1.plot(df["DataCom"], df["CapitalAcumulado(R$)"], marker="o", color="blue")
+    x, y = downsample_series(df["DataCom"], df["CapitalAcumulado(R$)"])
+    ax1.plot(x, y, marker="o" if len(y) <= MAX_TRADES_POR_BARRA else None, color="blue")
     ax1.set_title("Evolução do Capital - Estratégia de Dividendos")
     ax1.set_xlabel("Data")
     ax1.set_ylabel("Capital Acumulado(R$)")
     ax1.grid(True)
-    
-    # Plot inferior: Retornos por trade
+
+    # Plot inferior: Retornos por trade (ou por mês, se houver muitos trades)
+    if len(df) > MAX_TRADES_POR_BARRA:
+        barras = aggregate_returns_by_month(df)
+        rotulos = list(barras.index)
+        titulo = "Composição dos Retornos por Mês"
+        xlabel = "Mês"
+    else:
+        barras = df
+        rotulos = list(df["Ticker"])
+        titulo = "Composição dos Retornos por Trade"
+        xlabel = "Trades"
+
     bar_width = 0.35
-    x = range(len(df))
-    
-    ax2.bar(x, df["RetornoValorizacaoTotal(%)"], bar_width, label="Retorno Preço", color="orange")
-    ax2.bar([i + bar_width for i in x], df["RetornoDividendoTotal(%)"], bar_width, label="Retorno Dividendo", color="green")
-    
-    ax2.set_title("Composição dos Retornos por Trade")
-    ax2.set_xlabel("Trades")
+    x = range(len(barras))
+
+    ax2.bar(x, barras["RetornoValorizacaoTotal(%)"], bar_width, label="Retorno Preço", color="orange")
+    ax2.bar([i + bar_width for i in x], barras["RetornoDividendoTotal(%)"], bar_width, label="Retorno Dividendo", color="green")
+
+    ax2.set_title(titulo)
+    ax2.set_xlabel(xlabel)
     ax2.set_ylabel("Retorno (%)")
     ax2.set_xticks([i + bar_width/2 for i in x])
-    ax2.set_xticklabels(df["Ticker"], rotation=45)
+    ax2.set_xticklabels(rotulos, rotation=45)
     ax2.legend()
     ax2.grid(True)
-    
-    plt.tight_layout()
+
+    fig.tight_layout()
+
+
+def plot_equity_curve(historico, output_file=None):
+    """
+    Gera o gráfico da curva de capital.
+
+    Args:
+        historico: Lista de dicts (ou DataFrame) retornada por run_backtest
+        output_file: Se informado (.png/.svg), renderiza sem janela (Agg) e
+                     salva no arquivo, sem bloquear a execução.
+
+    Returns:
+        str: Caminho do arquivo salvo (ou None quando exibido na tela)
+    """
+    df = _parse_trade_dates(pd.DataFrame(historico))
+
+    if output_file:
+        return render_equity_chart(df, output_file)
+
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(12, 8))
+    _draw_equity_curve(fig, df)
     plt.show()
+    return None
+
+
+def render_equity_chart(historico, output_file):
+    """
+    Renderiza o gráfico em modo headless (Agg) direto para PNG/SVG.
+    Não usa o pyplot, então não abre janela nem depende de backend gráfico.
+    """
+    from matplotlib.figure import Figure
+
+    df = pd.DataFrame(historico)
+    if df.empty:
+        print("[WARN] Histórico vazio, gráfico não gerado.")
+        return None
+    df = _parse_trade_dates(df)
+
+    pasta = os.path.dirname(output_file)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+
+    fig = Figure(figsize=(12, 8))
+    _draw_equity_curve(fig, df)
+    fig.savefig(output_file)
+    return output_file
+
+
+def _render_trades_csv(csv_file, output_file):
+    """Lê um CSV de trades (gerado por save_trades_to_csv) e renderiza o gráfico"""
+    try:
+        df = pd.read_csv(csv_file, sep=';', encoding='utf-8-sig')
+        return render_equity_chart(df, output_file)
+    except Exception as e:
+        print(f"[ERRO] Falha ao gerar gráfico de {csv_file}: {e}")
+        return None
+
+
+def render_top_results(results_file, top_n=10, output_dir="charts", formato="png",
+                       coluna="CapitalAcumulado(R$)", workers=None):
+    """
+    Renderiza em paralelo os gráficos dos `top_n` melhores resultados de uma
+    otimização, usando os CSVs de trades referenciados na coluna `csv_file`.
+
+    Returns:
+        list: Caminhos dos gráficos gerados
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    df = pd.read_csv(results_file)
+    top = df.dropna(subset=["csv_file"]).sort_values(coluna, ascending=False).head(top_n)
+    if top.empty:
+        print("[WARN] Nenhum resultado com CSV de trades para renderizar.")
+        return []
+
+    os.makedirs(output_dir, exist_ok=True)
+    tarefas = []
+    for posicao, (_, row) in enumerate(top.iterrows(), 1):
+        nome = os.path.splitext(os.path.basename(row["csv_file"]))[0]
+        tarefas.append((row["csv_file"], os.path.join(output_dir, f"{posicao:02d}_{nome}.{formato}")))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        gerados = list(executor.map(_render_trades_csv, *zip(*tarefas)))
+
+    gerados = [g for g in gerados if g]
+    print(f"[INFO] {len(gerados)} gráficos salvos em: {output_dir}")
+    return gerados
@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from date_extensions import calendario_dias_uteis, mapear_dias_uteis
+from schema import parse_dates, parse_number
+
+
+def build_price_matrix(painel, dias_uteis):
+    """
+    Converte o painel de preços (dias × tickers) em uma matriz
+    (tickers × dias úteis) float32, com NaN onde não há preço.
+
+    Returns:
+        tuple: (matriz, lista_de_tickers)
+    """
+    painel = painel.reindex(pd.DatetimeIndex(dias_uteis))
+    return painel.to_numpy(dtype=np.float32).T.copy(), list(painel.columns)
+
+
+def gather_entry_exit_prices(matriz, dias_uteis, tickers, ativos, datas_com, days_before, days_after):
+    """
+    Busca, com um único gather, os preços de compra e venda de cada evento
+    para todos os valores de days_before e days_after.
+
+    Args:
+        matriz: Preços (tickers × dias úteis), ver build_price_matrix
+        dias_uteis: Dias úteis do eixo 1 da matriz
+        tickers: Tickers do eixo 0 da matriz
+        ativos: Ticker de cada evento
+        datas_com: Data com de cada evento
+        days_before, days_after: Arrays de int64
+
+    Returns:
+        tuple: (preco_compra (eventos × days_before), preco_venda (eventos × days_after),
+                data_compra, data_venda), com NaN/NaT quando não há preço/dia útil
+    """
+    dias_uteis = pd.DatetimeIndex(dias_uteis)
+    datas_com = pd.DatetimeIndex(datas_com)
+    days_before = np.asarray(days_before, dtype=np.int64)
+    days_after = np.asarray(days_after, dtype=np.int64)
+
+    # Dias corridos com folga para que todos os deslocamentos caiam dentro do eixo
+    inicio = min(datas_com.min() - timedelta(days=int(days_before.max())), dias_uteis[0])
+    fim = max(datas_com.max() + timedelta(days=int(days_after.max())), dias_uteis[-1])
+    dias_corridos = pd.date_range(inicio, fim, freq="D")
+    anterior, seguinte = mapear_dias_uteis(dias_corridos, dias_uteis)
+
+    posicao_ticker = {t: i for i, t in enumerate(tickers)}
+    idx_ticker = pd.Series(ativos).astype(str).map(posicao_ticker).fillna(-1).to_numpy(dtype=np.int64)
+
+    # Posição da data com no eixo de dias corridos
+    dia_com = np.asarray((datas_com - dias_corridos[0]).days, dtype=np.int64)
+    idx_compra = anterior[dia_com[:, None] - days_before[None, :]]   # (eventos × days_before)
+    idx_venda = seguinte[dia_com[:, None] + days_after[None, :]]     # (eventos × days_after)
+
+    # Tickers sem preço e dias fora do calendário (-1) são mascarados depois do
+    # gather, em vez de acrescentar linha/coluna de NaN à matriz: com memory map
+    # isso copiaria a matriz inteira a cada chamada
+    preco_compra = _gather(matriz, idx_ticker, idx_compra)
+    preco_venda = _gather(matriz, idx_ticker, idx_venda)
+
+    datas = dias_uteis.to_numpy()
+    return preco_compra, preco_venda, _gather_datas(datas, idx_compra), _gather_datas(datas, idx_venda)
+
+
+def _gather(matriz, idx_ticker, idx_dia):
+    """matriz[ticker, dia] para cada evento, com NaN onde algum índice é -1"""
+    invalidos = (idx_ticker[:, None] < 0) | (idx_dia < 0)
+    if matriz.shape[0] == 0 or matriz.shape[1] == 0:
+        return np.full(idx_dia.shape, np.nan, dtype=np.float32)
+    precos = matriz[np.maximum(idx_ticker, 0)[:, None], np.maximum(idx_dia, 0)]
+    precos[invalidos] = np.nan
+    return precos
+
+
+def _gather_datas(datas, idx_dia):
+    """datas[dia] com NaT onde o índice é -1"""
+    resultado = datas[np.maximum(idx_dia, 0)]
+    resultado[idx_dia < 0] = np.datetime64("NaT")
+    return resultado
+
+
+def build_return_surface(eventos_df, days_before=range(0, 11), days_after=range(0, 11), painel=None):
+    """
+    Calcula o retorno de cada evento para todos os pares (days_before, days_after)
+    de uma vez, com um único gather em uma matriz de preços (ticker × dia útil).
+
+    As datas de compra/venda seguem as mesmas regras de ajustar_periodos:
+    compra no dia útil anterior (ou igual) a DataCom - days_before e venda no
+    dia útil seguinte (ou igual) a DataCom + days_after.
+
+    Args:
+        eventos_df: DataFrame de eventos (saída de get_dividend_events)
+        days_before: Valores de dias antes da data com
+        days_after: Valores de dias depois da data com
+        painel: Painel de preços (dias × tickers). Se None, é montado com
+                get_price_panel para os tickers e o período dos eventos.
+
+    Returns:
+        dict com:
+            eventos: DataFrame dos eventos, na ordem do eixo 0
+            days_before, days_after: Valores dos eixos 1 e 2
+            retorno_preco, retorno_dividendo, retorno_total: Arrays float32
+                (eventos × days_before × days_after) em %, NaN sem preço.
+                O retorno de dividendo é ValorDividendo / preço de compra.
+    """
+    days_before = np.asarray(list(days_before), dtype=np.int64)
+    days_after = np.asarray(list(days_after), dtype=np.int64)
+
+    eventos = eventos_df.reset_index(drop=True)
+    datas_com = parse_dates(eventos["DataCom"])
+    validos = datas_com.notna().to_numpy()
+    eventos, datas_com = eventos[validos].reset_index(drop=True), datas_com[validos].reset_index(drop=True)
+
+    forma = (len(eventos), len(days_before), len(days_after))
+    if len(eventos) == 0:
+        vazio = np.empty(forma, dtype=np.float32)
+        return {"eventos": eventos, "days_before": days_before, "days_after": days_after,
+                "retorno_preco": vazio, "retorno_dividendo": vazio, "retorno_total": vazio}
+
+    # Calendário com folga para achar o dia útil anterior/seguinte nas bordas
+    inicio = datas_com.min() - timedelta(days=int(days_before.max()) + 15)
+    fim = datas_com.max() + timedelta(days=int(days_after.max()) + 15)
+    dias_uteis = calendario_dias_uteis(inicio, fim)
+
+    if painel is None:
+        from data_fetcher import get_price_panel
+        painel = get_price_panel(eventos["Ativo"].unique(), dias_uteis[0], dias_uteis[-1])
+
+    matriz, tickers = build_price_matrix(painel, dias_uteis)
+    preco_compra, preco_venda, _, _ = gather_entry_exit_prices(
+        matriz, dias_uteis, tickers, eventos["Ativo"], datas_com, days_before, days_after
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        retorno_preco = (preco_venda[:, None, :] - preco_compra[:, :, None]) / preco_compra[:, :, None] * 100
+        dividendo = parse_number(eventos["ValorDividendo"]).to_numpy(dtype=np.float32)
+        retorno_dividendo = np.broadcast_to(
+            (dividendo[:, None] / preco_compra * 100)[:, :, None], forma
+        )
+        # Sem preço de venda não há trade, então o dividendo também vira NaN
+        retorno_dividendo = np.where(np.isnan(retorno_preco), np.float32(np.nan), retorno_dividendo)
+
+    retorno_preco = retorno_preco.astype(np.float32)
+    retorno_dividendo = retorno_dividendo.astype(np.float32)
+
+    return {
+        "eventos": eventos,
+        "days_before": days_before,
+        "days_after": days_after,
+        "retorno_preco": retorno_preco,
+        "retorno_dividendo": retorno_dividendo,
+        "retorno_total": retorno_preco + retorno_dividendo,
+    }
+
+
+def aggregate_surface(superficie, chaves, metrica="retorno_total"):
+    """
+    Agrega a superfície por grupo (média ignorando NaN).
+
+    Args:
+        superficie: Resultado de build_return_surface
+        chaves: Array/Series com o grupo de cada evento (mesmo tamanho do eixo 0)
+        metrica: retorno_preco, retorno_dividendo ou retorno_total
+
+    Returns:
+        dict: grupo -> DataFrame (days_before × days_after) com a média
+    """
+    valores = superficie[metrica]
+    chaves = np.asarray(chaves)
+    grupos, codigos = np.unique(chaves, return_inverse=True)
+
+    validos = ~np.isnan(valores)
+    soma = np.zeros((len(grupos),) + valores.shape[1:], dtype=np.float64)
+    contagem = np.zeros_like(soma)
+    np.add.at(soma, codigos, np.where(validos, valores, 0.0))
+    np.add.at(contagem, codigos, validos)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media = soma / contagem
+
+    return {
+        grupo: pd.DataFrame(media[i], index=pd.Index(superficie["days_before"], name="days_before"),
+                            columns=pd.Index(superficie["days_after"], name="days_after"))
+        for i, grupo in enumerate(grupos)
+    }
+
+
+def aggregate_by_ticker(superficie, metrica="retorno_total"):
+    """Média da superfície por ticker"""
+    return aggregate_surface(superficie, superficie["eventos"]["Ativo"].astype(str), metrica)
+
+
+def aggregate_by_sector(superficie, setores, metrica="retorno_total"):
+    """
+    Média da superfície por setor.
+
+    Args:
+        setores: dict ticker -> setor. Tickers sem setor vão para "Outros".
+    """
+    chaves = superficie["eventos"]["Ativo"].astype(str).map(setores).fillna("Outros")
+    return aggregate_surface(superficie, chaves, metrica)
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+from schema import parse_dates
+
+METODOS = ("bootstrap", "permutacao", "bloco_mensal")
+PERCENTIS = [1, 5, 25, 50, 75, 95, 99]
+
+# Elementos (float64) por matriz de simulações em cada lote (~2 MB): a memória
+# fica limitada mesmo com muitos trades e simulações
+MAX_ELEMENTOS_LOTE = 250_000
+
+
+def _capital_paths(retornos, capital_inicial):
+    """
+    Recebe uma matriz (simulações × trades) de retornos em R$ e calcula,
+    de uma vez só, o capital final, o capital mínimo e o drawdown máximo
+    de cada simulação.
+    """
+    capital = capital_inicial + np.cumsum(retornos, axis=1)
+    # Cópia: uma view manteria a matriz inteira viva depois do lote
+    capital_final = capital[:, -1].copy()
+    capital_min = np.minimum(capital.min(axis=1), capital_inicial)
+
+    # O pico considera o capital inicial antes do primeiro trade
+    picos = np.maximum(np.maximum.accumulate(capital, axis=1), capital_inicial)
+    drawdown = picos - capital
+    drawdown_max = drawdown.max(axis=1)
+    drawdown_max_pct = (drawdown / picos).max(axis=1) * 100
+
+    return {
+        "capital_final": capital_final,
+        "capital_min": capital_min,
+        "drawdown_max": drawdown_max,
+        "drawdown_max_pct": drawdown_max_pct,
+    }
+
+
+def _monthly_blocks(trades_df, retornos, coluna_data):
+    """
+    Agrupa os retornos por mês em uma matriz (meses × maior_quantidade_no_mês)
+    preenchida com zeros, para permitir sortear meses inteiros por indexação.
+    """
+    datas = parse_dates(trades_df[coluna_data])
+    if datas.isna().any():
+        raise ValueError(f"Datas inválidas em {coluna_data} para o bloco mensal")
+    meses = (datas.dt.year * 12 + datas.dt.month - 1).to_numpy(dtype=np.int64)
+    _, codigos = np.unique(meses, return_inverse=True)
+
+    # Posição de cada trade dentro do seu mês (mantém a ordem original)
+    ordem = np.argsort(codigos, kind="stable")
+    codigos_ordenados = codigos[ordem]
+    inicio_mes = np.searchsorted(codigos_ordenados, codigos_ordenados, side="left")
+    posicao = np.arange(len(ordem)) - inicio_mes
+
+    blocos = np.zeros((codigos.max() + 1, posicao.max() + 1))
+    blocos[codigos_ordenados, posicao] = retornos[ordem]
+    return blocos
+
+
+def simulate_trades(trades_df, valor_investido, n_sims=5000, metodo="bootstrap",
+                    coluna_retorno="Retorno(R$)", coluna_data="DataVenda", seed=None,
+                    tamanho_lote=None):
+    """
+    Simula caminhos alternativos para os trades agendados, com operações
+    vetorizadas do NumPy sobre lotes de simulações (sem laço por simulação).
+
+    Args:
+        trades_df: DataFrame de trades agendados (saída de schedule_trades /
+                   save_trades_to_csv)
+        valor_investido: Capital inicial
+        n_sims: Quantidade de simulações
+        metodo: "bootstrap" (sorteio com reposição), "permutacao" (embaralha a
+                ordem dos trades) ou "bloco_mensal" (sorteia meses inteiros)
+        coluna_retorno: Coluna com o retorno em R$ de cada trade
+        coluna_data: Coluna de data usada para formar os blocos mensais
+        seed: Semente do gerador aleatório
+        tamanho_lote: Simulações por lote (padrão: MAX_ELEMENTOS_LOTE / colunas)
+
+    Returns:
+        dict: Arrays com capital_final, capital_min, drawdown_max e
+              drawdown_max_pct de cada simulação
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método inválido: {metodo}. Use um de {METODOS}")
+
+    retornos = pd.to_numeric(trades_df[coluna_retorno], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    if len(retornos) == 0:
+        vazio = np.full(n_sims, float(valor_investido))
+        return {"capital_final": vazio, "capital_min": vazio,
+                "drawdown_max": np.zeros(n_sims), "drawdown_max_pct": np.zeros(n_sims)}
+
+    rng = np.random.default_rng(seed)
+    n = len(retornos)
+
+    if metodo == "bootstrap":
+        colunas = n
+        def sortear(k):
+            return retornos[rng.integers(0, n, size=(k, n))]
+    elif metodo == "permutacao":
+        colunas = n
+        def sortear(k):
+            return rng.permuted(np.broadcast_to(retornos, (k, n)), axis=1)
+    else:
+        blocos = _monthly_blocks(trades_df, retornos, coluna_data)
+        n_meses = blocos.shape[0]
+        colunas = blocos.size
+        def sortear(k):
+            return blocos[rng.integers(0, n_meses, size=(k, n_meses))].reshape(k, -1)
+
+    # Só as métricas de cada simulação são acumuladas; as matrizes de um lote
+    # são descartadas antes do próximo
+    lote = tamanho_lote or max(1, MAX_ELEMENTOS_LOTE // colunas)
+    partes = [_capital_paths(sortear(min(lote, n_sims - inicio)), float(valor_investido))
+              for inicio in range(0, n_sims, lote)]
+    return {metrica: np.concatenate([p[metrica] for p in partes]) for metrica in partes[0]}
+
+
+def summarize_simulations(simulacoes, capital_historico=None, percentis=PERCENTIS):
+    """
+    Resume as distribuições simuladas em percentis.
+
+    Se `capital_historico` (capital final do caminho real) for informado,
+    inclui a fração das simulações que terminou abaixo dele.
+    """
+    linhas = {}
+    for metrica, valores in simulacoes.items():
+        linha = {f"p{p}": np.percentile(valores, p) for p in percentis}
+        linha["media"] = float(np.mean(valores))
+        linha["desvio"] = float(np.std(valores))
+        linhas[metrica] = linha
+
+    resumo = pd.DataFrame(linhas).T.round(2)
+    if capital_historico is not None:
+        resumo.attrs["percentil_historico"] = float(
+            np.mean(simulacoes["capital_final"] < capital_historico) * 100
+        )
+    return resumo
+
+
+def analyze_top_results(results_file, top_n=5, n_sims=5000, metodo="bootstrap",
+                        coluna="CapitalAcumulado(R$)", seed=None):
+    """
+    Roda a análise de robustez nos `top_n` melhores resultados de uma
+    otimização, usando os CSVs de trades referenciados em `csv_file`.
+
+    Returns:
+        DataFrame: Uma linha por combinação com os percentis de capital final,
+                   capital mínimo e drawdown
+    """
+    df = pd.read_csv(results_file)
+    top = df.dropna(subset=["csv_file"]).sort_values(coluna, ascending=False).head(top_n)
+
+    linhas = []
+    for _, row in top.iterrows():
+        try:
+            trades = pd.read_csv(row["csv_file"], sep=';', encoding='utf-8-sig')
+        except Exception as e:
+            print(f"[WARN] Falha ao ler {row['csv_file']}: {e}")
+            continue
+
+        simulacoes = simulate_trades(trades, row["valor_investido"], n_sims=n_sims, metodo=metodo, seed=seed)
+        resumo = summarize_simulations(simulacoes, capital_historico=row["CapitalAcumulado(R$)"])
+
+        linhas.append({
+            "min_dy": row["min_dy"],
+            "days_before": row["days_before"],
+            "days_after": row["days_after"],
+            "allow_overlap": row["allow_overlap"],
+            "trades": len(trades),
+            "CapitalAcumulado(R$)": row["CapitalAcumulado(R$)"],
+            "PercentilHistorico(%)": resumo.attrs.get("percentil_historico"),
+            "CapitalFinal_p5": resumo.loc["capital_final", "p5"],
+            "CapitalFinal_p50": resumo.loc["capital_final", "p50"],
+            "CapitalFinal_p95": resumo.loc["capital_final", "p95"],
+            "CapitalMinimo_p5": resumo.loc["capital_min", "p5"],
+            "CapitalMinimo_p50": resumo.loc["capital_min", "p50"],
+            "Drawdown(%)_p50": resumo.loc["drawdown_max_pct", "p50"],
+            "Drawdown(%)_p95": resumo.loc["drawdown_max_pct", "p95"],
+        })
+
+    return pd.DataFrame(linhas)
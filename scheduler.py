@@ -1,55 +1,62 @@
+import numpy as np
 import pandas as pd
-from date_extensions import parse_date
+from schema import parse_dates
+from kernels import DIA_INVALIDO, dates_to_kernel_days, schedule_mask
 
-def schedule_trades(df_trades, allow_overlap=False):
+def schedule_trades(df_trades, allow_overlap=False, last_sell_date=None, verbose=True):
     """
     Seleciona operações com base nas datas.
-    
+
     Args:
         df_trades: DataFrame com as operações
-        allow_overlap: Se True, permite sobreposição de datas. Se False, 
+        allow_overlap: Se True, permite sobreposição de datas. Se False,
                       garante que uma operação só começa após o término da anterior.
+        last_sell_date: Data de venda da última operação já agendada, para
+                        continuar um cronograma existente (modo incremental).
+        verbose: Se True, lista cada trade ignorado por sobreposição e
+                 imprime o resumo final.
     """
-    selected = []
-    last_sell_date = None
-    overlapped_count = 0  # contador de sobreposições
-    avoided_overlap_count = 0  # contador de trades evitados por sobreposição
-
-    for _, trade in df_trades.iterrows():
-        try:
-            data_compra = parse_date(trade["DataCompra"])
-            # print(f"[DEBUG] Processando trade: Ticker={trade['Ticker']}, DataCom={trade['DataCom']}, DataCompra={data_compra}, DataVenda={trade['DataVenda']}")
-            
-            # Se permite sobreposição, adiciona todas as operações
-            # Se não permite, verifica se a data de compra é posterior à última venda
-            if allow_overlap or last_sell_date is None or data_compra > last_sell_date:
-                selected.append(trade)
-                last_sell_date = parse_date(trade["DataVenda"])
-                
-                # if allow_overlap:
-                #     print(f"[INFO] Trade adicionado (sobreposição permitida)")
-                # else:
-                #     print(f"[INFO] Trade adicionado (sem sobreposição)")
-            else:
-                overlapped_count += 1  # soma um trade sobreposto
-                print(f"[INFO] Trade ignorado: data de compra {data_compra.strftime('%d/%m/%Y')} sobrepõe com venda anterior em {last_sell_date.strftime('%d/%m/%Y')}")
-        
-        except Exception as e:
-            print(f"[WARN] Erro ao processar datas do trade: {e}")
-            continue
-    
-    result = pd.DataFrame(selected)
-    
-    # Formata as datas para exibição
-    if not result.empty:
-        for col in ["DataCom", "DataCompra", "DataVenda"]:
-            try:
-                result[col] = result[col].apply(parse_date)
-            except Exception as e:
-                print(f"[WARN] Erro ao formatar coluna {col}: {e}")
-    
-    print(f"\n[RESUMO] Total de trades processados: {len(df_trades)}")
-    print(f"[RESUMO] Trades selecionados: {len(result)}")
-    print(f"[RESUMO] Trades sobrepostos ignorados: {overlapped_count}\n")
-    
+    if df_trades.empty:
+        if verbose:
+            print("\n[RESUMO] Total de trades processados: 0")
+            print("[RESUMO] Trades selecionados: 0")
+            print("[RESUMO] Trades sobrepostos ignorados: 0\n")
+        return df_trades.copy()
+
+    # As datas são convertidas uma vez para datetime64 (no-op se já tipadas)
+    df_trades = df_trades.copy()
+    for col in ["DataCom", "DataCompra", "DataVenda"]:
+        if col in df_trades.columns:
+            df_trades[col] = parse_dates(df_trades[col])
+
+    compra = dates_to_kernel_days(df_trades["DataCompra"])
+    venda = dates_to_kernel_days(df_trades["DataVenda"])
+    validos = (compra != DIA_INVALIDO) & (venda != DIA_INVALIDO)
+    for posicao in np.flatnonzero(~validos):
+        print(f"[WARN] Erro ao processar datas do trade: data inválida na linha {posicao}")
+
+    # Se permite sobreposição, seleciona todas as operações; se não, cada
+    # compra precisa ser posterior à última venda (kernel em kernels.py)
+    ultima_venda = DIA_INVALIDO if last_sell_date is None else dates_to_kernel_days([pd.Timestamp(last_sell_date)])[0]
+    selecionados = schedule_mask(compra, venda, allow_overlap, ultima_venda)
+
+    ignorados = validos & ~selecionados
+    overlapped_count = int(ignorados.sum())  # contador de sobreposições
+    if overlapped_count and verbose:
+        # Última venda agendada antes de cada trade ignorado; as mensagens são
+        # montadas de uma vez (sem acesso por linha)
+        vendas_agendadas = pd.Series(np.where(selecionados, df_trades["DataVenda"], pd.NaT))
+        anterior = vendas_agendadas.ffill().fillna(pd.Timestamp(last_sell_date) if last_sell_date is not None else pd.NaT)
+        compras_ignoradas = pd.Series(df_trades["DataCompra"].to_numpy()[ignorados]).dt.strftime('%d/%m/%Y')
+        vendas_anteriores = pd.Series(anterior.to_numpy()[ignorados]).dt.strftime('%d/%m/%Y')
+        mensagens = "[INFO] Trade ignorado: data de compra " + compras_ignoradas + " sobrepõe com venda anterior em " + vendas_anteriores
+        print("\n".join(mensagens))
+
+    result = df_trades[selecionados].copy()
+
+    if verbose:
+        print(f"\n[RESUMO] Total de trades processados: {len(df_trades)}")
+        print(f"[RESUMO] Trades selecionados: {len(result)}")
+        print(f"[RESUMO] Trades sobrepostos ignorados: {overlapped_count}\n")
+
     return result
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+# Esquema tipado dos eventos de dividendos (saída de get_dividend_events).
+# Os valores numéricos são convertidos uma única vez, na ingestão.
+EVENT_DTYPES = {
+    "Ativo": "category",
+    "DataCom": "datetime64[ns]",
+    "DY": "float64",
+    "ValorDividendo": "float64",
+    "Tipo": "category",
+}
+
+# Esquema tipado dos trades (saída de rank_best_trades / schedule_trades)
+TRADE_DTYPES = {
+    "Ticker": "category",
+    "DataCom": "datetime64[ns]",
+    "DataCompra": "datetime64[ns]",
+    "DataVenda": "datetime64[ns]",
+    "DY": "float64",
+    "ValorDividendo": "float64",
+    "PrecoCompra": "float32",
+    "PrecoVenda": "float32",
+    "RetornoValorizacaoTotal(%)": "float32",
+    "RetornoValorizacaoTotal(R$)": "float64",
+    "RetornoValorizacaoPorAcao(R$)": "float32",
+    "RetornoDividendoTotal(%)": "float32",
+    "RetornoDividendoTotal(R$)": "float64",
+    "RetornoDividendoPorAcao(R$)": "float32",
+    "Retorno(%)": "float32",
+    "Retorno(R$)": "float64",
+    "ValorInvestido(R$)": "float64",
+    "ValorTotal(R$)": "float64",
+    "Custos(R$)": "float64",
+    "Imposto(R$)": "float64",
+    "CapitalAcumulado(R$)": "float64",
+    "Tipo": "category",
+}
+
+# Colunas mínimas para o agendamento, backtest e CSV nas varreduras do optimizer
+TRADE_COLUMNS_LEVES = [
+    "Ticker", "DataCom", "DataCompra", "DataVenda", "DY",
+    "PrecoCompra", "PrecoVenda",
+    "RetornoValorizacaoTotal(%)", "RetornoValorizacaoTotal(R$)",
+    "RetornoDividendoTotal(%)", "RetornoDividendoTotal(R$)",
+    "Retorno(%)", "Retorno(R$)",
+]
+
+
+def parse_number(valores):
+    """Converte uma coluna de números (aceitando vírgula decimal) para float64"""
+    if pd.api.types.is_numeric_dtype(valores):
+        return valores.astype("float64")
+    texto = valores.astype(str).str.replace(",", ".", regex=False)
+    return pd.to_numeric(texto, errors="coerce").fillna(0.0)
+
+
+def parse_dates(valores):
+    """
+    Converte uma coluna de datas para datetime64[ns] (o tipo declarado nos
+    esquemas). Colunas já em datetime64[ns] são devolvidas sem custo; strings
+    aceitam dd/mm/yyyy ou yyyy-mm-dd.
+    """
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        if valores.dtype == "datetime64[ns]" or getattr(valores.dtype, "tz", None) is not None:
+            return valores
+        return valores.astype("datetime64[ns]")
+    texto = valores.astype(str)
+    datas = pd.to_datetime(texto, format="%d/%m/%Y", errors="coerce")
+    faltando = datas.isna()
+    if faltando.any():
+        datas[faltando] = pd.to_datetime(texto[faltando], format="mixed", errors="coerce")
+    # O pandas infere a resolução (s/us) a partir do texto
+    return datas.astype("datetime64[ns]")
+
+
+def _apply_dtypes(df, dtypes):
+    for coluna, dtype in dtypes.items():
+        if coluna not in df.columns:
+            continue
+        if dtype.startswith("datetime64"):
+            df[coluna] = parse_dates(df[coluna])
+        elif dtype == "category":
+            df[coluna] = df[coluna].astype("category")
+        else:
+            df[coluna] = parse_number(df[coluna]).astype(dtype)
+    return df
+
+
+def normalize_events(df):
+    """Aplica o esquema tipado aos eventos de dividendos"""
+    if df.empty:
+        return df
+    return _apply_dtypes(df.copy(), EVENT_DTYPES)
+
+
+def normalize_trades(df, leve=False):
+    """
+    Aplica o esquema tipado aos trades.
+
+    Args:
+        df: DataFrame de trades
+        leve: Se True, mantém apenas TRADE_COLUMNS_LEVES (para varreduras)
+    """
+    if df.empty:
+        return df
+    if leve:
+        df = df[[c for c in TRADE_COLUMNS_LEVES if c in df.columns]]
+    return _apply_dtypes(df.copy(), TRADE_DTYPES)
+
+
+def dates_to_days(valores):
+    """Converte uma coluna de datas para int64 (dias desde 1970-01-01)"""
+    return parse_dates(valores).to_numpy(dtype="datetime64[D]").astype(np.int64)
@@ -0,0 +1,308 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from date_extensions import calendario_dias_uteis, mapear_dias_uteis
+
+# Quantos dias corridos para trás/para frente o serviço mantém em memória
+JANELA_PASSADO = 90
+JANELA_FUTURO = 120
+
+# Nos refreshes seguintes ao primeiro, só eventos com data com a partir de
+# (última busca - REBUSCA_DIAS) são buscados de novo; os anteriores não mudam
+REBUSCA_DIAS = 7
+
+
+class SignalService:
+    """
+    Mantém eventos, calendário e cotações em memória e responde quais eventos
+    entrar/sair nos próximos dias para um conjunto fixo de parâmetros.
+
+    As fontes de dados são injetáveis para permitir rodar contra stubs:
+        fonte_eventos(start, end, min_dy) -> DataFrame tipado de eventos
+        fonte_cotacoes(tickers) -> dict ticker -> último preço
+        hoje() -> pd.Timestamp da data de referência
+    """
+
+    def __init__(self, min_dy=2.5, days_before=18, days_after=25, allow_overlap=True,
+                 valor_investido=1000, fonte_eventos=None, fonte_cotacoes=None, hoje=None):
+        self.params = {
+            "min_dy": min_dy,
+            "days_before": days_before,
+            "days_after": days_after,
+            "allow_overlap": allow_overlap,
+            "valor_investido": valor_investido,
+        }
+        self.fonte_eventos = fonte_eventos or self._eventos_statusinvest
+        self.fonte_cotacoes = fonte_cotacoes or self._cotacoes_yahoo
+        self.hoje = hoje or (lambda: pd.Timestamp.today().normalize())
+
+        self._lock = threading.Lock()
+        self._dias_uteis = None
+        self._eventos = None
+        self._ultima_busca = None
+        self._trades = pd.DataFrame()
+        self._cotacoes = {}
+        self._atualizado_em = None
+        self._parar = threading.Event()
+
+    @staticmethod
+    def _eventos_statusinvest(start, end, min_dy):
+        from data_fetcher import get_dividend_events
+        # Caminho ao vivo: não lê nem grava o cache/índice em disco
+        return get_dividend_events(start, end, min_dy=min_dy, usar_cache=False, gravar_cache=False)
+
+    @staticmethod
+    def _cotacoes_yahoo(tickers):
+        from data_fetcher import get_latest_quotes
+        return get_latest_quotes(tickers)
+
+    def _calendario(self, inicio, fim):
+        """Reaproveita o calendário em memória se ele já cobre o intervalo"""
+        if self._dias_uteis is None or inicio < self._dias_uteis[0] or fim > self._dias_uteis[-1]:
+            self._dias_uteis = calendario_dias_uteis(inicio - timedelta(days=30), fim + timedelta(days=365))
+        return self._dias_uteis
+
+    def refresh(self):
+        """
+        Atualiza eventos e cotações e recalcula o cronograma. Todo o trabalho
+        pesado acontece aqui, para que as consultas sejam só filtros em memória.
+
+        Depois do primeiro refresh, só a parte recente da janela é buscada de
+        novo e mesclada aos eventos em memória; o cronograma só é refeito se
+        os eventos mudaram.
+        """
+        from scheduler import schedule_trades
+
+        hoje = self.hoje()
+        inicio = hoje - timedelta(days=JANELA_PASSADO)
+        fim = hoje + timedelta(days=JANELA_FUTURO)
+
+        eventos = self._merge_events(inicio, fim)
+        mudou = self._eventos is None or not eventos.equals(self._eventos)
+
+        if not mudou:
+            trades = self._trades
+        elif eventos.empty:
+            trades = pd.DataFrame()
+        else:
+            dias_uteis = self._calendario(inicio - timedelta(days=self.params["days_before"]),
+                                          fim + timedelta(days=self.params["days_after"]))
+            trades = self._plan_trades(eventos, dias_uteis)
+            if not trades.empty:
+                trades = schedule_trades(trades, self.params["allow_overlap"], verbose=False)
+
+        tickers = [] if trades.empty else trades.loc[trades["DataVenda"] >= hoje, "Ticker"].astype(str).unique()
+        cotacoes = self.fonte_cotacoes(tickers) if len(tickers) else {}
+
+        with self._lock:
+            self._eventos = eventos
+            self._trades = trades
+            self._cotacoes = cotacoes
+            self._atualizado_em = pd.Timestamp.now()
+
+        print(f"[INFO] Serviço atualizado: {len(trades)} trades no cronograma, {len(cotacoes)} cotações"
+              f"{'' if mudou else ' (eventos sem mudança)'}")
+        return len(trades)
+
+    def _merge_events(self, inicio, fim):
+        """
+        Busca os eventos da janela. Com eventos em memória, busca só a partir de
+        (última busca - REBUSCA_DIAS) e mantém os anteriores, já conhecidos.
+        """
+        if self._eventos is None or self._ultima_busca is None:
+            busca_inicio = inicio
+        else:
+            busca_inicio = max(inicio, self._ultima_busca - timedelta(days=REBUSCA_DIAS))
+
+        novos = self.fonte_eventos(busca_inicio.strftime("%Y-%m-%d"), fim.strftime("%Y-%m-%d"), self.params["min_dy"])
+        novos = pd.DataFrame() if novos is None else novos
+        if novos.empty and self._eventos is not None:
+            # Resposta vazia (ou falha na API): mantém os eventos em memória
+            print("[WARN] Nenhum evento retornado; mantendo os eventos em memória")
+            datas = self._eventos["DataCom"] if not self._eventos.empty else None
+            return self._eventos if datas is None else self._eventos[(datas >= inicio) & (datas <= fim)].reset_index(drop=True)
+        self._ultima_busca = self.hoje()
+
+        partes = []
+        if self._eventos is not None and not self._eventos.empty:
+            datas = self._eventos["DataCom"]
+            partes.append(self._eventos[(datas >= inicio) & (datas < busca_inicio)])
+        if not novos.empty:
+            partes.append(novos[(novos["DataCom"] >= busca_inicio) & (novos["DataCom"] <= fim)])
+        partes = [p for p in partes if not p.empty]
+        if not partes:
+            return pd.DataFrame()
+
+        eventos = pd.concat(partes, ignore_index=True)
+        eventos["Ativo"] = eventos["Ativo"].astype(str)
+        return eventos.sort_values(["DataCom", "Ativo"], kind="stable").reset_index(drop=True)
+
+    def _plan_trades(self, eventos, dias_uteis):
+        """Calcula as datas de compra/venda de cada evento (mesmas regras de ajustar_periodos)"""
+        eventos = eventos.reset_index(drop=True)
+        datas_com = pd.DatetimeIndex(eventos["DataCom"])
+        dias_corridos = pd.date_range(dias_uteis[0], dias_uteis[-1], freq="D")
+        anterior, seguinte = mapear_dias_uteis(dias_corridos, dias_uteis)
+
+        dia_com = np.asarray((datas_com - dias_corridos[0]).days, dtype=np.int64)
+        idx_compra = anterior[np.clip(dia_com - self.params["days_before"], 0, len(dias_corridos) - 1)]
+        idx_venda = seguinte[np.clip(dia_com + self.params["days_after"], 0, len(dias_corridos) - 1)]
+        validos = (idx_compra >= 0) & (idx_venda >= 0)
+
+        trades = pd.DataFrame({
+            "Ticker": eventos["Ativo"].astype(str)[validos].to_numpy(),
+            "DataCom": datas_com[validos],
+            "DataCompra": dias_uteis[idx_compra[validos]],
+            "DataVenda": dias_uteis[idx_venda[validos]],
+            "DY": eventos["DY"].to_numpy(dtype=np.float64)[validos],
+            "ValorDividendo": eventos["ValorDividendo"].to_numpy(dtype=np.float64)[validos],
+        })
+        # O agendamento sem sobreposição depende da ordem das compras
+        return trades.sort_values(["DataCompra", "DataCom"], kind="stable").reset_index(drop=True)
+
+    def _limite(self, dias):
+        """Data limite daqui a `dias` dias úteis"""
+        hoje = self.hoje()
+        posicao = self._dias_uteis.searchsorted(hoje)
+        return self._dias_uteis[min(posicao + dias, len(self._dias_uteis) - 1)]
+
+    def _to_records(self, df):
+        """Converte trades para lista de dicts serializáveis em JSON"""
+        if df.empty:
+            return []
+        df = df.copy()
+        for coluna in ["DataCom", "DataCompra", "DataVenda"]:
+            df[coluna] = df[coluna].dt.strftime("%Y-%m-%d")
+        df["Cotacao"] = df["Ticker"].map(self._cotacoes)
+        return json.loads(df.to_json(orient="records"))
+
+    def entradas(self, dias=5):
+        """Eventos cujo dia de compra cai entre hoje e os próximos `dias` dias úteis"""
+        with self._lock:
+            trades, hoje = self._trades, self.hoje()
+            if trades.empty:
+                return []
+            filtro = (trades["DataCompra"] >= hoje) & (trades["DataCompra"] <= self._limite(dias))
+            return self._to_records(trades[filtro])
+
+    def saidas(self, dias=5):
+        """Posições cujo dia de venda cai entre hoje e os próximos `dias` dias úteis"""
+        with self._lock:
+            trades, hoje = self._trades, self.hoje()
+            if trades.empty:
+                return []
+            filtro = (trades["DataCompra"] <= hoje) & (trades["DataVenda"] >= hoje) & (trades["DataVenda"] <= self._limite(dias))
+            return self._to_records(trades[filtro])
+
+    def candidatos(self):
+        """Próximas entradas do cronograma (regras de schedule_trades), ordenadas por DY"""
+        with self._lock:
+            trades, hoje = self._trades, self.hoje()
+            if trades.empty:
+                return []
+            futuros = trades[trades["DataCompra"] >= hoje].sort_values(["DY", "DataCompra"], ascending=[False, True])
+            registros = self._to_records(futuros)
+            for posicao, registro in enumerate(registros, 1):
+                registro["Rank"] = posicao
+            return registros
+
+    def posicoes(self):
+        """Posições abertas hoje, com a cotação atual e os dias úteis até a venda"""
+        with self._lock:
+            trades, hoje = self._trades, self.hoje()
+            if trades.empty:
+                return []
+            abertas = trades[(trades["DataCompra"] <= hoje) & (trades["DataVenda"] >= hoje)]
+            registros = self._to_records(abertas)
+            for registro in registros:
+                registro["DiasUteisRestantes"] = int(
+                    self._dias_uteis.searchsorted(pd.Timestamp(registro["DataVenda"])) - self._dias_uteis.searchsorted(hoje)
+                )
+            return registros
+
+    def status(self):
+        with self._lock:
+            return {
+                "parametros": self.params,
+                "trades": len(self._trades),
+                "atualizado_em": self._atualizado_em.isoformat(timespec="seconds") if self._atualizado_em is not None else None,
+            }
+
+    def start_refresh_loop(self, intervalo=900):
+        """Atualiza em segundo plano a cada `intervalo` segundos"""
+        def loop():
+            while not self._parar.wait(intervalo):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"[ERRO] Falha ao atualizar serviço: {e}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._parar.set()
+
+
+def make_handler(servico):
+    """Cria o handler HTTP (GET, respostas JSON) para um SignalService"""
+
+    class SignalHandler(BaseHTTPRequestHandler):
+        def _responder(self, status, corpo):
+            dados = json.dumps(corpo, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            try:
+                dias = int(query.get("dias", ["5"])[0])
+            except ValueError:
+                return self._responder(400, {"erro": "parâmetro 'dias' inválido"})
+
+            rotas = {
+                "/status": servico.status,
+                "/entradas": lambda: servico.entradas(dias),
+                "/saidas": lambda: servico.saidas(dias),
+                "/candidatos": servico.candidatos,
+                "/posicoes": servico.posicoes,
+            }
+            if url.path not in rotas:
+                return self._responder(404, {"erro": f"rota desconhecida: {url.path}", "rotas": sorted(rotas)})
+
+            inicio = time.perf_counter()
+            corpo = rotas[url.path]()
+            self._responder(200, {"dados": corpo, "ms": round((time.perf_counter() - inicio) * 1000, 3)})
+
+        def log_message(self, formato, *args):
+            pass
+
+    return SignalHandler
+
+
+def serve(servico, host="127.0.0.1", porta=8765, intervalo=900):
+    """Faz o primeiro refresh, inicia as atualizações periódicas e atende HTTP"""
+    servico.refresh()
+    servico.start_refresh_loop(intervalo)
+
+    servidor = ThreadingHTTPServer((host, porta), make_handler(servico))
+    print(f"[INFO] Serviço de sinais em http://{host}:{porta} (atualização a cada {intervalo}s)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Encerrando serviço...")
+    finally:
+        servico.stop()
+        servidor.server_close()
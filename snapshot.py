@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from schema import TRADE_COLUMNS_LEVES, normalize_events
+
+# Versão do formato do snapshot. Incrementar ao mudar os arrays gravados.
+SNAPSHOT_VERSION = 1
+
+# Folga (em dias corridos) de preços e calendário antes/depois do período,
+# suficiente para os maiores days_before/days_after usados no optimizer.
+FOLGA_DIAS = 60
+
+
+def snapshot_path(start, end, base_dir="data_cache"):
+    """Caminho padrão do snapshot para um período"""
+    start_str = pd.to_datetime(start).strftime("%Y-%m-%d")
+    end_str = pd.to_datetime(end).strftime("%Y-%m-%d")
+    return os.path.join(base_dir, f"snapshot_v{SNAPSHOT_VERSION}_{start_str}_{end_str}")
+
+
+def prepare_snapshot(start, end, indice="ibovespa", output_dir=None):
+    """
+    Monta e grava um snapshot com tudo que a estratégia precisa para rodar
+    sem rede e sem reprocessamento: eventos consolidados (sem filtro de DY),
+    painel de preços (tickers × dias úteis) e o calendário de dias úteis.
+
+    Cada array é gravado como .npy, para ser aberto com memory map (sem cópia)
+    por load_snapshot.
+
+    Returns:
+        str: Diretório do snapshot
+    """
+    from data_fetcher import get_dividend_events, get_price_panel
+    from date_extensions import calendario_dias_uteis
+
+    output_dir = output_dir or snapshot_path(start, end)
+
+    print(f"[INFO] Preparando snapshot {output_dir}...")
+    eventos = get_dividend_events(start, end, indice=indice, min_dy=0.0)
+    if eventos.empty:
+        print("[WARN] Nenhum evento encontrado, snapshot não gerado.")
+        return None
+
+    calendario = calendario_dias_uteis(
+        pd.to_datetime(start) - timedelta(days=FOLGA_DIAS),
+        pd.to_datetime(end) + timedelta(days=FOLGA_DIAS),
+    )
+    tickers = sorted(eventos["Ativo"].astype(str).unique())
+    painel = get_price_panel(tickers, calendario[0], calendario[-1])
+    precos = painel.reindex(index=calendario, columns=tickers).to_numpy(dtype=np.float32).T
+
+    # Sem preços, todo run a partir do snapshot daria zero trades
+    sem_preco = np.isnan(precos).all(axis=1)
+    if sem_preco.all():
+        raise ValueError(f"Nenhum preço encontrado para os {len(tickers)} tickers; snapshot não gerado")
+    if sem_preco.any():
+        faltando = [t for t, vazio in zip(tickers, sem_preco) if vazio]
+        print(f"[WARN] {len(faltando)} de {len(tickers)} tickers sem nenhum preço (seus eventos não geram trades): "
+              f"{', '.join(faltando)}")
+
+    ativos = pd.Categorical(eventos["Ativo"].astype(str), categories=tickers)
+    tipos = pd.Categorical(eventos["Tipo"].astype(str))
+
+    arrays = {
+        "tickers": np.array(tickers, dtype=str),
+        "tipos": np.array(tipos.categories, dtype=str),
+        "eventos_ticker": ativos.codes.astype(np.int32),
+        "eventos_tipo": tipos.codes.astype(np.int16),
+        "eventos_data_com": eventos["DataCom"].to_numpy(dtype="datetime64[D]").astype(np.int64),
+        "eventos_dy": eventos["DY"].to_numpy(dtype=np.float64),
+        "eventos_valor": eventos["ValorDividendo"].to_numpy(dtype=np.float64),
+        "calendario": calendario.to_numpy(dtype="datetime64[D]").astype(np.int64),
+        "precos": np.ascontiguousarray(precos),
+    }
+
+    # Grava em um diretório temporário e troca no final, para nunca deixar
+    # um snapshot pela metade no caminho definitivo
+    tmp_dir = output_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for nome, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{nome}.npy"), array)
+
+    meta = {
+        "versao": SNAPSHOT_VERSION,
+        "start": pd.to_datetime(start).strftime("%Y-%m-%d"),
+        "end": pd.to_datetime(end).strftime("%Y-%m-%d"),
+        "indice": indice,
+        "eventos": len(eventos),
+        "tickers": len(tickers),
+        "tickers_sem_preco": int(sem_preco.sum()),
+        "dias_uteis": len(calendario),
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    print(f"[INFO] Snapshot salvo em: {output_dir} ({meta['eventos']} eventos, {meta['tickers']} tickers)")
+    return output_dir
+
+
+@lru_cache(maxsize=4)
+def load_snapshot(path):
+    """
+    Abre um snapshot com memory map (sem copiar os arrays para a memória).
+    O resultado fica em cache no processo, então abrir de novo é instantâneo.
+    """
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    if meta.get("versao") != SNAPSHOT_VERSION:
+        raise ValueError(
+            f"Snapshot {path} está na versão {meta.get('versao')}, esperado {SNAPSHOT_VERSION}. Rode `prepare` novamente."
+        )
+
+    snap = {"meta": meta}
+    for arquivo in os.listdir(path):
+        if arquivo.endswith(".npy"):
+            snap[arquivo[:-4]] = np.load(os.path.join(path, arquivo), mmap_mode="r")
+    return snap
+
+
+def snapshot_events(snap, start=None, end=None, min_dy=0.0, stock_filter=None):
+    """
+    Reconstrói o DataFrame tipado de eventos a partir do snapshot, aplicando
+    os mesmos filtros de get_dividend_events. Períodos fora da janela do
+    snapshot geram ValueError (em vez de devolver só uma parte dos eventos).
+    """
+    meta = snap["meta"]
+    if (start is not None and pd.Timestamp(start) < pd.Timestamp(meta["start"])) or \
+            (end is not None and pd.Timestamp(end) > pd.Timestamp(meta["end"])):
+        raise ValueError(
+            f"Período {start} -> {end} fora do snapshot ({meta['start']} -> {meta['end']}). "
+            f"Rode `prepare` para o período desejado."
+        )
+
+    datas = np.asarray(snap["eventos_data_com"])
+    dy = np.asarray(snap["eventos_dy"])
+    codigos = np.asarray(snap["eventos_ticker"])
+
+    filtro = dy >= min_dy
+    if start is not None:
+        filtro &= datas >= pd.Timestamp(start).to_datetime64().astype("datetime64[D]").astype(np.int64)
+    if end is not None:
+        filtro &= datas <= pd.Timestamp(end).to_datetime64().astype("datetime64[D]").astype(np.int64)
+    if stock_filter:
+        tickers = list(np.asarray(snap["tickers"]))
+        codigo = tickers.index(stock_filter.upper()) if stock_filter.upper() in tickers else -1
+        filtro &= codigos == codigo
+
+    eventos = pd.DataFrame({
+        "Ativo": pd.Categorical.from_codes(codigos[filtro], categories=np.asarray(snap["tickers"])),
+        "DataCom": datas[filtro].astype("datetime64[D]").astype("datetime64[ns]"),
+        "DY": dy[filtro],
+        "ValorDividendo": np.asarray(snap["eventos_valor"])[filtro],
+        "Tipo": pd.Categorical.from_codes(np.asarray(snap["eventos_tipo"])[filtro], categories=np.asarray(snap["tipos"])),
+    })
+    return normalize_events(eventos)
+
+
+def snapshot_trades(snap, eventos, days_before, days_after, valor_investido, leve=False):
+    """
+    Equivalente a rank_best_trades usando o painel de preços do snapshot:
+    um gather para todos os eventos, sem acessar rede nem arquivos de cache.
+    """
+    from analyzer import build_trades_from_prices
+    from return_surface import gather_entry_exit_prices
+
+    if eventos.empty:
+        return pd.DataFrame(columns=TRADE_COLUMNS_LEVES)
+
+    dias_uteis = pd.DatetimeIndex(np.asarray(snap["calendario"]).astype("datetime64[D]"))
+    preco_compra, preco_venda, data_compra, data_venda = gather_entry_exit_prices(
+        np.asarray(snap["precos"]), dias_uteis, list(np.asarray(snap["tickers"])),
+        eventos["Ativo"], eventos["DataCom"], [days_before], [days_after],
+    )
+    return build_trades_from_prices(
+        eventos, preco_compra[:, 0], preco_venda[:, 0], data_compra[:, 0], data_venda[:, 0],
+        valor_investido, leve=leve,
+    )
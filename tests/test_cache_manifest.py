@@ -0,0 +1,111 @@
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import cache_manifest
+from cache_manifest import TTL_ERRO, CacheManifest, empty_ttl, price_key, read_frame
+
+
+@pytest.fixture
+def cache_vazio(tmp_path, monkeypatch):
+    """data_cache vazio no diretório temporário (os caminhos do manifesto são relativos)"""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data_cache")
+    return tmp_path
+
+
+def _candles(dia, valor=10.0):
+    dia = pd.Timestamp(dia)
+    indice = pd.DatetimeIndex([dia + timedelta(hours=h) for h in (10, 11, 12)])
+    return pd.DataFrame({"Open": [valor, valor + 0.5, valor + 1.0], "Close": [valor + 0.25] * 3}, index=indice)
+
+
+def _grava_precos(ticker, dia, df):
+    caminho = f"data_cache/price_{ticker}_{dia}.csv"
+    df.to_csv(caminho)
+    return caminho
+
+
+def test_reindex_apaga_csv_vazio_e_descarta_arquivos_sumidos(cache_vazio):
+    cheio = _grava_precos("AAAA3.SA", "2025-08-01", _candles("2025-08-01"))
+    vazio = _grava_precos("AAAA3.SA", "2025-08-04", _candles("2025-08-04").iloc[:0])
+    manifesto = CacheManifest()
+
+    assert not os.path.exists(vazio)
+    assert manifesto.lookup(price_key("AAAA3.SA", "2025-08-04"))["status"] == "vazio"
+    assert manifesto.lookup(price_key("AAAA3.SA", "2025-08-01"))["caminho"] == cheio
+
+    # Entrada "ok" cujo arquivo foi apagado por fora do manifesto
+    sumido = _grava_precos("BBBB4.SA", "2025-08-05", _candles("2025-08-05"))
+    manifesto.record(price_key("BBBB4.SA", "2025-08-05"), "precos", "ok", sumido, ticker="BBBB4.SA", inicio="2025-08-05")
+    os.remove(sumido)
+    manifesto.reindex()
+
+    assert manifesto.lookup(price_key("BBBB4.SA", "2025-08-05")) is None
+    assert manifesto.lookup(price_key("AAAA3.SA", "2025-08-01"))["status"] == "ok"
+    assert manifesto.lookup(price_key("AAAA3.SA", "2025-08-04"))["status"] == "vazio"
+
+
+def test_compact_mantem_as_linhas_de_cada_entrada(cache_vazio):
+    dias = ["2025-08-01", "2025-08-04", "2025-08-05"]
+    for i, dia in enumerate(dias):
+        _grava_precos("AAAA3.SA", dia, _candles(dia, 10.0 + i))
+    _grava_precos("BBBB4.SA", dias[0], _candles(dias[0], 30.0))
+    manifesto = CacheManifest()
+    chaves = [price_key("AAAA3.SA", dia) for dia in dias] + [price_key("BBBB4.SA", dias[0])]
+    antes = {chave: read_frame(manifesto.lookup(chave)) for chave in chaves}
+
+    assert manifesto.compact() == 4
+
+    for chave in chaves:
+        entrada = manifesto.lookup(chave)
+        assert os.path.dirname(entrada["caminho"]) == cache_manifest.COMPACT_DIR
+        pd.testing.assert_frame_equal(read_frame(entrada), antes[chave], check_freq=False)
+    assert not [nome for nome in os.listdir("data_cache") if nome.startswith("price_")]
+
+
+def test_evict_apaga_os_menos_usados_ate_caber(cache_vazio, monkeypatch):
+    caminhos = {}
+    for i, ticker in enumerate(["AAAA3.SA", "BBBB4.SA", "CCCC3.SA"]):
+        caminhos[ticker] = _grava_precos(ticker, "2025-08-01", _candles("2025-08-01", 10.0 + i))
+    manifesto = CacheManifest()
+    tamanhos = {ticker: os.path.getsize(c) for ticker, c in caminhos.items()}
+
+    # Ordem de uso: AAAA3, CCCC3, BBBB4 (o mais recente)
+    for hora, ticker in enumerate(["AAAA3.SA", "CCCC3.SA", "BBBB4.SA"]):
+        monkeypatch.setattr(cache_manifest, "_agora", lambda hora=hora: f"2099-01-01T0{hora}:00:00")
+        manifesto.lookup(price_key(ticker, "2025-08-01"))
+
+    limite = tamanhos["BBBB4.SA"] + tamanhos["CCCC3.SA"]
+    assert manifesto.evict(limite) == tamanhos["AAAA3.SA"]
+    assert not os.path.exists(caminhos["AAAA3.SA"])
+    assert manifesto.lookup(price_key("AAAA3.SA", "2025-08-01")) is None
+
+    assert manifesto.evict(tamanhos["BBBB4.SA"]) == tamanhos["CCCC3.SA"]
+    assert not os.path.exists(caminhos["CCCC3.SA"])
+    assert os.path.exists(caminhos["BBBB4.SA"])
+
+
+def test_cache_negativo_expira_conforme_o_tipo(cache_vazio, monkeypatch):
+    manifesto = CacheManifest()
+    hoje = pd.Timestamp.today().normalize()
+    recente = hoje.strftime("%Y-%m-%d")
+    antigo = (hoje - timedelta(days=365)).strftime("%Y-%m-%d")
+    manifesto.record(price_key("AAAA3.SA", recente), "precos", "vazio", ticker="AAAA3.SA", inicio=recente,
+                     ttl=empty_ttl(recente))
+    manifesto.record(price_key("AAAA3.SA", antigo), "precos", "vazio", ticker="AAAA3.SA", inicio=antigo,
+                     ttl=empty_ttl(antigo))
+    manifesto.record("eventos:x:y", "eventos", "erro", ttl=TTL_ERRO)
+
+    def consulta_daqui_a(intervalo):
+        instante = (datetime.now() + intervalo).isoformat(timespec="seconds")
+        monkeypatch.setattr(cache_manifest, "_agora", lambda: instante)
+        return [manifesto.lookup(chave) is not None
+                for chave in (price_key("AAAA3.SA", recente), price_key("AAAA3.SA", antigo), "eventos:x:y")]
+
+    assert consulta_daqui_a(timedelta(minutes=30)) == [True, True, True]
+    assert consulta_daqui_a(timedelta(hours=2)) == [True, True, False]
+    assert consulta_daqui_a(timedelta(days=2)) == [False, True, False]
+    assert consulta_daqui_a(timedelta(days=91)) == [False, False, False]
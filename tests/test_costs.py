@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from costs import apply_costs, monthly_tax
+
+# Modelo simples para as contas à mão: R$ 5 por ordem, 10 bps por ordem,
+# IR de 15% e isenção para meses com vendas até R$ 20 mil
+MODELO = {
+    "corretagem": 5.0,
+    "emolumentos_bps": 3.0,
+    "slippage_bps": 7.0,
+    "aliquota_ir": 0.15,
+    "isencao_mensal": 20000.0,
+}
+
+
+def test_ir_mensal_compensa_prejuizo_e_respeita_isencao():
+    meses = np.array([0, 0, 1, 2, 3, 4])
+    resultado = np.array([-300.0, 100.0, 500.0, -50.0, 1000.0, 200.0])
+    vendas = np.array([25000.0, 1000.0, 30000.0, 5000.0, 10000.0, 25000.0])
+
+    unicos, imposto = monthly_tax(meses, resultado, vendas, MODELO)
+
+    # Mês 0: -200 vira prejuízo; mês 1: 15% de (500 - 200); mês 2: -50 de
+    # prejuízo; mês 3: isento (vendas <= 20 mil), o prejuízo segue; mês 4:
+    # 15% de (200 - 50)
+    assert list(unicos) == [0, 1, 2, 3, 4]
+    np.testing.assert_allclose(imposto, [0.0, 45.0, 0.0, 0.0, 22.5])
+
+
+def test_ir_mensal_sem_aliquota_e_zero():
+    _, imposto = monthly_tax(np.array([0, 1]), np.array([5000.0, 8000.0]), np.array([50000.0, 50000.0]),
+                             {**MODELO, "aliquota_ir": 0.0})
+    assert not imposto.any()
+
+
+def _trades():
+    # Dividendo de R$ 50 por trade; a primeira linha vende depois da segunda
+    ganho = [300.0, 500.0, -800.0, 400.0, 710.0, 600.0]
+    retorno = [g + 50.0 for g in ganho]
+    return pd.DataFrame({
+        "Ticker": ["AAAA3", "BBBB4", "CCCC3", "AAAA3", "BBBB4", "CCCC3"],
+        "DataVenda": pd.to_datetime(["2025-01-28", "2025-01-10", "2025-02-14",
+                                     "2025-03-05", "2025-03-20", "2025-04-15"]),
+        "RetornoValorizacaoTotal(R$)": ganho,
+        "Retorno(R$)": retorno,
+        "Retorno(%)": [r / 100 for r in retorno],
+        "ValorTotal(R$)": [10000.0 + r for r in retorno],
+    })
+
+
+def test_apply_costs_meses_calculados_a_mao():
+    liquidos = apply_costs(_trades(), MODELO, 10000)
+
+    # Custos: 2 × 5 + 0,1% × (10.000 + venda)
+    custos = [30.30, 30.50, 29.20, 30.40, 30.71, 30.60]
+    # Jan: vendas 20.800 > 20 mil, resultado 269,70 + 469,50 -> IR 110,88 na
+    # venda de 28/01 (primeira linha). Fev: prejuízo de 829,20. Mar: vendas
+    # 21.110, resultado 1.048,89 - 829,20 = 219,69 -> IR 32,95 na venda de
+    # 20/03. Abr: vendas 10.600, isento.
+    imposto = [110.88, 0.0, 0.0, 0.0, 32.95, 0.0]
+    retorno = [208.82, 519.50, -779.20, 419.60, 696.34, 619.40]
+
+    np.testing.assert_allclose(liquidos["Custos(R$)"], custos)
+    np.testing.assert_allclose(liquidos["Imposto(R$)"], imposto)
+    np.testing.assert_allclose(liquidos["Retorno(R$)"], retorno)
+    np.testing.assert_allclose(liquidos["Retorno(%)"], [r / 100 for r in retorno], atol=0.006)
+    np.testing.assert_allclose(liquidos["ValorTotal(R$)"], [10000.0 + r for r in retorno])
+
+
+def test_apply_costs_nao_altera_o_cronograma_original():
+    trades = _trades()
+    apply_costs(trades, "padrao", 10000)
+    pd.testing.assert_frame_equal(trades, _trades())
+
+
+def test_modelo_desconhecido_falha():
+    with pytest.raises(ValueError, match="Modelo de custos desconhecido"):
+        apply_costs(_trades(), "inexistente", 10000)
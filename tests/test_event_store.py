@@ -0,0 +1,96 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import cache_manifest
+import data_fetcher
+from event_store import EventStore, find_index, index_path
+from file_utils import save_trades_to_csv
+
+JSON_EVENTOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "data_cache", "dividend_events_2025-08-01_2025-10-31.json")
+
+
+@pytest.fixture
+def cache_temporario(tmp_path, monkeypatch):
+    """Roda com um data_cache próprio (cópia do JSON de eventos do repositório)"""
+    os.makedirs(tmp_path / "data_cache")
+    shutil.copy(JSON_EVENTOS, tmp_path / "data_cache")
+    monkeypatch.chdir(tmp_path)
+    cache_manifest.get_manifest.cache_clear()
+    yield tmp_path
+    cache_manifest.get_manifest.cache_clear()
+
+
+def _store():
+    return EventStore(pd.DataFrame({
+        "Ativo": ["AAAA3", "BBBB4"],
+        "DataCom": pd.to_datetime(["2025-08-10", "2025-09-10"]),
+        "DY": [1.0, 2.0],
+        "ValorDividendo": [0.1, 0.2],
+        "Tipo": ["Dividendo", "JCP"],
+    }))
+
+
+def test_find_index_ignora_indice_buscado_antes_do_fim_da_janela(tmp_path):
+    base = str(tmp_path)
+    _store().save("2025-08-01", "2025-10-31", base_dir=base, buscado_em="2025-09-15T10:00:00")
+
+    assert find_index("2025-08-05", "2025-09-10", base_dir=base) == index_path("2025-08-01", "2025-10-31", base)
+    assert find_index("2025-08-05", "2025-10-20", base_dir=base) is None
+
+
+def test_indice_so_e_gravado_quando_falta(cache_temporario, monkeypatch):
+    gravacoes = []
+    salvar = EventStore.save
+    monkeypatch.setattr(EventStore, "save", lambda self, *a, **k: gravacoes.append(a) or salvar(self, *a, **k))
+
+    primeiro = data_fetcher.get_dividend_events("2025-08-01", "2025-10-31", min_dy=0.0)
+    segundo = data_fetcher.get_dividend_events("2025-08-01", "2025-10-31", min_dy=0.0)
+
+    assert len(gravacoes) == 1
+    pd.testing.assert_frame_equal(primeiro, segundo)
+
+
+def test_nome_do_csv_de_trades_inclui_o_ativo(cache_temporario):
+    trades = pd.DataFrame({"Retorno(R$)": [10.0]})
+    geral = save_trades_to_csv(trades.copy(), 2.5, 18, 25, True, 1000)
+    ativo = save_trades_to_csv(trades.copy(), 2.5, 18, 25, True, 1000, stock_filter="petr4")
+
+    assert geral != ativo
+    assert "PETR4" in ativo
+
+
+def test_empates_na_data_com_mantem_a_ordem_da_api_para_qualquer_min_dy(tmp_path, monkeypatch):
+    # Mais de 16 eventos por data: o sort padrão (quicksort) já não é estável
+    codigos = [f"T{i:03d}3" for i in range(40)]
+    resposta = {"dateCom": [{
+        "code": codigo,
+        "dateCom": "15/08/2025" if i % 2 else "01/09/2025",
+        "dy": f"{(i * 7) % 13 / 4:.2f}".replace(".", ","),
+        "resultAbsoluteValue": "0,10",
+        "earningType": "Dividendo",
+    } for i, codigo in enumerate(codigos)]}
+
+    class Resposta:
+        status_code = 200
+
+        def json(self):
+            return resposta
+
+    import requests
+    monkeypatch.setattr(requests, "get", lambda *args, **kwargs: Resposta())
+    monkeypatch.chdir(tmp_path)
+
+    todos = data_fetcher.get_dividend_events("2025-08-01", "2025-09-30", min_dy=0.0,
+                                             usar_cache=False, gravar_cache=False)
+    filtrados = data_fetcher.get_dividend_events("2025-08-01", "2025-09-30", min_dy=1.0,
+                                                 usar_cache=False, gravar_cache=False)
+
+    ordem_api = codigos[1::2] + codigos[::2]
+    assert list(todos["Ativo"].astype(str)) == ordem_api
+    esperado = todos[todos["DY"] >= 1.0]
+    assert 16 < len(esperado) < len(todos)
+    assert list(filtrados["Ativo"].astype(str)) == list(esperado["Ativo"].astype(str))
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtester import run_backtest
+from date_extensions import parse_date
+from file_utils import save_trades_to_csv
+from kernels import capital_min, capital_path, dates_to_kernel_days, schedule_mask
+from scheduler import schedule_trades
+
+# Versões de referência: os laços com iterrows originais de schedule_trades,
+# save_trades_to_csv e run_backtest (sem os prints), usados como oráculo.
+
+
+def _schedule_original(df_trades, allow_overlap):
+    selecionados = []
+    last_sell_date = None
+    for indice, trade in df_trades.iterrows():
+        data_compra = parse_date(trade["DataCompra"])
+        if allow_overlap or last_sell_date is None or data_compra > last_sell_date:
+            selecionados.append(indice)
+            last_sell_date = parse_date(trade["DataVenda"])
+    return selecionados
+
+
+def _capital_original(df, capital):
+    acumulado = []
+    for _, trade in df.iterrows():
+        capital += trade["Retorno(R$)"]
+        acumulado.append(capital)
+    return acumulado
+
+
+def _backtest_original(trades_df, capital):
+    capital_min = capital
+    historico = []
+    for _, trade in trades_df.iterrows():
+        capital = trade["CapitalAcumulado(R$)"]
+        if capital < capital_min:
+            capital_min = capital
+        historico.append({
+            "Ticker": trade["Ticker"],
+            "RetornoR$": round(trade["RetornoValorizacaoTotal(R$)"], 2),
+            "CapitalAcumulado(R$)": round(trade["CapitalAcumulado(R$)"], 2),
+        })
+    return capital, capital_min, historico
+
+
+def _trades(n, seed):
+    """Trades com datas válidas (rank_best_trades descarta linhas sem data), ordenados por DataCom"""
+    rng = np.random.default_rng(seed)
+    data_com = pd.Timestamp("2023-01-02") + pd.to_timedelta(np.sort(rng.integers(0, 700, n)), unit="D")
+    compra = data_com - pd.to_timedelta(rng.integers(0, 20, n), unit="D")
+    venda = data_com + pd.to_timedelta(rng.integers(1, 30, n), unit="D")
+    valorizacao = np.round(rng.normal(0, 40, n), 2)
+    return pd.DataFrame({
+        "Ticker": rng.choice(["AAAA3", "BBBB4", "CCCC3"], n),
+        "DataCom": data_com,
+        "DataCompra": compra,
+        "DataVenda": venda,
+        "RetornoValorizacaoTotal(R$)": valorizacao,
+        "Retorno(R$)": np.round(valorizacao + rng.uniform(0, 30, n), 2),
+    })
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("allow_overlap", [False, True])
+def test_schedule_trades_igual_ao_laco_original(seed, allow_overlap):
+    trades = _trades(400, seed)
+
+    esperado = _schedule_original(trades, allow_overlap)
+    obtido = schedule_trades(trades, allow_overlap, verbose=False)
+
+    assert list(obtido.index) == esperado
+
+
+@pytest.mark.parametrize("usar_jit", [False, True])
+@pytest.mark.parametrize("allow_overlap", [False, True])
+def test_schedule_mask_igual_ao_laco_original(usar_jit, allow_overlap):
+    trades = _trades(1000, 7)
+
+    mascara = schedule_mask(dates_to_kernel_days(trades["DataCompra"]), dates_to_kernel_days(trades["DataVenda"]),
+                            allow_overlap, usar_jit=usar_jit)
+
+    assert list(np.flatnonzero(mascara)) == _schedule_original(trades, allow_overlap)
+
+
+@pytest.mark.parametrize("usar_jit", [False, True])
+def test_capital_path_igual_ao_laco_original(usar_jit):
+    trades = _trades(2000, 3)
+
+    obtido = capital_path(trades["Retorno(R$)"].to_numpy(), 1000.0, usar_jit=usar_jit)
+
+    # Soma em sequência: o resultado tem que ser idêntico, não só próximo
+    assert list(obtido) == _capital_original(trades, 1000.0)
+
+
+def test_save_trades_to_csv_igual_ao_laco_original(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    trades = _trades(500, 11)
+    esperado = _capital_original(trades, 1000)
+
+    save_trades_to_csv(trades, 1.0, 2, 3, False, 1000)
+
+    assert list(trades["CapitalAcumulado(R$)"]) == esperado
+
+
+@pytest.mark.parametrize("usar_jit", [False, True])
+def test_backtest_igual_ao_laco_original(usar_jit):
+    trades = _trades(800, 5)
+    trades["CapitalAcumulado(R$)"] = _capital_original(trades, 1000)
+    for coluna in ["PrecoCompra", "PrecoVenda", "RetornoValorizacaoTotal(%)", "RetornoDividendoTotal(%)", "Retorno(%)"]:
+        trades[coluna] = 0.0
+
+    capital, minimo, historico = run_backtest(trades, False, 1000)
+    capital_esperado, minimo_esperado, historico_esperado = _backtest_original(trades, 1000)
+
+    assert capital == capital_esperado
+    assert minimo == minimo_esperado
+    assert capital_min(trades["CapitalAcumulado(R$)"], 1000, usar_jit=usar_jit) == minimo_esperado
+    assert [{k: h[k] for k in ("Ticker", "RetornoR$", "CapitalAcumulado(R$)")} for h in historico] == historico_esperado
+
+
+def test_jit_igual_a_versao_numpy_com_datas_invalidas():
+    # Sem Numba os dois caminhos são o mesmo; com Numba compara JIT x Python
+    rng = np.random.default_rng(0)
+    compra = np.sort(rng.integers(19000, 20000, 2000))
+    venda = compra + rng.integers(1, 40, 2000)
+    compra[rng.random(2000) < 0.02] = np.iinfo(np.int64).min
+
+    for allow_overlap in (False, True):
+        for ultima in (np.iinfo(np.int64).min, int(compra[1000])):
+            np.testing.assert_array_equal(
+                schedule_mask(compra, venda, allow_overlap, ultima, usar_jit=True),
+                schedule_mask(compra, venda, allow_overlap, ultima, usar_jit=False),
+            )
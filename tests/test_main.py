@@ -0,0 +1,60 @@
+import inspect
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+
+
+def test_run_sem_argumentos_usa_os_padroes_de_run_strategy(monkeypatch):
+    padroes = {nome: p.default for nome, p in inspect.signature(main.run_strategy).parameters.items()}
+    chamadas = []
+    monkeypatch.setattr(main, "run_strategy", lambda **kwargs: chamadas.append(kwargs))
+
+    args = main.build_parser().parse_args(["run"])
+    args.func(args)
+
+    (kwargs,) = chamadas
+    for nome, valor in kwargs.items():
+        if nome not in ("verbose", "stock_filter"):
+            assert valor == padroes[nome], nome
+    assert kwargs["verbose"] is True
+
+
+def test_orcamento_conta_desde_a_criacao_do_processo():
+    if not os.path.exists("/proc/self/stat"):
+        pytest.skip("sem /proc")
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    codigo = "import time; time.sleep(0.3); import main; print(main.tempo_desde_inicio())"
+    saida = subprocess.run([sys.executable, "-c", codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    assert float(saida.stdout) >= 0.3
+
+
+def test_report_verifica_orcamento_sem_timing(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "optimization").mkdir()
+    (tmp_path / "optimization" / "results_1.csv").write_text("CapitalAcumulado(R$),CapitalAcumuladoMinimo(R$)\n1,1\n")
+    monkeypatch.setattr(main, "tempo_desde_inicio", lambda: 5.0)
+
+    args = main.build_parser().parse_args(["report"])
+    args.func(args)
+    assert "[WARN] report: primeira saída em 5000 ms" in capsys.readouterr().out
+
+
+def test_cache_stats_so_avisa_quando_estoura_o_orcamento(tmp_path, monkeypatch, capsys):
+    import cache_manifest
+    monkeypatch.chdir(tmp_path)
+    cache_manifest.get_manifest.cache_clear()
+    try:
+        args = main.build_parser().parse_args(["cache"])
+        monkeypatch.setattr(main, "tempo_desde_inicio", lambda: 0.1)
+        args.func(args)
+        assert "primeira saída" not in capsys.readouterr().out
+
+        monkeypatch.setattr(main, "tempo_desde_inicio", lambda: 5.0)
+        args.func(args)
+        assert "[WARN] cache: primeira saída" in capsys.readouterr().out
+    finally:
+        cache_manifest.get_manifest.cache_clear()
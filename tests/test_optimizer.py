@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import analyzer
+import data_fetcher
+import optimizer
+from date_extensions import calendario_dias_uteis
+from main import run_strategy
+from optimizer import (
+    _combination_key, is_dominated, iter_parameter_combinations, load_incremental_state,
+    run_incremental_optimization, run_optimization, save_incremental_state,
+)
+
+GRADE = {
+    'min_dy': [0.5, 1.0, 1.5, 2.0, 2.5],
+    'days_before': [1, 5],
+    'days_after': [1],
+    'allow_overlap': [False, True],
+    'valor_investido': [1000],
+    'custos': ['sem_custos'],
+}
+
+
+def _params(min_dy, overlap):
+    return {'min_dy': min_dy, 'days_before': 1, 'days_after': 1, 'allow_overlap': overlap,
+            'valor_investido': 1000, 'custos': 'sem_custos'}
+
+
+def test_grosso_para_fino_cobre_a_grade_inteira():
+    sequencial = list(iter_parameter_combinations(GRADE))
+    grosso = list(iter_parameter_combinations(GRADE, "grosso_para_fino"))
+
+    assert sorted(map(_combination_key, grosso)) == sorted(map(_combination_key, sequencial))
+    # Os extremos de min_dy vêm antes do meio
+    assert {p['min_dy'] for p in grosso[:8]} == {0.5, 2.5}
+
+
+def test_poda_compara_so_dentro_da_fatia():
+    # Overlap rende muito mais que sem overlap; isso não pode podar a fatia sem overlap
+    avaliados = {
+        _combination_key(_params(0.5, True)): 5000.0,
+        _combination_key(_params(2.5, True)): 4800.0,
+        _combination_key(_params(0.5, False)): 1200.0,
+        _combination_key(_params(2.5, False)): 1150.0,
+    }
+    assert not is_dominated(_params(1.5, False), avaliados, 0.9, GRADE)
+
+    # Dentro da fatia, vizinhos bem abaixo do melhor podam
+    avaliados[_combination_key(_params(1.5, False))] = 1100.0
+    avaliados[_combination_key(_params(2.5, False))] = 2000.0
+    assert is_dominated(_params(1.0, False), avaliados, 0.9, GRADE)
+
+
+# --- Otimização incremental contra execuções completas ---
+
+GRADE_INCREMENTAL = {
+    'min_dy': [0.5, 1.5],
+    'days_before': [1, 3],
+    'days_after': [2, 5],
+    'allow_overlap': [False, True],
+    'valor_investido': [1000],
+    'custos': ['sem_custos'],
+}
+INICIO, FIM = "2025-03-01", "2025-10-31"
+
+
+def _evento(ativo, data_com, dy, valor, tipo="Dividendo"):
+    return {"Ativo": ativo, "DataCom": pd.Timestamp(data_com), "DY": dy, "ValorDividendo": valor, "Tipo": tipo}
+
+
+@pytest.fixture
+def fontes_incrementais(tmp_path, monkeypatch):
+    """
+    Fonte de eventos mutável (lista na ordem da API) e preços sintéticos,
+    usados tanto pela otimização incremental quanto por run_strategy
+    """
+    monkeypatch.chdir(tmp_path)
+    dias = calendario_dias_uteis("2025-01-01", "2025-12-31")
+    passos = np.arange(len(dias), dtype=np.float64)
+    painel = pd.DataFrame({
+        "AAAA3": 10.0 + 0.02 * passos + np.sin(passos / 3),
+        "BBBB4": 25.0 - 0.01 * passos + np.cos(passos / 4),
+        "CCCC3": 8.0 + 0.5 * np.sin(passos / 7),
+    }, index=dias)
+    api = [
+        _evento("AAAA3", "2025-03-20", 1.2, 0.15),
+        _evento("BBBB4", "2025-03-20", 2.0, 0.5, "JCP"),
+        _evento("CCCC3", "2025-04-22", 0.8, 0.07),
+        _evento("AAAA3", "2025-05-14", 1.8, 0.2),
+        _evento("BBBB4", "2025-06-18", 0.6, 0.15),
+        _evento("CCCC3", "2025-07-10", 2.5, 0.2),
+        _evento("AAAA3", "2025-08-11", 0.9, 0.1),
+        _evento("BBBB4", "2025-09-15", 1.6, 0.4),
+    ]
+
+    def eventos_stub(start, end, indice="ibovespa", min_dy=0.7, stock_filter=None, **kwargs):
+        df = pd.DataFrame(api)
+        df = df[(df["DataCom"] >= pd.Timestamp(start)) & (df["DataCom"] <= pd.Timestamp(end)) & (df["DY"] >= min_dy)]
+        return df.sort_values("DataCom", kind="stable").reset_index(drop=True)
+
+    def precos_stub(ticker, start_day, start_next, end_day, end_next):
+        ativo = ticker.removesuffix(".SA")
+        return pd.DataFrame({
+            "Date": [start_next, end_next],
+            "Open": [painel.at[pd.Timestamp(start_next), ativo], painel.at[pd.Timestamp(end_next), ativo]],
+            "Close": [0.0, 0.0],
+        })
+
+    monkeypatch.setattr(data_fetcher, "get_dividend_events", eventos_stub)
+    monkeypatch.setattr(analyzer, "get_price_history", precos_stub)
+    return api
+
+
+def _confere_com_execucao_completa(results_file, total=16):
+    resultados = pd.read_csv(results_file)
+    assert len(resultados) == total
+    for linha in resultados.to_dict("records"):
+        capital, capital_min, _, _ = run_strategy(
+            min_dy=linha["min_dy"], days_before=linha["days_before"], days_after=linha["days_after"],
+            allow_overlap=linha["allow_overlap"], valor_investido=linha["valor_investido"],
+            start=INICIO, end=FIM, verbose=False, custos=linha["custos"],
+        )
+        assert linha["CapitalAcumulado(R$)"] == pytest.approx(capital), linha
+        assert linha["CapitalAcumuladoMinimo(R$)"] == pytest.approx(capital_min), linha
+
+
+def test_incremental_igual_a_execucao_completa(fontes_incrementais, tmp_path):
+    api = fontes_incrementais
+    estado = str(tmp_path / "estado.pkl")
+
+    _confere_com_execucao_completa(run_incremental_optimization(INICIO, FIM, state_file=estado, params=GRADE_INCREMENTAL))
+
+    # Evento novo empatado na data com e um evento revisado (JCP anunciado depois)
+    api.insert(2, _evento("CCCC3", "2025-03-20", 1.0, 0.09))
+    api[4] = _evento("AAAA3", "2025-05-14", 3.1, 0.45, "Consolidado")
+    _confere_com_execucao_completa(run_incremental_optimization(INICIO, FIM, state_file=estado, params=GRADE_INCREMENTAL))
+
+    # Evento removido e evento revisado para baixo do DY mínimo
+    del api[0]
+    api[-1] = _evento("BBBB4", "2025-09-15", 1.0, 0.25)
+    _confere_com_execucao_completa(run_incremental_optimization(INICIO, FIM, state_file=estado, params=GRADE_INCREMENTAL))
+
+
+def test_estado_incremental_recomeca_quando_o_periodo_muda(tmp_path):
+    arquivo = str(tmp_path / "estado.pkl")
+    estado = load_incremental_state(arquivo, INICIO, FIM)
+    estado["combinacoes"]["x"] = {"capital": 1}
+    save_incremental_state(arquivo, estado)
+
+    assert load_incremental_state(arquivo, INICIO, FIM)["combinacoes"] == {"x": {"capital": 1}}
+    assert load_incremental_state(arquivo, INICIO, "2025-09-30")["combinacoes"] == {}
+    assert load_incremental_state(arquivo, "2025-02-01", FIM)["combinacoes"] == {}
+
+
+def test_otimizacao_monta_o_cronograma_uma_vez_por_grupo_de_custos(fontes_incrementais, monkeypatch):
+    grade = {**GRADE_INCREMENTAL, 'custos': ['sem_custos', 'padrao', 'conservador']}
+    chamadas = []
+    montar = optimizer.schedule_strategy
+    monkeypatch.setattr(optimizer, "schedule_strategy", lambda **kwargs: chamadas.append(kwargs) or montar(**kwargs))
+
+    # Lotes de 5: grupos de 3 modelos atravessam os lotes
+    results_file = run_optimization(INICIO, FIM, params=grade, chunk_size=5)
+
+    assert len(chamadas) == 16
+    _confere_com_execucao_completa(results_file, total=48)
+    resultados = pd.read_csv(results_file)
+    sem_custos = resultados["custos"] == "sem_custos"
+    assert not resultados.loc[sem_custos, "csv_file"].str.contains("_custos_").any()
+    assert resultados.loc[~sem_custos, "csv_file"].str.contains("_custos_").all()
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import plotter
+from plotter import aggregate_returns_by_month, downsample_series
+
+
+def test_meses_de_datas_iso_do_csv(tmp_path):
+    # Datas ISO com dia <= 12 não podem ter dia e mês trocados
+    df = pd.DataFrame({
+        "DataCom": ["2025-08-05", "2025-09-01", "2025-10-12", "2025-10-30"],
+        "RetornoValorizacaoTotal(%)": [1.0, 2.0, 3.0, 4.0],
+        "RetornoDividendoTotal(%)": [0.5, 0.5, 0.5, 0.5],
+    })
+    arquivo = tmp_path / "trades.csv"
+    df.to_csv(arquivo, sep=";", index=False, encoding="utf-8-sig")
+
+    mensal = aggregate_returns_by_month(pd.read_csv(arquivo, sep=";", encoding="utf-8-sig"))
+
+    assert list(mensal.index) == ["08/2025", "09/2025", "10/2025"]
+    assert mensal.loc["10/2025", "RetornoValorizacaoTotal(%)"] == 7.0
+
+
+def _downsample_original(x, y, max_pontos):
+    """Versão original (laço por bloco com idxmin/idxmax), como referência"""
+    n = len(y)
+    if n <= max_pontos:
+        return list(x), list(y)
+    valores = pd.Series(list(y))
+    blocos = max(1, max_pontos // 2)
+    tamanho = -(-n // blocos)
+    indices = {0, n - 1}
+    for inicio in range(0, n, tamanho):
+        bloco = valores.iloc[inicio:inicio + tamanho]
+        indices.add(int(bloco.idxmin()))
+        indices.add(int(bloco.idxmax()))
+    indices = sorted(indices)
+    x = list(x)
+    return [x[i] for i in indices], [valores.iloc[i] for i in indices]
+
+
+@pytest.mark.parametrize("n,max_pontos", [(5000, 2000), (4001, 2000), (997, 100), (50, 100), (10, 3)])
+def test_downsample_igual_ao_laco_original(n, max_pontos):
+    rng = np.random.default_rng(n)
+    # Valores inteiros forçam empates entre mínimo/máximo dentro dos blocos
+    y = np.cumsum(rng.integers(-3, 4, n)).astype(float)
+    x = pd.date_range("2020-01-01", periods=n, freq="D")
+
+    x_novo, y_novo = downsample_series(x, y, max_pontos)
+    x_ref, y_ref = _downsample_original(x, y, max_pontos)
+
+    assert x_novo == x_ref
+    assert y_novo == y_ref
+    assert len(y_novo) <= max_pontos + 2
+
+
+def test_render_converte_datas_em_texto(tmp_path, monkeypatch):
+    recebidos = []
+    original = plotter._draw_equity_curve
+    monkeypatch.setattr(plotter, "_draw_equity_curve", lambda fig, df: (recebidos.append(df), original(fig, df)))
+
+    historico = [
+        {"Ticker": "AAAA3", "DataCom": "2025-08-05", "CapitalAcumulado(R$)": 1010.0,
+         "RetornoValorizacaoTotal(%)": 1.0, "RetornoDividendoTotal(%)": 0.5},
+        {"Ticker": "BBBB4", "DataCom": "2025-09-01", "CapitalAcumulado(R$)": 1030.0,
+         "RetornoValorizacaoTotal(%)": 1.5, "RetornoDividendoTotal(%)": 0.5},
+    ]
+    saida = plotter.render_equity_chart(historico, str(tmp_path / "grafico.png"))
+
+    assert saida and os.path.exists(saida)
+    assert pd.api.types.is_datetime64_any_dtype(recebidos[0]["DataCom"])
+    assert recebidos[0]["DataCom"].iloc[0] == pd.Timestamp("2025-08-05")
@@ -0,0 +1,122 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analyzer
+import cache_manifest
+import data_fetcher
+from date_extensions import calendario_dias_uteis
+from return_surface import build_return_surface
+
+DAYS_BEFORE = [0, 1, 3, 5]
+DAYS_AFTER = [0, 2, 7]
+
+
+def _painel():
+    dias = calendario_dias_uteis("2025-06-01", "2025-12-31")
+    passos = np.arange(len(dias), dtype=np.float64)
+    return pd.DataFrame({
+        "AAAA3": 10.0 + 0.1 * passos,
+        "BBBB4": 30.0 - 0.05 * passos + np.sin(passos),
+    }, index=dias)
+
+
+def _eventos():
+    # Datas com em feriado (07/09, domingo), sábado e dia útil
+    return pd.DataFrame({
+        "Ativo": ["AAAA3", "BBBB4", "AAAA3", "BBBB4"],
+        "DataCom": pd.to_datetime(["2025-09-07", "2025-08-20", "2025-10-11", "2025-11-03"]),
+        "DY": [1.2, 2.5, 0.8, 1.0],
+        "ValorDividendo": [0.15, 0.7, 0.1, 0.3],
+        "Tipo": ["Dividendo", "JCP", "Dividendo", "Dividendo"],
+    })
+
+
+def test_superficie_igual_a_rank_best_trades(monkeypatch):
+    painel = _painel()
+
+    def precos_stub(ticker, start_day, start_next, end_day, end_next):
+        ativo = ticker.removesuffix(".SA")
+        return pd.DataFrame({
+            "Date": [start_next, end_next],
+            "Open": [painel.at[pd.Timestamp(start_next), ativo], painel.at[pd.Timestamp(end_next), ativo]],
+            "Close": [0.0, 0.0],
+        })
+
+    monkeypatch.setattr(analyzer, "get_price_history", precos_stub)
+    eventos = _eventos()
+    superficie = build_return_surface(eventos, DAYS_BEFORE, DAYS_AFTER, painel=painel)
+
+    for i, days_before in enumerate(DAYS_BEFORE):
+        for j, days_after in enumerate(DAYS_AFTER):
+            trades = analyzer.rank_best_trades(eventos, days_before, days_after, 1000)
+            assert len(trades) == len(eventos)
+            np.testing.assert_allclose(superficie["retorno_preco"][:, i, j],
+                                       trades["RetornoValorizacaoTotal(%)"], atol=0.01)
+            np.testing.assert_allclose(superficie["retorno_dividendo"][:, i, j],
+                                       trades["RetornoDividendoTotal(R$)"] / 1000 * 100, atol=0.01)
+
+
+def test_superficie_sem_preco_vira_nan():
+    painel = _painel().drop(columns="BBBB4")
+    superficie = build_return_surface(_eventos(), DAYS_BEFORE, DAYS_AFTER, painel=painel)
+
+    bbbb4 = (superficie["eventos"]["Ativo"] == "BBBB4").to_numpy()
+    assert np.isnan(superficie["retorno_total"][bbbb4]).all()
+    assert not np.isnan(superficie["retorno_total"][~bbbb4]).any()
+
+
+@pytest.fixture
+def manifesto_temporario(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cache_manifest.get_manifest.cache_clear()
+    yield tmp_path
+    cache_manifest.get_manifest.cache_clear()
+
+
+def _candles(inicio, fim):
+    """Candles de 1h (10h, 11h e 12h) em cada dia útil; abertura das 11h = dia do mês"""
+    dias = pd.bdate_range(inicio, fim)
+    indice = pd.DatetimeIndex([d + timedelta(hours=h) for d in dias for h in (10, 11, 12)])
+    abertura = [float(d.day) + (0.0 if h == 11 else 0.5) for d in dias for h in (10, 11, 12)]
+    return pd.DataFrame({"Open": abertura, "Close": abertura}, index=indice)
+
+
+def test_painel_baixa_em_janelas_e_usa_precos_diarios(manifesto_temporario, monkeypatch):
+    hoje = pd.Timestamp.today().normalize()
+    inicio, fim = hoje - timedelta(days=850), hoje - timedelta(days=1)
+    chamadas = []
+
+    class TickerStub:
+        def history(self, start, end, interval):
+            chamadas.append((pd.Timestamp(start), pd.Timestamp(end)))
+            return _candles(start, pd.Timestamp(end) - timedelta(days=1))
+
+    monkeypatch.setattr(data_fetcher, "_get_ticker", lambda simbolo: TickerStub())
+
+    # Um dia antigo (fora do alcance do Yahoo) já baixado por get_price_history
+    antigo = pd.bdate_range(inicio, inicio + timedelta(days=10))[3]
+    manifesto = cache_manifest.get_manifest()
+    dia = antigo.strftime("%Y-%m-%d")
+    caminho = f"data_cache/price_AAAA3.SA_{dia}.csv"
+    _candles(antigo, antigo).to_csv(caminho)
+    manifesto.record(cache_manifest.price_key("AAAA3.SA", dia), "precos", "ok", caminho,
+                     ticker="AAAA3.SA", inicio=dia)
+
+    painel = data_fetcher.get_price_panel(["AAAA3"], inicio, fim)
+
+    assert chamadas
+    limite = hoje - timedelta(days=data_fetcher.MAX_DIAS_1H - 1)
+    for inicio_chamada, fim_chamada in chamadas:
+        assert fim_chamada - inicio_chamada <= timedelta(days=data_fetcher.MAX_DIAS_1H)
+        assert inicio_chamada >= limite
+    assert painel.at[antigo, "AAAA3"] == float(antigo.day)
+    assert painel.index.max() == pd.bdate_range(inicio, fim)[-1]
+
+    # Segunda chamada sai toda do cache
+    chamadas.clear()
+    novo = data_fetcher.get_price_panel(["AAAA3"], inicio, fim)
+    assert chamadas == []
+    pd.testing.assert_frame_equal(novo, painel, check_freq=False)
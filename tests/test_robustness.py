@@ -0,0 +1,63 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from robustness import _monthly_blocks, simulate_trades
+
+
+def _trades_csv(tmp_path):
+    # Três meses de vendas, com dias <= 12 (trocar dia/mês daria meses errados)
+    df = pd.DataFrame({
+        "DataVenda": ["2025-08-05", "2025-08-11", "2025-09-01", "2025-09-12", "2025-10-03", "2025-10-28"],
+        "Retorno(R$)": [10.0, -5.0, 20.0, 1.0, -3.0, 7.0],
+    })
+    arquivo = tmp_path / "trades.csv"
+    df.to_csv(arquivo, sep=";", index=False, encoding="utf-8-sig")
+    return pd.read_csv(arquivo, sep=";", encoding="utf-8-sig")
+
+
+def test_blocos_mensais_sao_meses_de_venda(tmp_path):
+    trades = _trades_csv(tmp_path)
+    blocos = _monthly_blocks(trades, trades["Retorno(R$)"].to_numpy(), "DataVenda")
+
+    assert blocos.shape == (3, 2)
+    np.testing.assert_array_equal(blocos, [[10.0, -5.0], [20.0, 1.0], [-3.0, 7.0]])
+
+
+def test_bloco_mensal_preserva_soma_dos_meses(tmp_path):
+    trades = _trades_csv(tmp_path)
+    sims = simulate_trades(trades, 1000, n_sims=200, metodo="bloco_mensal", seed=1)
+
+    # Cada caminho é a soma de 3 meses sorteados: 5, 21 ou 4
+    possiveis = {1000 + a + b + c for a in (5, 21, 4) for b in (5, 21, 4) for c in (5, 21, 4)}
+    assert set(np.round(sims["capital_final"], 6)) <= possiveis
+
+
+def test_simulacoes_em_lotes_limitam_a_memoria():
+    rng = np.random.default_rng(0)
+    trades = pd.DataFrame({"Retorno(R$)": rng.normal(1.0, 10.0, 2000)})
+
+    tracemalloc.start()
+    sims = simulate_trades(trades, 1000, n_sims=5000, metodo="bootstrap", seed=1)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert len(sims["capital_final"]) == 5000
+    # Sem lotes, cada matriz 5000 x 2000 teria 80 MB
+    assert pico < 30e6
+
+
+@pytest.mark.parametrize("metodo", ["bootstrap", "permutacao", "bloco_mensal"])
+def test_lotes_pequenos_cobrem_todas_as_simulacoes(tmp_path, metodo):
+    trades = _trades_csv(tmp_path)
+    sims = simulate_trades(trades, 1000, n_sims=23, metodo=metodo, seed=3, tamanho_lote=5)
+
+    assert all(len(valores) == 23 for valores in sims.values())
+    if metodo == "permutacao":
+        # Embaralhar não muda a soma: todo caminho termina no mesmo capital
+        np.testing.assert_allclose(sims["capital_final"], 1000 + trades["Retorno(R$)"].sum())
+    # Mesma semente e mesmo lote: mesmo resultado
+    repetido = simulate_trades(trades, 1000, n_sims=23, metodo=metodo, seed=3, tamanho_lote=5)
+    np.testing.assert_array_equal(sims["capital_final"], repetido["capital_final"])
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from file_utils import save_trades_to_csv
+from schema import TRADE_COLUMNS_LEVES, TRADE_DTYPES, normalize_events, normalize_trades, parse_dates, parse_number
+
+
+def _trades():
+    return pd.DataFrame({
+        "Ticker": ["AAAA3", "BBBB4", "CCCC3"],
+        "DataCom": ["05/08/2025", "2025-09-01", "12/10/2025"],
+        "DataCompra": ["2025-08-01", "2025-08-28", "2025-10-09"],
+        "DataVenda": ["2025-08-07", "2025-09-03", "2025-10-14"],
+        "DY": ["1,25", "0.8", 2],
+        "ValorDividendo": [0.1, 0.2, 0.3],
+        "PrecoCompra": [10.37, 21.11, 7.03],
+        "PrecoVenda": [10.91, 20.87, 7.29],
+        "RetornoValorizacaoTotal(%)": [5.21, -1.14, 3.7],
+        "RetornoValorizacaoTotal(R$)": [52.07, -11.37, 36.98],
+        "RetornoDividendoTotal(%)": [1.25, 0.8, 2.0],
+        "RetornoDividendoTotal(R$)": [9.64, 9.47, 42.67],
+        "Retorno(%)": [6.46, -0.34, 5.7],
+        "Retorno(R$)": [61.71, -1.9, 79.65],
+        "ValorTotal(R$)": [1061.71, 998.1, 1079.65],
+        "Tipo": ["Dividendo", "JCP", "Dividendo"],
+    })
+
+
+def test_parse_number_aceita_virgula_e_texto_invalido():
+    valores = parse_number(pd.Series(["1,5", "2.25", "abc", None, "3"]))
+    assert valores.dtype == "float64"
+    assert list(valores) == [1.5, 2.25, 0.0, 0.0, 3.0]
+
+    numericos = parse_number(pd.Series([1, 2], dtype="int64"))
+    assert numericos.dtype == "float64"
+
+
+def test_parse_dates_sempre_em_nanossegundos():
+    texto = parse_dates(pd.Series(["05/08/2025", "2025-09-01"]))
+    assert texto.dtype == "datetime64[ns]"
+    assert list(texto) == [pd.Timestamp("2025-08-05"), pd.Timestamp("2025-09-01")]
+
+    segundos = pd.Series(np.array(["2025-01-02"], dtype="datetime64[s]"))
+    assert parse_dates(segundos).dtype == "datetime64[ns]"
+
+
+def test_normalize_trades_leve_tipos_declarados():
+    df = normalize_trades(_trades(), leve=True)
+
+    assert list(df.columns) == [c for c in TRADE_COLUMNS_LEVES if c in _trades().columns]
+    for coluna in df.columns:
+        assert str(df[coluna].dtype) == TRADE_DTYPES[coluna], coluna
+    assert df["DY"].tolist() == [1.25, 0.8, 2.0]
+
+
+def test_normalize_events_tipos_declarados():
+    eventos = normalize_events(pd.DataFrame({
+        "Ativo": ["AAAA3"], "DataCom": ["05/08/2025"], "DY": ["1,5"], "ValorDividendo": ["0,12"], "Tipo": ["JCP"],
+    }))
+    assert str(eventos["DataCom"].dtype) == "datetime64[ns]"
+    assert str(eventos["Ativo"].dtype) == "category"
+    assert eventos["ValorDividendo"].iloc[0] == 0.12
+
+
+def test_float32_ida_e_volta_pelo_csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    trades = normalize_trades(_trades())
+    arquivo = save_trades_to_csv(trades.copy(), 1.0, 2, 3, False, 1000)
+
+    lido = normalize_trades(pd.read_csv(arquivo, sep=";", encoding="utf-8-sig"))
+    for coluna, dtype in TRADE_DTYPES.items():
+        if coluna not in trades.columns:
+            continue
+        assert lido[coluna].dtype == trades[coluna].dtype, coluna
+        if dtype in ("float32", "float64"):
+            np.testing.assert_array_equal(lido[coluna].to_numpy(), trades[coluna].to_numpy(), err_msg=coluna)
+    pd.testing.assert_series_equal(lido["DataCom"], trades["DataCom"])
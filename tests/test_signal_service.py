@@ -0,0 +1,108 @@
+import json
+import os
+
+import pandas as pd
+
+import cache_manifest
+import data_fetcher
+from signal_service import SignalService
+
+HOJE = pd.Timestamp("2025-09-15")
+
+JSON_EVENTOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "data_cache", "dividend_events_2025-08-01_2025-10-31.json")
+
+
+def _eventos(linhas):
+    return pd.DataFrame({
+        "Ativo": [l[0] for l in linhas],
+        "DataCom": pd.to_datetime([l[1] for l in linhas]),
+        "DY": [l[2] for l in linhas],
+        "ValorDividendo": [0.5] * len(linhas),
+    })
+
+
+class FonteStub:
+    """Fonte de eventos que registra as janelas pedidas"""
+
+    def __init__(self, eventos):
+        self.eventos = eventos
+        self.chamadas = []
+
+    def __call__(self, start, end, min_dy):
+        self.chamadas.append((start, end))
+        datas = self.eventos["DataCom"]
+        return self.eventos[(datas >= start) & (datas <= end)].reset_index(drop=True)
+
+
+def _servico(fonte, hoje=HOJE):
+    return SignalService(min_dy=0.0, days_before=18, days_after=25, allow_overlap=False,
+                         fonte_eventos=fonte, fonte_cotacoes=lambda tickers: {t: 10.0 for t in tickers},
+                         hoje=lambda: hoje)
+
+
+def test_eventos_fora_de_ordem_sao_agendados_pela_data_de_compra():
+    # BBBB4 vem primeiro, mas compra depois de AAAA3: sem ordenar, BBBB4
+    # bloquearia a posição aberta em AAAA3
+    fonte = FonteStub(_eventos([("BBBB4", "2025-10-01", 3.0), ("AAAA3", "2025-09-20", 2.0)]))
+    servico = _servico(fonte)
+    servico.refresh()
+
+    assert [p["Ticker"] for p in servico.posicoes()] == ["AAAA3"]
+    assert servico.candidatos() == []
+
+
+def test_refresh_nao_imprime_resumo_do_agendamento(capsys):
+    fonte = FonteStub(_eventos([("AAAA3", "2025-09-20", 2.0), ("BBBB4", "2025-09-22", 3.0)]))
+    servico = _servico(fonte)
+    servico.refresh()
+
+    assert servico.posicoes()
+    assert "[RESUMO]" not in capsys.readouterr().out
+
+
+def test_refresh_busca_so_a_parte_recente_e_mantem_eventos_em_memoria(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fonte = FonteStub(_eventos([("AAAA3", "2025-07-01", 2.0), ("BBBB4", "2025-09-20", 2.0)]))
+    servico = _servico(fonte)
+    servico.refresh()
+    trades = servico._trades
+
+    # O evento antigo some da fonte, mas continua em memória; sem mudanças o
+    # cronograma não é refeito
+    fonte.eventos = fonte.eventos.iloc[1:]
+    servico.refresh()
+    assert fonte.chamadas[1][0] == (HOJE - pd.Timedelta(days=7)).strftime("%Y-%m-%d")
+    assert servico._trades is trades
+    assert list(servico._eventos["Ativo"]) == ["AAAA3", "BBBB4"]
+
+    # Evento novo dentro da janela rebuscada é mesclado
+    fonte.eventos = _eventos([("BBBB4", "2025-09-20", 2.0), ("CCCC3", "2025-10-10", 4.0)])
+    servico.refresh()
+    assert list(servico._eventos["Ativo"]) == ["AAAA3", "BBBB4", "CCCC3"]
+    assert servico._trades is not trades
+    assert not os.listdir(tmp_path)
+
+
+def test_caminho_ao_vivo_nao_grava_cache(tmp_path, monkeypatch):
+    with open(JSON_EVENTOS, encoding="utf-8") as f:
+        resposta = json.load(f)
+
+    class Resposta:
+        status_code = 200
+
+        def json(self):
+            return resposta
+
+    import requests
+    monkeypatch.setattr(requests, "get", lambda *args, **kwargs: Resposta())
+    monkeypatch.chdir(tmp_path)
+    cache_manifest.get_manifest.cache_clear()
+    try:
+        df = data_fetcher.get_dividend_events("2025-08-01", "2025-10-31", min_dy=0.0,
+                                              usar_cache=False, gravar_cache=False)
+    finally:
+        cache_manifest.get_manifest.cache_clear()
+
+    assert not df.empty
+    assert not os.listdir(tmp_path)
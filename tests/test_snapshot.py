@@ -0,0 +1,107 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import analyzer
+import data_fetcher
+from date_extensions import calendario_dias_uteis
+from main import run_strategy
+from snapshot import prepare_snapshot
+
+START, END = "2025-03-01", "2025-10-31"
+
+
+def _eventos():
+    return pd.DataFrame({
+        "Ativo": ["AAAA3", "BBBB4", "CCCC3", "AAAA3", "BBBB4", "AAAA3", "BBBB4"],
+        "DataCom": pd.to_datetime(["2025-03-20", "2025-04-22", "2025-05-05", "2025-06-14",
+                                   "2025-06-18", "2025-09-07", "2025-10-20"]),
+        "DY": [1.5, 0.6, 2.0, 0.9, 2.2, 1.1, 0.4],
+        "ValorDividendo": [0.2, 0.15, 0.5, 0.1, 0.6, 0.12, 0.1],
+        "Tipo": ["Dividendo", "JCP", "Dividendo", "JCP", "Dividendo", "Dividendo", "JCP"],
+    })
+
+
+def _painel(inicio, fim):
+    # CCCC3 não tem preços: seus eventos não geram trades nos dois caminhos
+    dias = calendario_dias_uteis(inicio, fim)
+    passos = np.arange(len(dias), dtype=np.float64)
+    return pd.DataFrame({
+        "AAAA3": 10.0 + 0.03 * passos + np.sin(passos / 3),
+        "BBBB4": 25.0 - 0.01 * passos + np.cos(passos / 5),
+    }, index=dias)
+
+
+def _eventos_stub(start, end, indice="ibovespa", min_dy=0.7, stock_filter=None, **kwargs):
+    eventos = _eventos()
+    filtro = (eventos["DataCom"] >= pd.Timestamp(start)) & (eventos["DataCom"] <= pd.Timestamp(end))
+    filtro &= eventos["DY"] >= min_dy
+    if stock_filter:
+        filtro &= eventos["Ativo"] == stock_filter
+    return eventos[filtro].reset_index(drop=True)
+
+
+@pytest.fixture
+def fontes_stub(tmp_path, monkeypatch):
+    """Eventos e preços sintéticos para o caminho ao vivo e para o prepare"""
+    monkeypatch.chdir(tmp_path)
+    painel = _painel("2024-12-01", "2026-01-31")
+
+    def precos_stub(ticker, start_day, start_next, end_day, end_next):
+        ativo = ticker.removesuffix(".SA")
+        if ativo not in painel.columns:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            "Date": [start_next, end_next],
+            "Open": [painel.at[pd.Timestamp(start_next), ativo], painel.at[pd.Timestamp(end_next), ativo]],
+            "Close": [0.0, 0.0],
+        })
+
+    monkeypatch.setattr(data_fetcher, "get_dividend_events", _eventos_stub)
+    monkeypatch.setattr(data_fetcher, "get_price_panel", lambda tickers, inicio, fim: painel)
+    monkeypatch.setattr(analyzer, "get_price_history", precos_stub)
+    return tmp_path
+
+
+@pytest.mark.parametrize("min_dy,days_before,days_after,allow_overlap", [
+    (0.5, 2, 3, False),
+    (0.0, 5, 10, True),
+    (1.0, 1, 25, False),
+])
+def test_snapshot_igual_ao_caminho_ao_vivo(fontes_stub, min_dy, days_before, days_after, allow_overlap):
+    diretorio = prepare_snapshot(START, END, output_dir=str(fontes_stub / "snap"))
+    parametros = dict(min_dy=min_dy, days_before=days_before, days_after=days_after,
+                      allow_overlap=allow_overlap, start=START, end=END, verbose=False)
+
+    capital_vivo, minimo_vivo, hist_vivo, _ = run_strategy(**parametros)
+    capital_snap, minimo_snap, hist_snap, _ = run_strategy(snapshot=diretorio, **parametros)
+
+    assert len(hist_snap) == len(hist_vivo) > 0
+    assert capital_snap == pytest.approx(capital_vivo)
+    assert minimo_snap == pytest.approx(minimo_vivo)
+    assert [h["Ticker"] for h in hist_snap] == [h["Ticker"] for h in hist_vivo]
+
+
+def test_prepare_sem_precos_nao_grava_snapshot(fontes_stub, monkeypatch):
+    monkeypatch.setattr(data_fetcher, "get_price_panel", lambda tickers, inicio, fim: pd.DataFrame())
+    destino = fontes_stub / "snap"
+
+    with pytest.raises(ValueError, match="Nenhum preço"):
+        prepare_snapshot(START, END, output_dir=str(destino))
+    assert not os.path.exists(destino)
+
+
+def test_prepare_avisa_tickers_sem_preco(fontes_stub, capsys):
+    prepare_snapshot(START, END, output_dir=str(fontes_stub / "snap"))
+    assert "[WARN] 1 de 3 tickers sem nenhum preço" in capsys.readouterr().out
+
+
+def test_run_fora_da_janela_do_snapshot_falha(fontes_stub):
+    diretorio = prepare_snapshot(START, END, output_dir=str(fontes_stub / "snap"))
+
+    with pytest.raises(ValueError, match="fora do snapshot"):
+        run_strategy(start=START, end="2025-12-31", snapshot=diretorio, verbose=False)
+    with pytest.raises(ValueError, match="fora do snapshot"):
+        run_strategy(start="2025-01-01", end=END, snapshot=diretorio, verbose=False)